@@ -0,0 +1,221 @@
+import os
+import re
+import gzip
+import json
+import shutil
+import difflib
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+DIRECTORIO_BACKUPS = 'backups'
+INDICE = 'indice.jsonl'
+OBJETOS = 'objetos'
+# Líneas que cambian sin que cambie la configuración: no cuentan para la huella ni en los diffs
+VOLATILES = re.compile(
+    r'^(Building configuration|Current configuration|! Last configuration change|'
+    r'! NVRAM config last updated|ntp clock-period)'
+)
+PATRON_HOSTNAME = re.compile(r'^hostname (\S+)')
+PATRON_ULTIMO_CAMBIO = re.compile(r'^! Last configuration change at (.+?)(?: by .*)?$')
+PATRON_TAMANO = re.compile(r'^Current configuration\s*:\s*(\d+) bytes')
+# Solo las líneas que identifican la versión: unos 150 bytes en vez de toda la configuración
+CONSULTA_MARCA = "show running-config | include ^hostname |Last configuration change|^Current configuration"
+TIMEOUT_MARCA = 30  # El router genera la configuración entera antes de filtrarla
+
+
+def es_volatil(linea):
+    return not linea.strip() or VOLATILES.match(linea) is not None
+
+
+def lineas_comparables(texto):
+    """Líneas de una configuración sin las volátiles, para comparar versiones"""
+    return [linea for linea in texto.splitlines() if not es_volatil(linea)]
+
+
+class AlmacenBackups:
+    """Historial de running-configs por hostname, con cada contenido distinto guardado una vez
+
+    Cada versión se comprime en objetos/ con su sha256 como nombre; el índice (JSON
+    Lines, una línea por backup) permite listar el historial sin descomprimir nada.
+    Guardar una configuración que ya está en el almacén solo añade una línea al índice.
+    """
+    def __init__(self, directorio=DIRECTORIO_BACKUPS):
+        self.directorio = directorio
+        self.ruta_indice = os.path.join(directorio, INDICE)
+        self.entradas = []
+        self.bloqueo = threading.Lock()
+        os.makedirs(os.path.join(directorio, OBJETOS), exist_ok=True)
+        self._leer_indice()
+
+    def _leer_indice(self):
+        try:
+            with open(self.ruta_indice, 'r', encoding='utf-8') as f:
+                for linea in f:
+                    try:
+                        self.entradas.append(json.loads(linea))
+                    except ValueError:
+                        # Una línea cortada por un corte de luz no invalida el resto
+                        logging.warning(f"Línea dañada en {self.ruta_indice}: {linea[:60]!r}")
+        except FileNotFoundError:
+            pass
+
+    def _ruta_objeto(self, sha256):
+        return os.path.join(self.directorio, OBJETOS, sha256[:2], f"{sha256}.gz")
+
+    def ruta_temporal(self, nombre):
+        """Ruta dentro del almacén para descargar un backup antes de guardarlo"""
+        return os.path.join(self.directorio, f".{nombre}.txt")
+
+    def _anadir(self, entrada):
+        with self.bloqueo:
+            with open(self.ruta_indice, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entrada) + "\n")
+            self.entradas.append(entrada)
+
+    def guardar(self, ruta, hostname=None, puerto=None, fecha=None, verificado=None, marca=None):
+        """Guarda el backup del archivo 'ruta' y lo borra; devuelve (entrada, si es una versión nueva)"""
+        huella = hashlib.sha256()
+        ultimo_cambio = None
+        lineas = bytes_ = 0
+        temporal = ruta + ".gz"
+        with open(ruta, 'r', encoding='utf-8') as origen, gzip.open(temporal, 'wt', encoding='utf-8') as destino:
+            for linea in origen:
+                destino.write(linea)
+                lineas += 1
+                bytes_ += len(linea)
+                if m := PATRON_ULTIMO_CAMBIO.match(linea):
+                    ultimo_cambio = m.group(1).strip()
+                if es_volatil(linea):
+                    continue
+                huella.update(linea.rstrip().encode('utf-8') + b"\n")
+                if hostname is None and (m := PATRON_HOSTNAME.match(linea)):
+                    hostname = m.group(1)
+        sha256 = huella.hexdigest()
+
+        objeto = self._ruta_objeto(sha256)
+        nueva = not os.path.exists(objeto)
+        if nueva:
+            os.makedirs(os.path.dirname(objeto), exist_ok=True)
+            os.replace(temporal, objeto)
+        else:
+            os.remove(temporal)
+        os.remove(ruta)
+
+        entrada = {
+            'hostname': hostname or puerto or "desconocido",
+            'fecha': (fecha or datetime.now()).isoformat(timespec='seconds'),
+            'sha256': sha256,
+            'lineas': lineas,
+            'bytes': bytes_,
+            'ultimo_cambio': ultimo_cambio,
+            'puerto': puerto,
+            'verificado': verificado,
+            'marca': marca,
+        }
+        self._anadir(entrada)
+        return entrada, nueva
+
+    def registrar_sin_cambios(self, anterior, puerto=None, fecha=None):
+        """Anota un backup que no se descargó porque la marca del router no cambió"""
+        entrada = dict(anterior, puerto=puerto, omitido=True,
+                       fecha=(fecha or datetime.now()).isoformat(timespec='seconds'))
+        self._anadir(entrada)
+        return entrada
+
+    def hostnames(self):
+        with self.bloqueo:
+            return sorted({e['hostname'] for e in self.entradas})
+
+    def historial(self, hostname=None):
+        """Backups de un hostname (o de todos), del más antiguo al más reciente"""
+        with self.bloqueo:
+            return [e for e in self.entradas if hostname is None or e['hostname'] == hostname]
+
+    def versiones(self, hostname):
+        """Backups de un hostname en los que cambió la configuración respecto al anterior"""
+        versiones = []
+        for entrada in self.historial(hostname):
+            if not versiones or versiones[-1]['sha256'] != entrada['sha256']:
+                versiones.append(entrada)
+        return versiones
+
+    def ultimo(self, hostname):
+        historial = self.historial(hostname)
+        return historial[-1] if historial else None
+
+    def buscar(self, sha256):
+        """Entrada más reciente de un contenido, por su sha256 o un prefijo"""
+        with self.bloqueo:
+            encontradas = [e for e in self.entradas if e['sha256'].startswith(sha256)]
+        if len({e['sha256'] for e in encontradas}) > 1:
+            raise KeyError(f"Prefijo ambiguo: {sha256}")
+        if not encontradas:
+            raise KeyError(f"No hay ningún backup {sha256}")
+        return encontradas[-1]
+
+    def leer(self, sha256):
+        """Texto de una versión guardada"""
+        with gzip.open(self._ruta_objeto(sha256), 'rt', encoding='utf-8') as f:
+            return f.read()
+
+    def exportar(self, sha256, archivo):
+        with gzip.open(self._ruta_objeto(sha256), 'rb') as origen, open(archivo, 'wb') as destino:
+            shutil.copyfileobj(origen, destino)
+
+    def diferencias(self, sha_a, sha_b, contexto=3):
+        """Diff unificado entre dos versiones, sin las líneas volátiles"""
+        if sha_a == sha_b:
+            return []
+        return list(difflib.unified_diff(
+            lineas_comparables(self.leer(sha_a)), lineas_comparables(self.leer(sha_b)),
+            fromfile=sha_a[:12], tofile=sha_b[:12], n=contexto, lineterm=""
+        ))
+
+
+def leer_marca(sesion):
+    """(hostname, marca de último cambio) del router, sin descargar la configuración
+
+    La marca une la fecha de 'Last configuration change' y el tamaño de la
+    configuración; es None si el router no la muestra y hay que descargarla.
+    """
+    hostname = cambio = tamano = None
+    for linea in sesion.ejecutar(CONSULTA_MARCA, TIMEOUT_MARCA, acelerar=False).splitlines():
+        if m := PATRON_HOSTNAME.match(linea):
+            hostname = m.group(1)
+        elif PATRON_ULTIMO_CAMBIO.match(linea):
+            cambio = linea.lstrip("! ").strip()
+        elif m := PATRON_TAMANO.match(linea):
+            tamano = m.group(1)
+    return hostname, f"{cambio} ({tamano} bytes)" if cambio else None
+
+
+def respaldar(sesion, almacen, al_recibir=None, forzar=False):
+    """Descarga la running-config de una SesionConsola y la guarda en el almacén
+
+    Antes lee la marca de último cambio; si coincide con la del último backup de
+    ese hostname no se descarga nada (salvo con forzar). Devuelve (entrada del
+    índice, si es una versión nueva, ResultadoBackup o None si no se descargó).
+    """
+    hostname, marca = leer_marca(sesion)
+    anterior = almacen.ultimo(hostname) if hostname else None
+    if not forzar and marca and anterior and anterior.get('marca') == marca:
+        entrada = almacen.registrar_sin_cambios(anterior, sesion.puerto)
+        logging.info(f"{sesion.puerto}: {hostname} sin cambios desde {anterior['fecha']} ({marca})",
+                     extra={'puerto': sesion.puerto, 'hostname': hostname})
+        return entrada, False, None
+
+    temporal = almacen.ruta_temporal(os.path.basename(sesion.puerto))
+    resultado = sesion.guardar_running(temporal, al_recibir)
+    if marca and sesion.velocidad_original is not None:
+        # Subir y bajar 'speed' cambia la marca: se guarda la que queda al terminar
+        sesion.restaurar_velocidad()
+        _, marca = leer_marca(sesion)
+    entrada, nueva = almacen.guardar(temporal, puerto=sesion.puerto, verificado=resultado.verificado, marca=marca)
+    logging.info(
+        f"{sesion.puerto}: backup de {entrada['hostname']} "
+        f"{'guardado como versión nueva' if nueva else 'sin cambios'} ({entrada['sha256'][:12]})",
+        extra={'puerto': sesion.puerto, 'hostname': entrada['hostname']}
+    )
+    return entrada, nueva, resultado
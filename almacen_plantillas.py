@@ -0,0 +1,112 @@
+import os
+import json
+import logging
+
+INDICE = '.indice.json'
+# Metadatos que se guardan en el índice para listar y buscar sin abrir cada plantilla
+CAMPOS_INDICE = ('hostname', 'lan_ip')
+
+
+class AlmacenPlantillas:
+    """Plantillas JSON de un directorio con índice en disco y carga perezosa"""
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self.ruta_indice = os.path.join(directorio, INDICE)
+        self.indice = {}
+        self.cache = {}
+        self._leer_indice()
+
+    def _ruta(self, nombre):
+        return os.path.join(self.directorio, f"{nombre}.json")
+
+    def _leer_indice(self):
+        try:
+            with open(self.ruta_indice, 'r', encoding='utf-8') as f:
+                self.indice = json.load(f)
+        except (OSError, ValueError):
+            self.indice = {}
+
+    def _escribir_indice(self):
+        temporal = self.ruta_indice + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(self.indice, f)
+        os.replace(temporal, self.ruta_indice)
+
+    def _entrada(self, datos, stat):
+        entrada = {'mtime': stat.st_mtime, 'tamano': stat.st_size}
+        entrada.update({campo: str(datos.get(campo, '')) for campo in CAMPOS_INDICE})
+        return entrada
+
+    def sincronizar(self):
+        """Actualiza el índice leyendo solo las plantillas nuevas o modificadas"""
+        vistos = set()
+        cambios = False
+        if os.path.isdir(self.directorio):
+            with os.scandir(self.directorio) as entradas:
+                for entrada in entradas:
+                    if not entrada.name.endswith('.json') or entrada.name.startswith('.'):
+                        continue
+                    nombre = entrada.name[:-5]
+                    vistos.add(nombre)
+                    stat = entrada.stat()
+                    actual = self.indice.get(nombre)
+                    if actual and actual['mtime'] == stat.st_mtime and actual['tamano'] == stat.st_size:
+                        continue
+                    try:
+                        datos = self._cargar(nombre, stat)
+                    except Exception as e:
+                        logging.error(f"Error cargando plantilla {entrada.name}: {e}")
+                        continue
+                    self.indice[nombre] = self._entrada(datos, stat)
+                    cambios = True
+        
+        for nombre in set(self.indice) - vistos:
+            del self.indice[nombre]
+            self.cache.pop(nombre, None)
+            cambios = True
+        
+        if cambios:
+            self._escribir_indice()
+
+    def nombres(self):
+        return sorted(self.indice)
+
+    def buscar(self, texto):
+        """Nombres cuyo nombre o metadatos contienen el texto (sin distinguir mayúsculas)"""
+        texto = texto.strip().lower()
+        if not texto:
+            return self.nombres()
+        return [
+            nombre for nombre in self.nombres()
+            if texto in nombre.lower()
+            or any(texto in self.indice[nombre].get(campo, '').lower() for campo in CAMPOS_INDICE)
+        ]
+
+    def _cargar(self, nombre, stat):
+        with open(self._ruta(nombre), 'r', encoding='utf-8') as f:
+            datos = json.load(f)
+        self.cache[nombre] = (stat.st_mtime, datos)
+        return datos
+
+    def obtener(self, nombre):
+        """Devuelve la plantilla, leyéndola solo si cambió desde la última vez"""
+        try:
+            stat = os.stat(self._ruta(nombre))
+        except OSError:
+            return None
+        cacheada = self.cache.get(nombre)
+        if cacheada and cacheada[0] == stat.st_mtime:
+            return cacheada[1]
+        datos = self._cargar(nombre, stat)
+        self.indice[nombre] = self._entrada(datos, stat)
+        self._escribir_indice()
+        return datos
+
+    def guardar(self, nombre, datos):
+        """Escribe la plantilla y actualiza solo su entrada del índice"""
+        with open(self._ruta(nombre), 'w', encoding='utf-8') as f:
+            json.dump(datos, f, indent=2)
+        stat = os.stat(self._ruta(nombre))
+        self.cache[nombre] = (stat.st_mtime, datos)
+        self.indice[nombre] = self._entrada(datos, stat)
+        self._escribir_indice()
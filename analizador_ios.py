@@ -0,0 +1,97 @@
+import re
+
+# Cabecera de "show ip interface brief"
+PATRON_CABECERA_BRIEF = re.compile(r'^Interface\s+IP-Address\s+OK\?\s+Method\s+Status\s+Protocol')
+
+
+def parsear_ip_interface_brief(texto):
+    """Convierte la salida de 'show ip interface brief' en una lista de filas"""
+    filas = []
+    for linea in texto.splitlines():
+        campos = linea.split()
+        if len(campos) < 6 or PATRON_CABECERA_BRIEF.match(linea):
+            continue
+        if campos[2] not in ("YES", "NO"):
+            continue
+        filas.append({
+            'interfaz': campos[0],
+            'ip': campos[1],
+            'ok': campos[2],
+            'metodo': campos[3],
+            # "administratively down" ocupa dos columnas
+            'estado': " ".join(campos[4:-1]),
+            'protocolo': campos[-1],
+        })
+    return filas
+
+# Contadores de "show interfaces"
+PATRON_INTERFAZ = re.compile(r'^(\S+) is (.+?), line protocol is (\S+)')
+PATRON_ENTRADA = re.compile(r'(\d+) packets input, (\d+) bytes')
+PATRON_SALIDA = re.compile(r'(\d+) packets output, (\d+) bytes')
+PATRON_ERRORES_ENTRADA = re.compile(r'(\d+) input errors')
+PATRON_ERRORES_SALIDA = re.compile(r'(\d+) output errors')
+PATRON_DESCARTES_ENTRADA = re.compile(r'Input queue: \d+/\d+/(\d+)/\d+')
+PATRON_DESCARTES_SALIDA = re.compile(r'Total output drops: (\d+)')
+
+# Filtro para que el router solo transmita las líneas con contadores
+FILTRO_CONTADORES = "include line protocol|packets input|packets output|errors|drops"
+
+
+def parsear_show_interfaces(texto):
+    """Extrae los contadores de 'show interfaces' (completo o filtrado) por interfaz"""
+    contadores = {}
+    actual = None
+    for linea in texto.splitlines():
+        if m := PATRON_INTERFAZ.match(linea):
+            actual = contadores[m.group(1)] = {
+                'bytes_entrada': 0, 'paquetes_entrada': 0,
+                'errores_entrada': 0, 'descartes_entrada': 0,
+                'bytes_salida': 0, 'paquetes_salida': 0,
+                'errores_salida': 0, 'descartes_salida': 0,
+            }
+            continue
+        if actual is None:
+            continue
+        if m := PATRON_ENTRADA.search(linea):
+            actual['paquetes_entrada'], actual['bytes_entrada'] = int(m.group(1)), int(m.group(2))
+        elif m := PATRON_SALIDA.search(linea):
+            actual['paquetes_salida'], actual['bytes_salida'] = int(m.group(1)), int(m.group(2))
+        elif m := PATRON_ERRORES_ENTRADA.search(linea):
+            actual['errores_entrada'] = int(m.group(1))
+        elif m := PATRON_ERRORES_SALIDA.search(linea):
+            actual['errores_salida'] = int(m.group(1))
+        if m := PATRON_DESCARTES_ENTRADA.search(linea):
+            actual['descartes_entrada'] = int(m.group(1))
+        if m := PATRON_DESCARTES_SALIDA.search(linea):
+            actual['descartes_salida'] = int(m.group(1))
+    return contadores
+
+# Resultados de ping y traceroute
+PATRON_EXITO_PING = re.compile(r'Success rate is (\d+) percent \((\d+)/(\d+)\)')
+PATRON_RTT_PING = re.compile(r'round-trip min/avg/max = (\d+)/(\d+)/(\d+) ms')
+PATRON_SALTO = re.compile(r'^\s*(\d+)\s+(.*)$')
+PATRON_IP = re.compile(r'\d{1,3}(?:\.\d{1,3}){3}')
+PATRON_RTT_SALTO = re.compile(r'(\d+) msec')
+
+
+def parsear_ping(texto):
+    """Extrae tasa de éxito y RTT min/avg/max de la salida de ping"""
+    resultado = {'exito': None, 'recibidos': 0, 'enviados': 0, 'min': None, 'avg': None, 'max': None}
+    if m := PATRON_EXITO_PING.search(texto):
+        resultado['exito'] = int(m.group(1))
+        resultado['recibidos'], resultado['enviados'] = int(m.group(2)), int(m.group(3))
+    if m := PATRON_RTT_PING.search(texto):
+        resultado['min'], resultado['avg'], resultado['max'] = (int(v) for v in m.groups())
+    return resultado
+
+
+def parsear_traceroute(texto):
+    """Devuelve los saltos de traceroute como [(número, ip o '*', [rtt_ms, ...]), ...]"""
+    saltos = []
+    for linea in texto.splitlines():
+        if not (m := PATRON_SALTO.match(linea)):
+            continue
+        ip = PATRON_IP.search(m.group(2))
+        rtts = [int(v) for v in PATRON_RTT_SALTO.findall(m.group(2))]
+        saltos.append((int(m.group(1)), ip.group(0) if ip else '*', rtts))
+    return saltos
@@ -0,0 +1,70 @@
+import csv
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+
+from delta import comandos_delta
+
+MAX_PUERTOS_PARALELO = 16
+
+
+def leer_comandos(archivo):
+    """Lee un archivo de configuración (un comando por línea, '!' para comentarios)"""
+    with open(archivo, 'r') as f:
+        return [linea.rstrip() for linea in f if linea.strip() and not linea.lstrip().startswith('!')]
+
+
+def leer_mapa(archivo):
+    """Lee un CSV 'puerto,archivo' y devuelve [(puerto, archivo), ...]"""
+    with open(archivo, 'r', newline='') as f:
+        return [
+            (fila[0].strip(), fila[1].strip())
+            for fila in csv.reader(f)
+            if len(fila) >= 2 and fila[0].strip() and not fila[0].startswith('#')
+        ]
+
+
+class Aprovisionador:
+    """Envía configuraciones a varios puertos COM a la vez y publica el avance en una cola"""
+    def __init__(self, gestor, asignaciones, cola, consola_pass='', enable_pass='',
+                 max_hilos=MAX_PUERTOS_PARALELO, solo_cambios=False, pegar=False, control_flujo=None,
+                 quitar_sobrantes=False):
+        self.gestor = gestor
+        self.asignaciones = asignaciones  # {puerto: [comandos]}
+        self.cola = cola
+        self.consola_pass = consola_pass
+        self.enable_pass = enable_pass
+        self.max_hilos = max_hilos
+        self.solo_cambios = solo_cambios  # Enviar solo la diferencia con la running-config
+        self.quitar_sobrantes = quitar_sobrantes  # En esa diferencia, quitar lo que nucleo ya no genera
+        self.pegar = pegar  # Enviar en bloque (SesionConsola.pegar_config)
+        self.control_flujo = control_flujo
+
+    def iniciar(self):
+        Thread(target=self._ejecutar, daemon=True).start()
+
+    def _ejecutar(self):
+        inicio = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.max_hilos) as pool:
+            for puerto, comandos in self.asignaciones.items():
+                pool.submit(self._aprovisionar, puerto, comandos)
+        self.cola.put(('terminado', None, time.monotonic() - inicio))
+
+    def _aprovisionar(self, puerto, comandos):
+        """Envía la configuración de un puerto (ejecutado en el pool)"""
+        inicio = time.monotonic()
+        try:
+            sesion = self.gestor.obtener(puerto, self.consola_pass, self.enable_pass)
+            if self.solo_cambios:
+                comandos = comandos_delta(sesion, comandos, self.quitar_sobrantes)
+            self.cola.put(('inicio', puerto, len(comandos)))
+            al_confirmar = lambda i, cmd, salida: self.cola.put(('progreso', puerto, i))
+            if self.pegar:
+                resultado = sesion.pegar_config(comandos, al_confirmar, self.control_flujo)
+            else:
+                resultado = sesion.enviar_config(comandos, al_confirmar)
+            self.cola.put(('fin', puerto, (resultado, time.monotonic() - inicio)))
+        except Exception as e:
+            logging.error(f"{puerto}: error aprovisionando: {e}")
+            self.cola.put(('error', puerto, (e, time.monotonic() - inicio)))
@@ -0,0 +1,319 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import tempfile
+import subprocess
+from datetime import datetime
+
+import nucleo
+from consola import GestorSesiones, MAX_BYTES_EN_VUELO
+from simulador_ios import SimuladorIOS
+from optimizador import optimizar
+from delta import comandos_delta
+from almacen_backups import AlmacenBackups, respaldar
+from analizador_ios import parsear_show_interfaces, FILTRO_CONTADORES
+
+# Escenario por defecto: algo más parecido a una configuración real que plantilla1.json
+VLANS_ENVIO = 30
+LINEAS_BACKUP = 500
+SONDEOS_MONITOR = 50
+TIMEOUT_BACKUP = 60
+
+
+def spec_prueba(vlans=VLANS_ENVIO):
+    """Especificación con todas las secciones para medir el envío"""
+    return {
+        'hostname': "Bench", 'consola_pass': "consola1", 'enable_pass': "enable1",
+        'banner': "Solo personal autorizado",
+        'lan_interface': "GigabitEthernet0/0", 'lan_ip': "192.168.1.1", 'lan_mask': "255.255.255.0",
+        'serial_interface': "Serial0/0/0", 'serial_ip': "10.0.0.1", 'serial_mask': "255.255.255.252",
+        'serial_clock_rate': "64000", 'serial_activar': True,
+        'ssh_dominio': "lab.local", 'ssh_usuario': "admin", 'ssh_clave': "secreto1",
+        'dhcp_pool': "LAN", 'dhcp_red': "192.168.1.0", 'dhcp_mascara': "255.255.255.0",
+        'dhcp_gateway': "192.168.1.1", 'dhcp_rango_ini': "192.168.1.1", 'dhcp_rango_fin': "192.168.1.10",
+        'protocolo': "ospf", 'ruteo_red': "192.168.1.0", 'ruteo_wc': "0.0.0.255", 'ruteo_area': "0",
+        'vlans': [
+            {'id': str(i), 'nombre': f"VLAN{i}", 'interfaz': f"FastEthernet0/{i}", 'modo': "access"}
+            for i in range(10, 10 + vlans)
+        ],
+    }
+
+
+def simulador(args, **extra):
+    return SimuladorIOS(
+        latencia_caracter=args.latencia, retardo_comando=args.retardo, buffer_entrada=args.buffer, **extra
+    )
+
+
+def medir_envio(args):
+    """enviar_config de una configuración completa, con la sesión ya abierta"""
+    comandos = nucleo.generar_comandos(spec_prueba())
+    if not args.sin_optimizar:
+        comandos = optimizar(comandos)
+    with simulador(args) as sim:
+        gestor = GestorSesiones(args.baudrate)
+        try:
+            sesion = gestor.obtener(sim.puerto)
+            sesion.ejecutar("show version")
+            inicio = time.perf_counter()
+            resultado = sesion.enviar_config(comandos)
+            segundos = time.perf_counter() - inicio
+        finally:
+            gestor.cerrar_todas()
+        return {
+            'segundos': segundos,
+            'comandos': len(comandos),
+            'comandos_por_segundo': len(comandos) / segundos,
+            'rechazados': len(resultado.errores),
+            'descartados': sim.descartados,
+        }
+
+
+def medir_pegado(args):
+    """La misma configuración que enviar_config, pegada en bloque (SesionConsola.pegar_config)"""
+    comandos = nucleo.generar_comandos(spec_prueba())
+    if not args.sin_optimizar:
+        comandos = optimizar(comandos)
+    with simulador(args, control_flujo=bool(args.control_flujo)) as sim:
+        gestor = GestorSesiones(args.baudrate)
+        try:
+            sesion = gestor.obtener(sim.puerto)
+            sesion.ejecutar("show version")
+            inicio = time.perf_counter()
+            resultado = sesion.pegar_config(comandos, control_flujo=args.control_flujo)
+            segundos = time.perf_counter() - inicio
+        finally:
+            gestor.cerrar_todas()
+        return {
+            'segundos': segundos,
+            'comandos': len(comandos),
+            'comandos_por_segundo': len(comandos) / segundos,
+            'rechazados': len(resultado.errores),
+            'descartados': sim.descartados,
+            'respuestas': len(resultado.respuestas),
+        }
+
+
+def medir_pegado_desbordado(args):
+    """pegar_config sin control de flujo contra un buffer menor que la ventana: mide el reenvío
+
+    'pendientes' son los comandos que aún cambiarían algo al terminar; debe ser 0.
+    """
+    comandos = optimizar(nucleo.generar_comandos(spec_prueba()))
+    with SimuladorIOS(latencia_caracter=args.latencia, retardo_comando=args.retardo,
+                      buffer_entrada=min(args.buffer, MAX_BYTES_EN_VUELO * 3 // 4)) as sim:
+        gestor = GestorSesiones(args.baudrate)
+        try:
+            sesion = gestor.obtener(sim.puerto)
+            sesion.ejecutar("show version")
+            inicio = time.perf_counter()
+            resultado = sesion.pegar_config(comandos)
+            segundos = time.perf_counter() - inicio
+            pendientes = comandos_delta(sesion, comandos)
+        finally:
+            gestor.cerrar_todas()
+        return {
+            'segundos': segundos,
+            'comandos': len(comandos),
+            'comandos_por_segundo': len(comandos) / segundos,
+            'rechazados': len(resultado.errores),
+            'descartados': sim.descartados,
+            'pendientes': len(pendientes),
+        }
+
+
+def medir_backup(args):
+    """Backup completo volcado a archivo como en hacer_backup (SesionConsola.guardar_running)"""
+    with simulador(args, lineas_extra=args.lineas_backup) as sim, tempfile.TemporaryDirectory() as directorio:
+        gestor = GestorSesiones(args.baudrate)
+        try:
+            sesion = gestor.obtener(sim.puerto)
+            sesion.ejecutar("show version")
+            inicio = time.perf_counter()
+            resultado = sesion.guardar_running(os.path.join(directorio, "backup.txt"), timeout=TIMEOUT_BACKUP)
+            segundos = time.perf_counter() - inicio
+        finally:
+            gestor.cerrar_todas()
+        return {
+            'segundos': segundos,
+            'bytes': resultado.bytes,
+            'bytes_por_segundo': resultado.bytes / segundos,
+            'completo': resultado.verificado,
+        }
+
+
+def medir_velocidad(args):
+    """El backup de medir_backup con la línea serie modelada, a --baudrate y acelerado a --acelerar"""
+    tiempos = {}
+    for alta in (None, args.acelerar):
+        with simulador(args, lineas_extra=args.lineas_backup, velocidad=args.baudrate, modelar_linea=True) as sim:
+            gestor = GestorSesiones(args.baudrate, velocidad_alta=alta)
+            try:
+                sesion = gestor.obtener(sim.puerto)
+                sesion.ejecutar("show version")
+                inicio = time.perf_counter()
+                texto = sesion.ejecutar("show running-config", TIMEOUT_BACKUP)
+                tiempos[alta or args.baudrate] = time.perf_counter() - inicio
+            finally:
+                gestor.cerrar_todas()
+            restaurada = sim.velocidad == args.baudrate
+    lento, rapido = tiempos[args.baudrate], tiempos[args.acelerar]
+    return {
+        'segundos': rapido,
+        'segundos_sin_acelerar': lento,
+        'bytes': len(texto),
+        'mejora': lento / rapido,
+        'completo': texto.rstrip().endswith("end"),
+        'restaurada': restaurada,
+    }
+
+
+def medir_backup_sin_cambios(args):
+    """Backup nocturno de un router que no ha cambiado: solo se lee la marca de último cambio"""
+    with simulador(args, lineas_extra=args.lineas_backup, velocidad=args.baudrate, modelar_linea=True) as sim, \
+            tempfile.TemporaryDirectory() as directorio:
+        gestor = GestorSesiones(args.baudrate)
+        almacen = AlmacenBackups(directorio)
+        try:
+            sesion = gestor.obtener(sim.puerto)
+            sesion.ejecutar("show version")
+            inicio = time.perf_counter()
+            respaldar(sesion, almacen)
+            completo = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            _, _, resultado = respaldar(sesion, almacen)
+            segundos = time.perf_counter() - inicio
+        finally:
+            gestor.cerrar_todas()
+        return {
+            'segundos': segundos,
+            'segundos_descargando': completo,
+            'mejora': completo / segundos,
+            'omitido': resultado is None,
+        }
+
+
+def medir_monitor(args):
+    """Sondeos de contadores de interfaces seguidos, como el monitor de contadores"""
+    with simulador(args) as sim:
+        gestor = GestorSesiones(args.baudrate)
+        try:
+            sesion = gestor.obtener(sim.puerto)
+            sesion.enviar_config(["configure terminal", "interface GigabitEthernet0/0", "no shutdown", "end"])
+            inicio = time.perf_counter()
+            for _ in range(args.sondeos):
+                contadores = parsear_show_interfaces(sesion.ejecutar(f"show interfaces | {FILTRO_CONTADORES}"))
+            segundos = time.perf_counter() - inicio
+        finally:
+            gestor.cerrar_todas()
+        return {
+            'segundos': segundos,
+            'sondeos': args.sondeos,
+            'sondeos_por_segundo': args.sondeos / segundos,
+            'interfaces': len(contadores),
+        }
+
+
+ESCENARIOS = {
+    'enviar_config': medir_envio,
+    'pegar_config': medir_pegado,
+    'pegar_desbordado': medir_pegado_desbordado,
+    'backup': medir_backup,
+    'velocidad': medir_velocidad,
+    'backup_sin_cambios': medir_backup_sin_cambios,
+    'monitor': medir_monitor,
+}
+
+
+def version_codigo():
+    """Commit actual, para poder comparar resultados entre versiones"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar(args):
+    resultados = {}
+    for nombre in args.escenarios:
+        muestras = [ESCENARIOS[nombre](args) for _ in range(args.repeticiones)]
+        # La mediana es robusta frente a una repetición afectada por otra carga del equipo
+        mediana = statistics.median(m['segundos'] for m in muestras)
+        resultado = dict(next(m for m in muestras if m['segundos'] == mediana))
+        resultado['segundos_min'] = min(m['segundos'] for m in muestras)
+        resultado['segundos_max'] = max(m['segundos'] for m in muestras)
+        resultados[nombre] = resultado
+        print(f"{nombre}: {mediana:.3f} s (min {resultado['segundos_min']:.3f}, "
+              f"max {resultado['segundos_max']:.3f})", file=sys.stderr)
+    return {
+        'commit': version_codigo(),
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'repeticiones': args.repeticiones,
+        'parametros': {
+            'latencia': args.latencia, 'retardo': args.retardo, 'buffer': args.buffer,
+            'lineas_backup': args.lineas_backup, 'sondeos': args.sondeos,
+            'optimizar': not args.sin_optimizar, 'control_flujo': args.control_flujo,
+            'acelerar': args.acelerar,
+        },
+        'resultados': resultados,
+    }
+
+
+def comparar(actual, archivo_base):
+    """Muestra la variación de cada escenario respecto a un resultado guardado"""
+    with open(archivo_base, 'r', encoding='utf-8') as f:
+        base = json.load(f)
+    if base.get('parametros') != actual['parametros']:
+        print("Aviso: los parámetros no coinciden con los de la referencia", file=sys.stderr)
+    print(f"{'escenario':<15} {'base (s)':>10} {'actual (s)':>10} {'cambio':>8}")
+    for nombre, resultado in actual['resultados'].items():
+        anterior = base['resultados'].get(nombre)
+        if anterior is None:
+            print(f"{nombre:<15} {'-':>10} {resultado['segundos']:>10.3f}")
+            continue
+        cambio = (resultado['segundos'] - anterior['segundos']) / anterior['segundos'] * 100
+        print(f"{nombre:<15} {anterior['segundos']:>10.3f} {resultado['segundos']:>10.3f} {cambio:>+7.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mide envío, backup y monitorización contra una consola simulada")
+    parser.add_argument("escenarios", nargs="*", help=f"Escenarios a medir (por defecto todos: {', '.join(ESCENARIOS)})")
+    parser.add_argument("-o", "--salida", help="Archivo JSON donde guardar los resultados")
+    parser.add_argument("-c", "--comparar", help="Resultados JSON de referencia (p. ej. del commit anterior)")
+    parser.add_argument("-n", "--repeticiones", type=int, default=3)
+    parser.add_argument("--latencia", type=float, default=0.0005, help="Segundos por carácter en el router simulado")
+    parser.add_argument("--retardo", type=float, default=0.0, help="Segundos extra por comando")
+    parser.add_argument("--buffer", type=int, default=256, help="Buffer de entrada del router simulado (bytes)")
+    parser.add_argument("--baudrate", type=int, default=9600)
+    parser.add_argument("--lineas-backup", type=int, default=LINEAS_BACKUP)
+    parser.add_argument("--sondeos", type=int, default=SONDEOS_MONITOR)
+    parser.add_argument("--sin-optimizar", action="store_true", help="Envía los comandos generados sin optimizar")
+    parser.add_argument("--control-flujo", choices=("xonxoff", "rtscts"),
+                        help="Control de flujo en pegar_config (el simulador frena con XOFF)")
+    parser.add_argument("--acelerar", type=int, default=115200,
+                        help="Baudios a los que sube la consola el escenario 'velocidad'")
+    args = parser.parse_args(argv)
+    if desconocidos := set(args.escenarios) - set(ESCENARIOS):
+        parser.error(f"escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+    args.escenarios = args.escenarios or list(ESCENARIOS)
+
+    informe = ejecutar(args)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(informe, f, indent=2)
+    else:
+        print(json.dumps(informe, indent=2))
+    if args.comparar:
+        comparar(informe, args.comparar)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
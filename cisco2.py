@@ -1,31 +1,85 @@
+import time
+ARRANQUE = time.perf_counter()  # Referencia para medir el arranque (ver __main__)
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog
-import serial
-import serial.tools.list_ports
-import time
-import ipaddress
 import logging
-import re
-import json
 import os
+import json
 from threading import Thread
 import queue
-import webbrowser
+import codecs
+import shutil
+import tempfile
+from collections import deque
+from threading import Lock
+import nucleo
+from almacen_plantillas import AlmacenPlantillas
+from repositorio import RepositorioPlantillas
+from consola import GestorSesiones
+from registro import configurar_registro
+from optimizador import optimizar, ahorro
+from delta import calcular_delta, leer_estado, lineas_quitadas
+from almacen_backups import AlmacenBackups, respaldar
+from metricas import estimar_restante, exportar_json, texto_prometheus
+from analizador_ios import parsear_ip_interface_brief, parsear_show_interfaces, FILTRO_CONTADORES
+from monitoreo import SondeoPeriodico, MuestreadorContadores
+from puertos import VigilantePuertos
+from aprovisionamiento import Aprovisionador, leer_comandos, leer_mapa
+from conectividad import BarridoConectividad, expandir_destinos, MAX_DESTINOS, REPETICIONES_PING, TIMEOUT_SONDA
 
 # Configuración de constantes
 BAUDRATE = 9600
 TIMEOUT = 1
-DELAY_ENTRE_COMANDOS = 0.3
+TIMEOUT_PRUEBAS = 30  # Segundos sin salida antes de abortar una consulta larga
+LINEAS_SCROLLBACK = 5000  # Líneas que conserva la terminal en pantalla
+MAX_PENDIENTE = 1024 * 1024  # Caracteres por pintar como máximo si la interfaz se retrasa
+INTERVALO_MONITOR = 5  # Segundos entre consultas del monitor de interfaces
+DURACION_RESALTADO = 10000  # ms que se resalta un cambio de estado
+INTERVALO_CONTADORES = 10  # Segundos entre muestras de contadores por defecto
+PEGAR_DESDE = 150  # Configuraciones con más comandos se pegan en bloque en vez de línea a línea
+CONTROL_FLUJO = None  # 'xonxoff' si el router tiene 'flowcontrol software' en line con 0
+OPTIMIZAR_ENVIO = True  # Une bloques repetidos y agrupa interfaces antes de enviar por consola
+VELOCIDAD_ALTA = 115200  # Baudios de 'Consola rápida'; se vuelve a BAUDRATE antes de guardar y al cerrar
 LOG_FILE = 'router_config.log'
+LOG_JSON = False  # True: una línea JSON por registro, con puerto, hostname y duración
+PUERTO_FILE = 'puerto.json'  # Adaptador de consola elegido la última vez
 PLANTILLAS_DIR = 'plantillas'
+BACKUPS_DIR = 'backups'  # Almacén de running-configs (ver almacen_backups.py)
+PLANTILLAS_DB = os.path.join(PLANTILLAS_DIR, 'plantillas.db')
 DOCS_FILE = 'documentacion.html'
 
-# Configurar logging
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# Atributo de RouterConfigurator que guarda cada campo de la especificación (salvo las VLANs)
+CAMPOS_FORMULARIO = {
+    'hostname': 'hostname_entry',
+    'consola_pass': 'consola_pass',
+    'enable_pass': 'enable_pass',
+    'banner': 'banner_msg',
+    'lan_interface': 'lan_interface',
+    'lan_ip': 'lan_ip',
+    'lan_mask': 'lan_mask',
+    'interfaz_borrar': 'interfaz_borrar_entry',
+    'serial_interface': 'serial_interface',
+    'serial_ip': 'serial_ip',
+    'serial_mask': 'serial_mask',
+    'serial_clock_rate': 'serial_clock_rate',
+    'serial_activar': 'serial_shutdown_var',
+    'ssh_dominio': 'ssh_dominio',
+    'ssh_usuario': 'ssh_usuario',
+    'ssh_clave': 'ssh_clave',
+    'dhcp_pool': 'dhcp_pool',
+    'dhcp_red': 'dhcp_red',
+    'dhcp_mascara': 'dhcp_mascara',
+    'dhcp_gateway': 'dhcp_gateway',
+    'dhcp_rango_ini': 'dhcp_rango_ini',
+    'dhcp_rango_fin': 'dhcp_rango_fin',
+    'protocolo': 'protocolo_var',
+    'ruteo_red': 'ruteo_red',
+    'ruteo_wc': 'ruteo_wc',
+    'ruteo_area': 'ruteo_area',
+    'ruteo_as': 'ruteo_as',
+}
+# Valor de los campos cuya pestaña todavía no se ha construido
+VALORES_INICIALES = {'serial_activar': True, 'vlans': []}
 
 class Tooltip:
     def __init__(self, widget, text):
@@ -71,18 +125,28 @@ class Tooltip:
             tw.destroy()
 
 class TerminalSerial(tk.Toplevel):
-    def __init__(self, parent, puerto):
+    def __init__(self, parent, puerto, sesiones, lineas_max=LINEAS_SCROLLBACK):
         super().__init__(parent)
         self.title(f"Terminal Serial - {puerto}")
         self.puerto = puerto
-        self.serial_conn = None
+        self.sesiones = sesiones
+        self.lineas_max = lineas_max
+        self.suscripcion = None
         self.running = True
         
+        # Texto recibido pendiente de pintar, acotado en caracteres
+        self.pendiente = deque()
+        self.pendiente_chars = 0
+        self.lock_pendiente = Lock()
+        
+        # Toda la sesión se vuelca a disco; la pantalla solo guarda las últimas líneas
+        self.volcado = tempfile.TemporaryFile(mode='w+', encoding='utf-8')
+        self.lock_volcado = Lock()
+        
         self.setup_ui()
         self.connect_serial()
         
         self.protocol("WM_DELETE_WINDOW", self.on_close)
-        self.queue = queue.Queue()
         self.after(100, self.process_queue)
     
     def setup_ui(self):
@@ -102,37 +166,61 @@ class TerminalSerial(tk.Toplevel):
         
         btn_clear = ttk.Button(frame, text="Limpiar", command=self.clear_output)
         btn_clear.pack(side=tk.LEFT)
+        
+        btn_save = ttk.Button(frame, text="Guardar sesión", command=self.guardar_sesion)
+        btn_save.pack(side=tk.LEFT, padx=5)
     
     def connect_serial(self):
-        """Establece conexión serial"""
+        """Se suscribe al lector compartido del puerto"""
         try:
-            self.serial_conn = serial.Serial(
-                self.puerto,
-                BAUDRATE,
-                timeout=TIMEOUT
-            )
+            self.suscripcion = self.sesiones.compartido(self.puerto).suscribir()
             Thread(target=self.read_serial, daemon=True).start()
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo conectar: {e}")
             self.destroy()
     
     def read_serial(self):
-        """Lee datos del puerto serial en segundo plano"""
-        while self.running and self.serial_conn and self.serial_conn.is_open:
+        """Recibe en segundo plano lo que reparte el lector compartido"""
+        # Un carácter multibyte puede llegar partido entre dos lecturas
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        while self.running:
             try:
-                if self.serial_conn.in_waiting:
-                    data = self.serial_conn.read(self.serial_conn.in_waiting).decode('ascii', errors='replace')
-                    self.queue.put(data)
+                # Bloquea hasta que hay datos; devuelve de una vez todo lo acumulado
+                if data := self.suscripcion.leer(TIMEOUT):
+                    if texto := decoder.decode(data):
+                        self.encolar(texto)
             except Exception as e:
                 logging.error(f"Error lectura serial: {e}")
                 break
     
+    def encolar(self, texto):
+        """Guarda texto para el próximo refresco y lo vuelca a disco"""
+        with self.lock_volcado:
+            if not self.volcado.closed:
+                self.volcado.write(texto)
+        with self.lock_pendiente:
+            self.pendiente.append(texto)
+            self.pendiente_chars += len(texto)
+            # Si la interfaz no da abasto, lo más antiguo ya no cabría en pantalla
+            while self.pendiente_chars > MAX_PENDIENTE and len(self.pendiente) > 1:
+                self.pendiente_chars -= len(self.pendiente.popleft())
+    
     def process_queue(self):
-        """Procesa los datos recibidos del puerto serial"""
-        while not self.queue.empty():
-            data = self.queue.get()
+        """Pinta de una vez todo lo recibido desde el último refresco"""
+        with self.lock_pendiente:
+            data = ''.join(self.pendiente)
+            self.pendiente.clear()
+            self.pendiente_chars = 0
+        
+        if data:
             self.text_area.config(state='normal')
             self.text_area.insert(tk.END, data)
+            
+            # Recortar en bloque cuando se supera el límite en un 10%
+            lineas = int(self.text_area.index('end-1c').split('.')[0])
+            if lineas > self.lineas_max * 1.1:
+                self.text_area.delete('1.0', f'{lineas - self.lineas_max + 1}.0')
+            
             self.text_area.see(tk.END)
             self.text_area.config(state='disabled')
         self.after(100, self.process_queue)
@@ -140,12 +228,18 @@ class TerminalSerial(tk.Toplevel):
     def send_command(self, event=None):
         """Envía un comando al puerto serial"""
         cmd = self.entry.get()
-        if cmd and self.serial_conn and self.serial_conn.is_open:
-            try:
-                self.serial_conn.write((cmd + "\n").encode())
-                self.entry.delete(0, tk.END)
-            except Exception as e:
-                messagebox.showerror("Error", f"Error al enviar comando: {e}")
+        if cmd and self.suscripcion:
+            # Si otra herramienta tiene el turno de escritura, esperar sin bloquear la ventana
+            Thread(target=self.escribir, args=((cmd + "\n").encode(),), daemon=True).start()
+            self.entry.delete(0, tk.END)
+    
+    def escribir(self, datos):
+        """Escribe en el puerto respetando el turno de las demás herramientas"""
+        try:
+            self.suscripcion.escribir(datos)
+        except Exception as e:
+            logging.error(f"Error al enviar comando: {e}")
+            self.encolar(f"\n[Error al enviar comando: {e}]\n")
     
     def clear_output(self):
         """Limpia el área de texto"""
@@ -153,23 +247,430 @@ class TerminalSerial(tk.Toplevel):
         self.text_area.delete(1.0, tk.END)
         self.text_area.config(state='disabled')
     
+    def guardar_sesion(self):
+        """Guarda en un archivo toda la sesión, incluida la que ya no está en pantalla"""
+        archivo = filedialog.asksaveasfilename(
+            parent=self,
+            defaultextension=".log",
+            filetypes=[("Registro de sesión", "*.log"), ("Todos los archivos", "*.*")],
+            title="Guardar sesión como"
+        )
+        if archivo:
+            Thread(target=self.copiar_volcado, args=(archivo,), daemon=True).start()
+    
+    def copiar_volcado(self, archivo):
+        """Copia el volcado temporal de la sesión al archivo elegido"""
+        try:
+            with self.lock_volcado:
+                self.volcado.flush()
+                self.volcado.seek(0)
+                with open(archivo, 'w', encoding='utf-8') as f:
+                    shutil.copyfileobj(self.volcado, f)
+                self.volcado.seek(0, os.SEEK_END)
+            logging.info(f"Sesión de {self.puerto} guardada en {archivo}")
+        except Exception as e:
+            logging.error(f"Error guardando sesión: {e}")
+            self.encolar(f"\n[Error guardando sesión: {e}]\n")
+    
     def on_close(self):
         """Maneja el cierre de la ventana"""
         self.running = False
-        if self.serial_conn and self.serial_conn.is_open:
-            self.serial_conn.close()
+        if self.suscripcion:
+            self.suscripcion.cerrar()
+        with self.lock_volcado:
+            self.volcado.close()
+        self.destroy()
+
+class VentanaAprovisionamiento(tk.Toplevel):
+    """Panel para enviar configuraciones a varios routers en paralelo"""
+    def __init__(self, parent, app):
+        super().__init__(parent)
+        self.title("Aprovisionamiento múltiple")
+        self.app = app
+        self.archivos = {}
+        self.cola = queue.Queue()
+        self.en_curso = False
+        
+        self.setup_ui()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+    
+    def setup_ui(self):
+        """Configura la tabla de puertos y los botones"""
+        columnas = ('archivo', 'estado', 'progreso', 'tiempo', 'errores')
+        self.tree = ttk.Treeview(self, columns=columnas)
+        self.tree.heading('#0', text='Puerto')
+        self.tree.heading('archivo', text='Configuración')
+        self.tree.heading('estado', text='Estado')
+        self.tree.heading('progreso', text='Progreso')
+        self.tree.heading('tiempo', text='Tiempo (s)')
+        self.tree.heading('errores', text='Errores')
+        self.tree.column('tiempo', width=80, anchor=tk.E)
+        self.tree.column('progreso', width=90, anchor=tk.E)
+        self.tree.tag_configure('ok', background='#c8f7c5')
+        self.tree.tag_configure('fallo', background='#f7c5c5')
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        self.resumen_var = tk.StringVar(value="Asigna un archivo de configuración a cada puerto")
+        tk.Label(self, textvariable=self.resumen_var, anchor=tk.W).pack(fill=tk.X, padx=5)
+        
+        frame = tk.Frame(self)
+        frame.pack(pady=5)
+        
+        botones = [
+            ("Agregar puerto actual", self.agregar, "Asigna un archivo al puerto seleccionado en la ventana principal"),
+            ("Cargar mapa CSV", self.cargar_mapa, "CSV con líneas 'puerto,archivo'"),
+            ("Quitar", self.quitar, "Quita los puertos seleccionados"),
+            ("Iniciar", self.iniciar, "Envía todas las configuraciones a la vez"),
+        ]
+        for texto, comando, ayuda in botones:
+            btn = ttk.Button(frame, text=texto, command=comando)
+            btn.pack(side=tk.LEFT, padx=5)
+            Tooltip(btn, ayuda)
+    
+    def asignar(self, puerto, archivo):
+        """Añade o reemplaza la configuración de un puerto"""
+        self.archivos[puerto] = archivo
+        valores = (os.path.basename(archivo), 'Pendiente', '', '', '')
+        if self.tree.exists(puerto):
+            self.tree.item(puerto, values=valores, tags=())
+        else:
+            self.tree.insert('', tk.END, iid=puerto, text=puerto, values=valores)
+    
+    def agregar(self):
+        puerto = self.app.puerto_var.get()
+        if not puerto:
+            messagebox.showwarning("Advertencia", "Selecciona un puerto COM primero", parent=self)
+            return
+        archivo = filedialog.askopenfilename(
+            parent=self,
+            title=f"Configuración para {puerto}",
+            filetypes=[("Archivo de texto", "*.txt"), ("Todos los archivos", "*.*")]
+        )
+        if archivo:
+            self.asignar(puerto, archivo)
+    
+    def cargar_mapa(self):
+        archivo = filedialog.askopenfilename(
+            parent=self,
+            title="Mapa de puertos",
+            filetypes=[("CSV", "*.csv"), ("Todos los archivos", "*.*")]
+        )
+        if not archivo:
+            return
+        try:
+            base = os.path.dirname(archivo)
+            for puerto, config in leer_mapa(archivo):
+                self.asignar(puerto, os.path.join(base, config))
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudo leer el mapa:\n{e}", parent=self)
+    
+    def quitar(self):
+        if self.en_curso:
+            return
+        for puerto in self.tree.selection():
+            self.tree.delete(puerto)
+            self.archivos.pop(puerto, None)
+    
+    def iniciar(self):
+        """Lee las configuraciones y lanza el envío en paralelo"""
+        if self.en_curso or not self.archivos:
+            return
+        try:
+            asignaciones = {puerto: leer_comandos(archivo) for puerto, archivo in self.archivos.items()}
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudo leer una configuración:\n{e}", parent=self)
+            return
+        
+        self.en_curso = True
+        self.resumen_var.set(f"Enviando a {len(asignaciones)} puertos...")
+        Aprovisionador(
+            self.app.sesiones,
+            asignaciones,
+            self.cola,
+            consola_pass=self.app.consola_pass.get().strip(),
+            enable_pass=self.app.enable_pass.get().strip(),
+            solo_cambios=self.app.solo_cambios_var.get()
+        ).iniciar()
+        self.after(100, self.process_queue)
+    
+    def process_queue(self):
+        """Refleja en la tabla el avance publicado por los hilos de envío"""
+        try:
+            while True:
+                tipo, puerto, dato = self.cola.get_nowait()
+                if tipo == 'inicio':
+                    self.tree.set(puerto, 'estado', 'Enviando')
+                    self.tree.set(puerto, 'progreso', f"0/{dato}")
+                elif tipo == 'progreso':
+                    total = self.tree.set(puerto, 'progreso').split('/')[-1]
+                    self.tree.set(puerto, 'progreso', f"{dato}/{total}")
+                elif tipo == 'fin':
+                    resultado, duracion = dato
+                    self.tree.set(puerto, 'estado', 'Completado')
+                    self.tree.set(puerto, 'tiempo', f"{duracion:.1f}")
+                    self.tree.set(puerto, 'errores', len(resultado.errores))
+                    self.tree.item(puerto, tags=('fallo' if resultado.errores else 'ok',))
+                elif tipo == 'error':
+                    error, duracion = dato
+                    self.tree.set(puerto, 'estado', f"Error: {error}")
+                    self.tree.set(puerto, 'tiempo', f"{duracion:.1f}")
+                    self.tree.item(puerto, tags=('fallo',))
+                elif tipo == 'terminado':
+                    self.en_curso = False
+                    tiempos = [float(self.tree.set(p, 'tiempo') or 0) for p in self.tree.get_children()]
+                    self.resumen_var.set(
+                        f"Terminado en {dato:.1f} s (suma secuencial: {sum(tiempos):.1f} s)"
+                    )
+                    logging.info(f"Aprovisionamiento de {len(tiempos)} puertos en {dato:.1f} s")
+                    return
+        except queue.Empty:
+            pass
+        self.after(100, self.process_queue)
+    
+    def on_close(self):
+        if self.en_curso and not messagebox.askyesno(
+            "Confirmar", "Hay envíos en curso; seguirán en segundo plano. ¿Cerrar?", parent=self
+        ):
+            return
         self.destroy()
 
+class VentanaMetricas(tk.Toplevel):
+    """Informe de tiempos por comando de cada sesión de consola"""
+    def __init__(self, parent, sesiones):
+        super().__init__(parent)
+        self.title("Tiempos de comandos")
+        self.sesiones = sesiones
+        self.setup_ui()
+        self.actualizar()
+    
+    def setup_ui(self):
+        """Configura la tabla de sesiones, la de comandos lentos y los botones"""
+        columnas = ('comandos', 'eco_p50', 'eco_p95', 'prompt_media', 'prompt_p95', 'ritmo', 'salida', 'entrada', 'bps')
+        self.tree = ttk.Treeview(self, columns=columnas, height=6)
+        self.tree.heading('#0', text='Puerto')
+        for columna, texto in zip(columnas, (
+            'Comandos', 'Eco p50 (s)', 'Eco p95 (s)', 'Prompt media (s)', 'Prompt p95 (s)',
+            's/comando', 'Bytes enviados', 'Bytes recibidos', 'B/s por baudios'
+        )):
+            self.tree.heading(columna, text=texto)
+            self.tree.column(columna, width=95, anchor=tk.E)
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.tree.bind('<<TreeviewSelect>>', self.mostrar_lentos)
+        tk.Label(self, text="Los percentiles son el límite superior del cubo del histograma", anchor=tk.W).pack(fill=tk.X, padx=5)
+        
+        tk.Label(self, text="Comandos más lentos de la sesión seleccionada:", anchor=tk.W).pack(fill=tk.X, padx=5)
+        self.lentos = ttk.Treeview(self, columns=('eco', 'prompt', 'entrada'), height=8)
+        self.lentos.heading('#0', text='Comando')
+        self.lentos.heading('eco', text='Eco (s)')
+        self.lentos.heading('prompt', text='Prompt (s)')
+        self.lentos.heading('entrada', text='Bytes recibidos')
+        for columna in ('eco', 'prompt', 'entrada'):
+            self.lentos.column(columna, width=90, anchor=tk.E)
+        self.lentos.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        frame = tk.Frame(self)
+        frame.pack(pady=5)
+        botones = [
+            ("Actualizar", self.actualizar, "Vuelve a leer las métricas"),
+            ("Exportar JSON", self.exportar_json, "Histogramas y totales por sesión"),
+            ("Exportar Prometheus", self.exportar_prometheus, "Formato de texto para node_exporter (textfile)"),
+        ]
+        for texto, comando, ayuda in botones:
+            btn = ttk.Button(frame, text=texto, command=comando)
+            btn.pack(side=tk.LEFT, padx=5)
+            Tooltip(btn, ayuda)
+    
+    def actualizar(self):
+        """Rellena la tabla con las métricas actuales de cada sesión"""
+        self.metricas = {m.puerto: m for m in self.sesiones.metricas()}
+        seleccion = self.tree.selection()
+        self.tree.delete(*self.tree.get_children())
+        for puerto, m in sorted(self.metricas.items()):
+            ritmo = m.segundos_por_comando()
+            self.tree.insert('', tk.END, iid=puerto, text=puerto, values=(
+                m.comandos,
+                f"{m.eco.percentil(50):g}", f"{m.eco.percentil(95):g}",
+                f"{m.prompt.media():.3f}", f"{m.prompt.percentil(95):g}",
+                f"{ritmo:.3f}" if ritmo is not None else "",
+                m.bytes_salida, m.bytes_entrada,
+                " ".join(f"{b}:{r:.0f}" for b, r in sorted(m.ritmo_por_velocidad().items())),
+            ))
+        if seleccion and self.tree.exists(seleccion[0]):
+            self.tree.selection_set(seleccion[0])
+        else:
+            self.mostrar_lentos()
+    
+    def mostrar_lentos(self, event=None):
+        self.lentos.delete(*self.lentos.get_children())
+        seleccion = self.tree.selection()
+        if not seleccion or seleccion[0] not in self.metricas:
+            return
+        for medicion in self.metricas[seleccion[0]].mas_lentos():
+            eco = medicion.latencia_eco
+            self.lentos.insert('', tk.END, text=medicion.comando, values=(
+                f"{eco:.3f}" if eco is not None else "",
+                f"{medicion.latencia_prompt:.3f}",
+                medicion.bytes_entrada,
+            ))
+    
+    def exportar_json(self):
+        archivo = filedialog.asksaveasfilename(
+            parent=self, defaultextension=".json", filetypes=[("JSON", "*.json")]
+        )
+        if not archivo:
+            return
+        try:
+            exportar_json(self.sesiones.metricas(), archivo)
+        except OSError as e:
+            messagebox.showerror("Error", f"No se pudo exportar:\n{str(e)}", parent=self)
+            logging.error(f"Error exportando métricas: {str(e)}")
+    
+    def exportar_prometheus(self):
+        archivo = filedialog.asksaveasfilename(
+            parent=self, defaultextension=".prom", filetypes=[("Prometheus", "*.prom"), ("Texto", "*.txt")]
+        )
+        if not archivo:
+            return
+        try:
+            with open(archivo, 'w', encoding='utf-8') as f:
+                f.write(texto_prometheus(self.sesiones.metricas()))
+        except OSError as e:
+            messagebox.showerror("Error", f"No se pudo exportar:\n{str(e)}", parent=self)
+            logging.error(f"Error exportando métricas: {str(e)}")
+
+
+class VentanaBackups(tk.Toplevel):
+    """Historial del almacén de backups: versiones por hostname y diferencias entre dos"""
+    def __init__(self, parent, almacen):
+        super().__init__(parent)
+        self.title("Historial de backups")
+        self.almacen = almacen
+        self.setup_ui()
+        self.actualizar()
+    
+    def setup_ui(self):
+        """Configura la lista de routers, la de versiones y el panel del diff"""
+        frame = tk.Frame(self)
+        frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.hostnames = tk.Listbox(frame, width=20, exportselection=False)
+        self.hostnames.pack(side=tk.LEFT, fill=tk.Y)
+        self.hostnames.bind('<<ListboxSelect>>', self.mostrar_versiones)
+        
+        columnas = ('fecha', 'cambio', 'lineas', 'backups')
+        self.versiones = ttk.Treeview(frame, columns=columnas, height=10)
+        self.versiones.heading('#0', text='SHA-256')
+        for columna, texto, ancho in zip(columnas, ('Fecha', 'Último cambio en el router', 'Líneas', 'Backups'),
+                                         (140, 200, 60, 60)):
+            self.versiones.heading(columna, text=texto)
+            self.versiones.column(columna, width=ancho)
+        self.versiones.column('#0', width=110)
+        self.versiones.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5)
+        self.versiones.bind('<<TreeviewSelect>>', self.mostrar_diferencias)
+        tk.Label(self, text="Selecciona una versión para compararla con la anterior, o dos para compararlas entre sí",
+                 anchor=tk.W).pack(fill=tk.X, padx=5)
+        
+        self.texto = tk.Text(self, height=20, font=("Courier", 9))
+        self.texto.tag_configure('quitada', foreground='#b00000')
+        self.texto.tag_configure('nueva', foreground='#007000')
+        self.texto.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        frame_botones = tk.Frame(self)
+        frame_botones.pack(pady=5)
+        botones = [
+            ("Actualizar", self.actualizar, "Vuelve a leer el índice"),
+            ("Exportar versión", self.exportar, "Guarda la versión seleccionada como texto"),
+        ]
+        for texto, comando, ayuda in botones:
+            btn = ttk.Button(frame_botones, text=texto, command=comando)
+            btn.pack(side=tk.LEFT, padx=5)
+            Tooltip(btn, ayuda)
+    
+    def actualizar(self):
+        """Rellena la lista de routers con los del índice"""
+        seleccion = self.hostnames.curselection()
+        self.hostnames.delete(0, tk.END)
+        for hostname in self.almacen.hostnames():
+            self.hostnames.insert(tk.END, hostname)
+        if seleccion and seleccion[0] < self.hostnames.size():
+            self.hostnames.selection_set(seleccion[0])
+        self.mostrar_versiones()
+    
+    def mostrar_versiones(self, event=None):
+        """Versiones distintas del router seleccionado, la más reciente arriba"""
+        self.versiones.delete(*self.versiones.get_children())
+        seleccion = self.hostnames.curselection()
+        if not seleccion:
+            return
+        historial = self.almacen.historial(self.hostnames.get(seleccion[0]))
+        for version in reversed(self.almacen.versiones(self.hostnames.get(seleccion[0]))):
+            if self.versiones.exists(version['sha256']):
+                continue  # Una configuración anterior que se volvió a aplicar
+            self.versiones.insert('', tk.END, iid=version['sha256'], text=version['sha256'][:12], values=(
+                version['fecha'], version['ultimo_cambio'] or "", version['lineas'],
+                sum(e['sha256'] == version['sha256'] for e in historial),
+            ))
+        self.texto.delete('1.0', tk.END)
+    
+    def mostrar_diferencias(self, event=None):
+        seleccion = self.versiones.selection()
+        if len(seleccion) == 1:
+            anterior = self.versiones.next(seleccion[0])
+            if not anterior:
+                self._mostrar(self.almacen.leer(seleccion[0]).splitlines())
+                return
+            seleccion = (anterior, seleccion[0])
+        elif len(seleccion) == 2:
+            # La de abajo en la lista es la más antigua
+            seleccion = tuple(reversed(seleccion))
+        else:
+            return
+        diferencias = self.almacen.diferencias(*seleccion)
+        self._mostrar(diferencias or ["Sin diferencias"])
+    
+    def _mostrar(self, lineas):
+        self.texto.delete('1.0', tk.END)
+        for linea in lineas:
+            etiqueta = ()
+            if linea.startswith('-') and not linea.startswith('---'):
+                etiqueta = ('quitada',)
+            elif linea.startswith('+') and not linea.startswith('+++'):
+                etiqueta = ('nueva',)
+            self.texto.insert(tk.END, linea + "\n", etiqueta)
+    
+    def exportar(self):
+        seleccion = self.versiones.selection()
+        if not seleccion:
+            messagebox.showwarning("Advertencia", "Selecciona una versión", parent=self)
+            return
+        archivo = filedialog.asksaveasfilename(
+            parent=self, defaultextension=".txt",
+            filetypes=[("Archivo de texto", "*.txt"), ("Todos los archivos", "*.*")],
+            title="Guardar backup como"
+        )
+        if not archivo:
+            return
+        try:
+            self.almacen.exportar(seleccion[0], archivo)
+        except OSError as e:
+            messagebox.showerror("Error", f"No se pudo exportar:\n{str(e)}", parent=self)
+            logging.error(f"Error exportando backup: {str(e)}")
+
+
 class RouterConfigurator:
     def __init__(self, root):
         self.root = root
         self.root.title("Configurador de Router Cisco Pro")
-        self.plantillas = {}
-        self.setup_directorios()
         self.setup_logging()
+        self.setup_directorios()
+        self.almacen = AlmacenPlantillas(PLANTILLAS_DIR)
+        self.plantillas = RepositorioPlantillas(PLANTILLAS_DB)
         self.setup_styles()
         self.setup_ui()
+        self.setup_vigilante_puertos()
         self.serial_connection = None
+        self.sesiones = GestorSesiones(BAUDRATE)
+        self.backups = AlmacenBackups(BACKUPS_DIR)
+        self.root.protocol("WM_DELETE_WINDOW", self.salir)
         self.cargar_plantillas()
     
     def setup_directorios(self):
@@ -178,27 +679,24 @@ class RouterConfigurator:
             os.makedirs(PLANTILLAS_DIR)
     
     def setup_logging(self):
-        """Configura logging avanzado"""
+        """Configura el registro: archivo rotativo y consola, escritos desde un hilo aparte"""
+        configurar_registro(LOG_FILE, formato_json=LOG_JSON)
         self.logger = logging.getLogger()
-        self.logger.setLevel(logging.INFO)
-        
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        
-        # Handler para archivo
-        file_handler = logging.FileHandler(LOG_FILE)
-        file_handler.setFormatter(formatter)
-        
-        # Handler para consola
-        console_handler = logging.StreamHandler()
-        console_handler.setFormatter(formatter)
-        
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
     
-    def listar_puertos(self):
-        """Lista los puertos seriales disponibles"""
-        puertos = serial.tools.list_ports.comports()
-        return [p.device for p in puertos]
+    def salir(self):
+        """Cierra las sesiones de consola y la aplicación"""
+        self.vigilante_puertos.detener()
+        self.sesiones.cerrar_todas()
+        self.plantillas.cerrar()
+        self.root.destroy()
+    
+    def obtener_sesion(self, puerto):
+        """Devuelve la sesión persistente del puerto con las contraseñas del formulario"""
+        return self.sesiones.obtener(
+            puerto,
+            consola_pass=self.consola_pass.get().strip(),
+            enable_pass=self.enable_pass.get().strip()
+        )
     
     def setup_styles(self):
         """Configura estilos visuales"""
@@ -225,14 +723,18 @@ class RouterConfigurator:
         filemenu.add_command(label="Abrir plantilla", command=self.cargar_plantilla_dialog)
         filemenu.add_command(label="Guardar plantilla", command=self.guardar_plantilla_dialog)
         filemenu.add_separator()
-        filemenu.add_command(label="Salir", command=self.root.quit)
+        filemenu.add_command(label="Salir", command=self.salir)
         menubar.add_cascade(label="Archivo", menu=filemenu)
         
         # Menú Herramientas
         toolsmenu = tk.Menu(menubar, tearoff=0)
         toolsmenu.add_command(label="Terminal Serial", command=self.abrir_terminal)
         toolsmenu.add_command(label="Monitorizar interfaces", command=self.monitorear_interfaces)
+        toolsmenu.add_command(label="Contadores de interfaces", command=self.monitorear_contadores)
         toolsmenu.add_command(label="Pruebas de conectividad", command=self.probar_conectividad)
+        toolsmenu.add_command(label="Aprovisionamiento múltiple", command=self.abrir_aprovisionamiento)
+        toolsmenu.add_command(label="Tiempos de comandos", command=lambda: VentanaMetricas(self.root, self.sesiones))
+        toolsmenu.add_command(label="Historial de backups", command=lambda: VentanaBackups(self.root, self.backups))
         menubar.add_cascade(label="Herramientas", menu=toolsmenu)
         
         # Menú Ayuda
@@ -256,6 +758,12 @@ class RouterConfigurator:
         )
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
     
+    def preguntar(self, titulo, mensaje):
+        """askyesno desde un hilo de trabajo: el diálogo se abre en el hilo de Tk y se espera la respuesta"""
+        respuesta = queue.Queue()
+        self.root.after(0, lambda: respuesta.put(messagebox.askyesno(titulo, mensaje)))
+        return respuesta.get()
+    
     def update_status(self, message):
         """Actualiza el mensaje en la barra de estado"""
         self.status_var.set(message)
@@ -276,10 +784,10 @@ class RouterConfigurator:
         self.puerto_combo = ttk.Combobox(
             frame_top, 
             textvariable=self.puerto_var, 
-            values=self.listar_puertos(), 
             width=20
         )
         self.puerto_combo.pack(side=tk.LEFT, padx=5)
+        self.puerto_combo.bind("<<ComboboxSelected>>", self.recordar_puerto)
         
         btn_refresh = ttk.Button(
             frame_top, 
@@ -295,39 +803,151 @@ class RouterConfigurator:
         )
         btn_terminal.pack(side=tk.LEFT, padx=5)
         
+        self.consola_rapida_var = tk.BooleanVar(value=False)
+        chk_rapida = ttk.Checkbutton(
+            frame_top,
+            text="Consola rápida",
+            variable=self.consola_rapida_var,
+            command=self.cambiar_consola_rapida
+        )
+        chk_rapida.pack(side=tk.LEFT, padx=5)
+        
         # Tooltips
         Tooltip(self.puerto_combo, "Selecciona el puerto serial conectado al router")
         Tooltip(btn_refresh, "Actualiza la lista de puertos disponibles")
         Tooltip(btn_terminal, "Abre una terminal serial interactiva")
+        Tooltip(chk_rapida, f"Sube la consola a {VELOCIDAD_ALTA} baudios mientras se usa "
+                            f"y la devuelve a {BAUDRATE} antes de guardar")
+    
+    def cambiar_consola_rapida(self):
+        """Activa o desactiva la subida de velocidad de las sesiones de consola"""
+        if self.consola_rapida_var.get():
+            self.sesiones.velocidad_alta = VELOCIDAD_ALTA
+            self.update_status(f"Consola rápida: {VELOCIDAD_ALTA} baudios en la próxima operación")
+        else:
+            self.sesiones.velocidad_alta = None
+            # Puede tardar unos segundos por router: fuera del hilo de la interfaz
+            Thread(target=self.sesiones.restaurar_velocidades, daemon=True).start()
+            self.update_status(f"Consola a {BAUDRATE} baudios")
     
     def abrir_terminal(self):
         """Abre la terminal serial interactiva"""
         puerto = self.puerto_var.get()
         if puerto:
             try:
-                TerminalSerial(self.root, puerto)
+                TerminalSerial(self.root, puerto, self.sesiones)
             except Exception as e:
                 messagebox.showerror("Error", f"No se pudo abrir terminal: {e}")
         else:
             messagebox.showwarning("Advertencia", "Selecciona un puerto COM primero")
     
+    def abrir_aprovisionamiento(self):
+        """Abre el panel de envío a varios puertos"""
+        VentanaAprovisionamiento(self.root, self)
+    
+    def setup_vigilante_puertos(self):
+        """Vigila en segundo plano los puertos COM que se conectan y desconectan"""
+        self.puertos_info = {}  # puerto -> (identidad del adaptador, descripción)
+        self.puerto_recordado = None
+        try:
+            with open(PUERTO_FILE, 'r', encoding='utf-8') as f:
+                self.puerto_recordado = json.load(f).get('identidad')
+        except (OSError, ValueError):
+            pass
+        
+        self.cola_puertos = queue.Queue()
+        self.vigilante_puertos = VigilantePuertos(self.cola_puertos)
+        self.vigilante_puertos.iniciar()
+        self.update_status("Buscando puertos COM...")
+        self.root.after(200, self.procesar_puertos)
+    
     def actualizar_puertos(self):
-        """Actualiza la lista de puertos COM disponibles"""
-        self.puerto_combo['values'] = self.listar_puertos()
-        self.update_status("Lista de puertos COM actualizada")
+        """Fuerza una nueva enumeración de los puertos COM"""
+        self.vigilante_puertos.forzar()
+        self.update_status("Buscando puertos COM...")
+    
+    def procesar_puertos(self):
+        """Aplica a la lista de puertos los cambios detectados por el vigilante"""
+        try:
+            while True:
+                tipo, dato = self.cola_puertos.get_nowait()
+                if tipo == 'error':
+                    self.update_status(f"Error listando puertos: {dato}")
+                    continue
+                
+                nuevos, quitados = dato
+                seleccionado = self.puerto_var.get()
+                for puerto in quitados:
+                    del self.puertos_info[puerto]
+                self.puertos_info.update(nuevos)
+                
+                # Conserva el orden de los que siguen y añade los nuevos al final
+                valores = [p for p in self.puerto_combo['values'] if p in self.puertos_info]
+                valores += [p for p in nuevos if p not in valores]
+                self.puerto_combo['values'] = valores
+                
+                # Vuelve a elegir el adaptador recordado aunque haya cambiado de número de COM
+                recuperado = None
+                if seleccionado not in self.puertos_info:
+                    recuperado = next(
+                        (p for p, (clave, _) in nuevos.items() if clave == self.puerto_recordado), None
+                    )
+                if recuperado:
+                    self.puerto_var.set(recuperado)
+                    self.update_status(f"Adaptador {nuevos[recuperado][1]} en {recuperado}")
+                elif seleccionado in quitados:
+                    self.update_status(f"Puerto {seleccionado} desconectado")
+                else:
+                    self.update_status("Lista de puertos COM actualizada")
+        except queue.Empty:
+            pass
+        self.root.after(200, self.procesar_puertos)
+    
+    def recordar_puerto(self, event=None):
+        """Guarda la identidad del adaptador elegido para volver a seleccionarlo"""
+        info = self.puertos_info.get(self.puerto_var.get())
+        if info is None:
+            return
+        self.puerto_recordado = info[0]
+        try:
+            with open(PUERTO_FILE, 'w', encoding='utf-8') as f:
+                json.dump({'identidad': info[0], 'puerto': self.puerto_var.get()}, f)
+        except OSError as e:
+            logging.error(f"No se pudo recordar el puerto: {str(e)}")
     
     def setup_notebook(self):
         """Configura el notebook con las pestañas de configuración"""
         self.tabs = ttk.Notebook(self.root)
         self.tabs.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
         
-        # Crear pestañas
-        self.setup_basic_tab()
-        self.setup_serial_tab()
-        self.setup_ssh_tab()
-        self.setup_dhcp_tab()
-        self.setup_routing_tab()
-        self.setup_vlan_tab()
+        # Las pestañas se crean vacías y se construyen la primera vez que se seleccionan
+        self.pestanas_pendientes = {}
+        self.valores_diferidos = {}
+        for texto, construir in (
+            ("Básico", self.setup_basic_tab),
+            ("Serial", self.setup_serial_tab),
+            ("SSH", self.setup_ssh_tab),
+            ("DHCP", self.setup_dhcp_tab),
+            ("Enrutamiento", self.setup_routing_tab),
+            ("VLANs", self.setup_vlan_tab),
+        ):
+            tab = ttk.Frame(self.tabs)
+            self.tabs.add(tab, text=texto)
+            self.pestanas_pendientes[str(tab)] = (tab, construir)
+        
+        self.tabs.bind("<<NotebookTabChanged>>", self.construir_pestana)
+        self.construir_pestana()
+    
+    def construir_pestana(self, event=None):
+        """Construye la pestaña seleccionada si aún no existe"""
+        pendiente = self.pestanas_pendientes.pop(self.tabs.select(), None)
+        if pendiente is None:
+            return
+        tab, construir = pendiente
+        construir(tab)
+        # Valores cargados (p. ej. de una plantilla) antes de que existiera la pestaña
+        diferidos, self.valores_diferidos = self.valores_diferidos, {}
+        self.fijar_campos(diferidos)
     
     def create_label_with_tooltip(self, parent, text, tooltip, row, column):
         """Crea una etiqueta con tooltip"""
@@ -343,11 +963,8 @@ class RouterConfigurator:
         Tooltip(entry, tooltip)
         return entry
     
-    def setup_basic_tab(self):
+    def setup_basic_tab(self, tab):
         """Configura la pestaña de configuración básica"""
-        tab = ttk.Frame(self.tabs)
-        self.tabs.add(tab, text="Básico")
-        
         # Diccionario con mensajes de ayuda
         help_msgs = {
             'hostname': "Nombre identificativo del router (ej: RouterSucursal1)",
@@ -401,11 +1018,8 @@ class RouterConfigurator:
         # Configurar peso de columnas para expansión
         tab.columnconfigure(1, weight=1)
     
-    def setup_serial_tab(self):
+    def setup_serial_tab(self, tab):
         """Configura la pestaña de interfaz serial"""
-        tab = ttk.Frame(self.tabs)
-        self.tabs.add(tab, text="Serial")
-        
         help_msgs = {
             'serial_int': "Nombre de interfaz serial (ej: Serial0/0/0)",
             'serial_ip': "Dirección IP para la interfaz serial",
@@ -444,11 +1058,8 @@ class RouterConfigurator:
         
         tab.columnconfigure(1, weight=1)
     
-    def setup_ssh_tab(self):
+    def setup_ssh_tab(self, tab):
         """Configura la pestaña de SSH"""
-        tab = ttk.Frame(self.tabs)
-        self.tabs.add(tab, text="SSH")
-        
         help_msgs = {
             'domain': "Nombre de dominio para las claves SSH",
             'ssh_user': "Nombre de usuario para acceso SSH",
@@ -469,11 +1080,8 @@ class RouterConfigurator:
         
         tab.columnconfigure(1, weight=1)
     
-    def setup_dhcp_tab(self):
+    def setup_dhcp_tab(self, tab):
         """Configura la pestaña de DHCP"""
-        tab = ttk.Frame(self.tabs)
-        self.tabs.add(tab, text="DHCP")
-        
         help_msgs = {
             'pool': "Nombre identificativo del pool DHCP",
             'network': "Red a asignar (ej: 192.168.1.0)",
@@ -509,11 +1117,8 @@ class RouterConfigurator:
         
         tab.columnconfigure(1, weight=1)
     
-    def setup_routing_tab(self):
+    def setup_routing_tab(self, tab):
         """Configura la pestaña de enrutamiento"""
-        tab = ttk.Frame(self.tabs)
-        self.tabs.add(tab, text="Enrutamiento")
-        
         help_msgs = {
             'protocol': "Protocolo de enrutamiento (RIP, OSPF o EIGRP)",
             'network': "Red a anunciar (ej: 192.168.1.0)",
@@ -552,11 +1157,8 @@ class RouterConfigurator:
         
         tab.columnconfigure(1, weight=1)
     
-    def setup_vlan_tab(self):
+    def setup_vlan_tab(self, tab):
         """Configura la pestaña de VLANs"""
-        tab = ttk.Frame(self.tabs)
-        self.tabs.add(tab, text="VLANs")
-        
         help_msgs = {
             'vlan_id': "ID de VLAN (1-4094)",
             'vlan_name': "Nombre descriptivo de la VLAN",
@@ -672,219 +1274,75 @@ class RouterConfigurator:
             )
             btn.pack(side=tk.LEFT, padx=5)
             Tooltip(btn, tooltip)
-    
-    def validar_ip(self, ip):
-        """Valida que una cadena sea una dirección IP válida"""
-        try:
-            ipaddress.ip_address(ip)
-            return True
-        except ValueError:
-            return False
-    
-    def validar_formato_ip(self, ip):
-        """Valida formato de IP con expresiones regulares"""
-        patron_ip = r'^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}$'
-        if not re.match(patron_ip, ip):
-            return False
-        return all(0 <= int(octeto) <= 255 for octeto in ip.split('.'))
-    
-    def generar_comandos_basicos(self):
-        """Genera los comandos de configuración básica"""
-        comandos = ["enable", "configure terminal"]
-        
-        # Hostname
-        if hostname := self.hostname_entry.get().strip():
-            comandos.append(f"hostname {hostname}")
-        
-        # Contraseñas
-        if enable_pass := self.enable_pass.get().strip():
-            comandos.append(f"enable secret {enable_pass}")
         
-        if consola_pass := self.consola_pass.get().strip():
-            comandos.extend([
-                "line console 0",
-                f"password {consola_pass}",
-                "login",
-                "exit"
-            ])
-        
-        # Banner
-        if banner := self.banner_msg.get().strip():
-            delimitador = "$" if "$" not in banner else "#"
-            comandos.append(f"banner motd {delimitador}{banner}{delimitador}")
-        
-        # Interfaz LAN
-        if (interfaz := self.lan_interface.get().strip()) and \
-           (ip := self.lan_ip.get().strip()) and \
-           (mask := self.lan_mask.get().strip()):
-            if self.validar_ip(ip):
-                comandos.extend([
-                    f"interface {interfaz}",
-                    f"ip address {ip} {mask}",
-                    "no shutdown",
-                    "exit"
-                ])
-            else:
-                logging.warning(f"IP LAN no válida: {ip}")
-        
-        # Borrar interfaz
-        if interfaz := self.interfaz_borrar_entry.get().strip():
-            comandos.extend([
-                f"interface {interfaz}",
-                "shutdown",
-                "no ip address",
-                "no clock rate",
-                "exit"
-            ])
-        
-        return comandos
-    
-    def generar_comandos_serial(self):
-        """Genera los comandos para interfaz serial"""
-        comandos = []
-        
-        if (interfaz := self.serial_interface.get().strip()) and \
-           (ip := self.serial_ip.get().strip()) and \
-           (mask := self.serial_mask.get().strip()):
-            
-            if not self.validar_ip(ip):
-                logging.warning(f"IP serial no válida: {ip}")
-                return comandos
-                
-            comandos.extend([
-                f"interface {interfaz}",
-                f"ip address {ip} {mask}"
-            ])
-            
-            if clock_rate := self.serial_clock_rate.get().strip():
-                if clock_rate.isdigit():
-                    comandos.append(f"clock rate {clock_rate}")
-                else:
-                    logging.warning(f"Clock rate no válido: {clock_rate}")
-            
-            if self.serial_shutdown_var.get():
-                comandos.append("no shutdown")
-            
-            comandos.append("exit")
-        
-        return comandos
+        self.solo_cambios_var = tk.BooleanVar(value=False)
+        chk = ttk.Checkbutton(frame_bottom, text="Solo cambios", variable=self.solo_cambios_var)
+        chk.pack(side=tk.LEFT, padx=5)
+        Tooltip(chk, "Compara con la running-config del router y envía solo lo que cambia")
     
-    def generar_comandos_ssh(self):
-        """Genera los comandos para configuración SSH"""
-        comandos = []
-        
-        if (dominio := self.ssh_dominio.get().strip()) and \
-           (usuario := self.ssh_usuario.get().strip()) and \
-           (clave := self.ssh_clave.get().strip()):
-            
-            comandos.extend([
-                f"ip domain-name {dominio}",
-                f"username {usuario} password {clave}",
-                "crypto key generate rsa",
-                "1024",  # Tamaño de clave
-                "line vty 0 4",
-                "transport input ssh",
-                "login local",
-                "exit"
-            ])
-        
-        return comandos
-    
-    def generar_comandos_dhcp(self):
-        """Genera los comandos para configuración DHCP"""
-        comandos = []
-        
-        if (pool := self.dhcp_pool.get().strip()) and \
-           (red := self.dhcp_red.get().strip()) and \
-           (mascara := self.dhcp_mascara.get().strip()) and \
-           (gateway := self.dhcp_gateway.get().strip()):
-            
-            if ini := self.dhcp_rango_ini.get().strip():
-                if fin := self.dhcp_rango_fin.get().strip():
-                    if self.validar_ip(ini) and self.validar_ip(fin):
-                        comandos.append(f"ip dhcp excluded-address {ini} {fin}")
-                    else:
-                        logging.warning("Rango DHCP no válido")
-            
-            comandos.extend([
-                f"ip dhcp pool {pool}",
-                f"network {red} {mascara}",
-                f"default-router {gateway}"
-            ])
-        
-        return comandos
-    
-    def generar_comandos_ruteo(self):
-        """Genera los comandos para enrutamiento dinámico"""
-        comandos = []
-        proto = self.protocolo_var.get()
-        
-        if proto == "rip" and (red := self.ruteo_red.get().strip()):
-            comandos.extend([
-                "router rip",
-                "version 2",
-                f"network {red}",
-                "exit"
-            ])
-        
-        elif proto == "ospf" and (red := self.ruteo_red.get().strip()) and \
-             (wc := self.ruteo_wc.get().strip()) and \
-             (area := self.ruteo_area.get().strip()):
-            
-            comandos.extend([
-                "router ospf 1",
-                f"network {red} {wc} area {area}",
-                "exit"
-            ])
-        
-        elif proto == "eigrp" and (red := self.ruteo_red.get().strip()) and \
-             (asn := self.ruteo_as.get().strip()):
+    def leer_campo(self, clave):
+        """Valor de un campo del formulario, aunque su pestaña no se haya construido"""
+        if clave == 'vlans':
+            if not hasattr(self, 'vlan_tree'):
+                return self.valores_diferidos.get('vlans', VALORES_INICIALES['vlans'])
+            vlans = []
+            for child in self.vlan_tree.get_children():
+                vlan_id, vlan_name, interface, mode = self.vlan_tree.item(child)['values']
+                vlans.append({
+                    'id': str(vlan_id),
+                    'nombre': str(vlan_name),
+                    'interfaz': str(interface),
+                    'modo': str(mode),
+                })
+            return vlans
+        
+        widget = getattr(self, CAMPOS_FORMULARIO[clave], None)
+        if widget is None:
+            return self.valores_diferidos.get(clave, VALORES_INICIALES.get(clave, ""))
+        return widget.get()
+    
+    def fijar_campos(self, valores):
+        """Escribe los campos indicados; los de pestañas sin construir se aplican al abrirlas"""
+        for clave, valor in valores.items():
+            if clave == 'vlans':
+                if not hasattr(self, 'vlan_tree'):
+                    self.valores_diferidos['vlans'] = list(valor or [])
+                    continue
+                self.vlan_tree.delete(*self.vlan_tree.get_children())
+                for vlan in valor or []:
+                    self.vlan_tree.insert('', tk.END, values=(
+                        vlan.get('id', ''), vlan.get('nombre', ''), vlan.get('interfaz', ''), vlan.get('modo', '')
+                    ))
+                continue
             
-            if asn.isdigit():
-                comandos.extend([
-                    f"router eigrp {asn}",
-                    f"network {red}",
-                    "exit"
-                ])
+            widget = getattr(self, CAMPOS_FORMULARIO[clave], None)
+            if widget is None:
+                self.valores_diferidos[clave] = valor
+            elif isinstance(widget, tk.BooleanVar):
+                widget.set(bool(valor) if valor is not None else True)
+            elif isinstance(widget, tk.Variable):
+                widget.set("" if valor is None else str(valor))
             else:
-                logging.warning("ASN debe ser numérico")
-        
-        return comandos
+                widget.delete(0, tk.END)
+                if valor is not None:
+                    widget.insert(0, str(valor))
     
-    def generar_comandos_vlans(self):
-        """Genera comandos para configuración de VLANs"""
-        comandos = []
-        
-        for child in self.vlan_tree.get_children():
-            vlan_id, vlan_name, interface, mode = self.vlan_tree.item(child)['values']
-            
-            comandos.extend([
-                f"vlan {vlan_id}",
-                f"name {vlan_name}",
-                "exit",
-                f"interface {interface}",
-                f"switchport mode {mode}",
-                f"switchport access vlan {vlan_id}" if mode == "access" else "",
-                "no shutdown",
-                "exit"
-            ])
-        
-        return [cmd for cmd in comandos if cmd]  # Elimina cadenas vacías
+    def obtener_spec(self):
+        """Reúne los valores del formulario en una especificación (ver nucleo.CAMPOS_SPEC)"""
+        spec = {clave: self.leer_campo(clave) for clave in CAMPOS_FORMULARIO}
+        spec['vlans'] = self.leer_campo('vlans')
+        return spec
+    
+    def aplicar_spec(self, spec):
+        """Rellena todo el formulario con una especificación; los campos ausentes quedan vacíos"""
+        valores = {clave: spec.get(clave) for clave in CAMPOS_FORMULARIO}
+        valores['vlans'] = spec.get('vlans') or []
+        self.fijar_campos(valores)
     
     def generar_comandos(self):
         """Genera todos los comandos de configuración"""
         try:
-            comandos = []
-            comandos.extend(self.generar_comandos_basicos())
-            comandos.extend(self.generar_comandos_serial())
-            comandos.extend(self.generar_comandos_ssh())
-            comandos.extend(self.generar_comandos_dhcp())
-            comandos.extend(self.generar_comandos_ruteo())
-            comandos.extend(self.generar_comandos_vlans())
-            
-            # Comandos finales
-            comandos.extend(["exit", "write memory"])
-            
+            comandos = nucleo.generar_comandos(self.obtener_spec())
             logging.info("Comandos generados correctamente")
             return comandos
         
@@ -964,50 +1422,67 @@ class RouterConfigurator:
                 self.update_status("Error al guardar configuración")
     
     def cargar_plantillas(self):
-        """Carga las plantillas guardadas"""
-        self.plantillas = {}
-        if os.path.exists(PLANTILLAS_DIR):
-            for file in os.listdir(PLANTILLAS_DIR):
-                if file.endswith('.json'):
-                    try:
-                        with open(os.path.join(PLANTILLAS_DIR, file), 'r') as f:
-                            self.plantillas[file[:-5]] = json.load(f)
-                    except Exception as e:
-                        logging.error(f"Error cargando plantilla {file}: {e}")
+        """Importa al repositorio las plantillas JSON nuevas o modificadas de plantillas/"""
+        if (importadas := self.plantillas.importar(self.almacen)):
+            logging.info(f"{importadas} plantillas JSON importadas al repositorio")
     
     def guardar_plantilla_dialog(self):
         """Diálogo para guardar plantilla"""
-        nombre = simpledialog.askstring("Guardar plantilla", "Nombre de la plantilla:")
-        if nombre:
-            self.guardar_plantilla(nombre)
-    
-    def guardar_plantilla(self, nombre):
-        """Guarda la configuración actual como plantilla"""
-        config = {
-            'hostname': self.hostname_entry.get(),
-            'consola_pass': self.consola_pass.get(),
-            'enable_pass': self.enable_pass.get(),
-            'banner': self.banner_msg.get(),
-            'lan_interface': self.lan_interface.get(),
-            'lan_ip': self.lan_ip.get(),
-            'lan_mask': self.lan_mask.get(),
-            # ... todos los campos relevantes
-        }
+        ventana = tk.Toplevel(self.root)
+        ventana.title("Guardar plantilla")
+        ventana.columnconfigure(1, weight=1)
+        
+        tk.Label(ventana, text="Nombre:").grid(row=0, column=0, sticky="w", padx=5, pady=2)
+        nombre_entry = tk.Entry(ventana)
+        nombre_entry.grid(row=0, column=1, sticky="ew", padx=5, pady=2)
+        
+        tk.Label(ventana, text="Hereda de:").grid(row=1, column=0, sticky="w", padx=5, pady=2)
+        padre_var = tk.StringVar()
+        padre_combo = ttk.Combobox(ventana, textvariable=padre_var, values=[""] + self.plantillas.nombres())
+        padre_combo.grid(row=1, column=1, sticky="ew", padx=5, pady=2)
+        Tooltip(padre_combo, "Plantilla base (p. ej. la de la región); solo se guardan los campos que difieren")
+        
+        tk.Label(ventana, text="Sitio:").grid(row=2, column=0, sticky="w", padx=5, pady=2)
+        sitio_entry = tk.Entry(ventana)
+        sitio_entry.grid(row=2, column=1, sticky="ew", padx=5, pady=2)
+        
+        tk.Label(ventana, text="Etiquetas:").grid(row=3, column=0, sticky="w", padx=5, pady=2)
+        etiquetas_entry = tk.Entry(ventana)
+        etiquetas_entry.grid(row=3, column=1, sticky="ew", padx=5, pady=2)
+        Tooltip(etiquetas_entry, "Separadas por comas")
+        
+        def guardar():
+            nombre = nombre_entry.get().strip()
+            if not nombre:
+                messagebox.showwarning("Advertencia", "Indica un nombre para la plantilla", parent=ventana)
+                return
+            if self.guardar_plantilla(
+                nombre, padre_var.get().strip(), sitio_entry.get().strip(), etiquetas_entry.get().split(',')
+            ):
+                ventana.destroy()
         
+        btn_frame = tk.Frame(ventana)
+        btn_frame.grid(row=4, column=0, columnspan=2, pady=5)
+        tk.Button(btn_frame, text="Guardar", command=guardar).pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Cancelar", command=ventana.destroy).pack(side=tk.LEFT)
+        nombre_entry.focus_set()
+    
+    def guardar_plantilla(self, nombre, padre="", sitio="", etiquetas=()):
+        """Guarda la configuración actual (todas las pestañas) como plantilla"""
         try:
-            with open(os.path.join(PLANTILLAS_DIR, f"{nombre}.json"), 'w') as f:
-                json.dump(config, f, indent=2)
-            
-            self.cargar_plantillas()
+            self.plantillas.guardar(nombre, self.obtener_spec(), padre=padre, sitio=sitio, etiquetas=etiquetas)
             messagebox.showinfo("Éxito", f"Plantilla '{nombre}' guardada correctamente")
             self.update_status(f"Plantilla '{nombre}' guardada")
+            return True
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo guardar la plantilla:\n{str(e)}")
             logging.error(f"Error guardando plantilla: {str(e)}")
+            return False
     
     def cargar_plantilla_dialog(self):
         """Diálogo para cargar plantilla"""
-        if not self.plantillas:
+        self.cargar_plantillas()
+        if not self.plantillas.nombres():
             messagebox.showinfo("Información", "No hay plantillas guardadas")
             return
             
@@ -1016,11 +1491,24 @@ class RouterConfigurator:
         
         tk.Label(ventana, text="Selecciona una plantilla:").pack(pady=5)
         
+        # Filtro por nombre, hostname o IP
+        filtro_var = tk.StringVar()
+        filtro_entry = tk.Entry(ventana, textvariable=filtro_var)
+        filtro_entry.pack(fill=tk.X, padx=10)
+        Tooltip(filtro_entry, "Filtra por nombre de plantilla, hostname, sitio o etiqueta")
+        
         listbox = tk.Listbox(ventana)
-        for nombre in self.plantillas.keys():
-            listbox.insert(tk.END, nombre)
         listbox.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
         
+        def filtrar(*args):
+            listbox.delete(0, tk.END)
+            for nombre in self.plantillas.buscar(filtro_var.get()):
+                listbox.insert(tk.END, nombre)
+        
+        filtro_var.trace_add('write', filtrar)
+        filtrar()
+        filtro_entry.focus_set()
+        
         btn_frame = tk.Frame(ventana)
         btn_frame.pack(pady=5)
         
@@ -1039,80 +1527,64 @@ class RouterConfigurator:
             ventana.destroy()
     
     def cargar_plantilla(self, nombre):
-        """Carga una plantilla en los campos"""
-        if nombre in self.plantillas:
-            config = self.plantillas[nombre]
-            
-            # Limpiar campos primero
-            self.hostname_entry.delete(0, tk.END)
-            self.consola_pass.delete(0, tk.END)
-            self.enable_pass.delete(0, tk.END)
-            self.banner_msg.delete(0, tk.END)
-            # ... limpiar otros campos
-            
-            # Llenar con datos de la plantilla
-            if 'hostname' in config:
-                self.hostname_entry.insert(0, config['hostname'])
-            if 'consola_pass' in config:
-                self.consola_pass.insert(0, config['consola_pass'])
-            if 'enable_pass' in config:
-                self.enable_pass.insert(0, config['enable_pass'])
-            if 'banner' in config:
-                self.banner_msg.insert(0, config['banner'])
-            # ... llenar otros campos
-            
+        """Carga una plantilla (con su herencia resuelta) en todos los campos"""
+        try:
+            spec = self.plantillas.resolver(nombre)
+        except ValueError as e:
+            messagebox.showerror("Error", f"No se pudo cargar la plantilla:\n{str(e)}")
+            logging.error(f"Error cargando plantilla {nombre}: {str(e)}")
+            return
+        
+        if spec is not None:
+            self.aplicar_spec(spec)
             self.update_status(f"Plantilla '{nombre}' cargada")
             messagebox.showinfo("Éxito", f"Plantilla '{nombre}' cargada correctamente")
         else:
             messagebox.showerror("Error", f"Plantilla '{nombre}' no encontrada")
     
     def hacer_backup(self):
-        """Descarga la configuración actual del router"""
+        """Descarga la configuración actual del router al almacén de backups"""
         puerto = self.puerto_var.get()
         if not puerto:
             messagebox.showerror("Error", "Selecciona un puerto COM.")
             return
             
-        archivo = filedialog.asksaveasfilename(
-            defaultextension=".txt",
-            filetypes=[("Archivo de texto", "*.txt"), ("Todos los archivos", "*.*")],
-            title="Guardar backup como"
-        )
+        self.update_status("Descargando configuración...")
+        # A 9600 baudios una configuración grande tarda: la interfaz sigue respondiendo
+        # Las contraseñas se leen aquí: los widgets de Tk solo se tocan desde su hilo
+        sesion = self.obtener_sesion(puerto)
+        Thread(target=self.descargar_backup, args=(sesion,), daemon=True).start()
+    
+    def descargar_backup(self, sesion):
+        """Vuelca la running-config según llega y la guarda en el almacén (ejecutado en hilo separado)"""
+        def al_recibir(lineas):
+            self.root.after(0, self.update_status, f"Descargando configuración... {lineas} líneas")
         
-        if not archivo:
-            return
-            
         try:
-            with serial.Serial(puerto, BAUDRATE, timeout=TIMEOUT) as ser:
-                time.sleep(2)  # Esperar inicialización
-                
-                # Enviar comando para obtener configuración
-                ser.write(b"enable\n")
-                time.sleep(0.5)
-                ser.write(b"show running-config\n")
-                time.sleep(0.5)
-                
-                # Leer configuración
-                config = []
-                start_time = time.time()
-                while time.time() - start_time < 10:  # Timeout de 10 segundos
-                    if ser.in_waiting:
-                        data = ser.read(ser.in_waiting).decode('ascii', errors='replace')
-                        config.append(data)
-                        if "end" in data.lower():  # Fin de la configuración
-                            break
-                
-                # Guardar en archivo
-                with open(archivo, 'w') as f:
-                    f.write(''.join(config))
-                
-                messagebox.showinfo("Éxito", f"Backup guardado en:\n{archivo}")
-                self.update_status(f"Backup guardado en {os.path.basename(archivo)}")
-                
+            entrada, nueva, resultado = respaldar(sesion, self.backups, al_recibir)
         except Exception as e:
-            messagebox.showerror("Error", f"No se pudo hacer backup:\n{e}")
+            self.root.after(0, messagebox.showerror, "Error", f"No se pudo hacer backup:\n{e}")
             logging.error(f"Error haciendo backup: {e}")
-            self.update_status("Error al hacer backup")
+            self.root.after(0, self.update_status, "Error al hacer backup")
+            return
+        
+        if resultado is None:
+            estado = "Sin cambios según el router; no se ha descargado"
+        else:
+            estado = "Versión nueva guardada" if nueva else "Sin cambios desde la versión guardada"
+        detalle = f"{entrada['hostname']}: {estado}\n"
+        if resultado is not None:
+            detalle += f"{resultado.lineas} líneas en {resultado.duracion:.1f} s\n"
+        detalle += f"SHA-256: {entrada['sha256']}\n\nHerramientas > Historial de backups"
+        if resultado is None or resultado.verificado:
+            self.root.after(0, messagebox.showinfo, "Éxito", detalle)
+        else:
+            self.root.after(
+                0, messagebox.showwarning, "Advertencia",
+                f"El tamaño ({resultado.bytes} bytes) no coincide con el que anuncia el router "
+                f"({resultado.bytes_declarados}); revisa que esté completo.\n\n{detalle}"
+            )
+        self.root.after(0, self.update_status, f"Backup de {entrada['hostname']}: {estado.lower()}")
     
     def monitorear_interfaces(self):
         """Muestra estadísticas de interfaces"""
@@ -1124,146 +1596,353 @@ class RouterConfigurator:
         ventana = tk.Toplevel(self.root)
         ventana.title("Monitor de Interfaces")
         
-        text_area = tk.Text(ventana, wrap=tk.WORD, state='disabled')
-        text_area.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        columnas = ('ip', 'estado', 'protocolo', 'metodo')
+        tree = ttk.Treeview(ventana, columns=columnas)
+        tree.heading('#0', text='Interfaz')
+        tree.heading('ip', text='Dirección IP')
+        tree.heading('estado', text='Estado')
+        tree.heading('protocolo', text='Protocolo')
+        tree.heading('metodo', text='Método')
+        tree.tag_configure('subida', background='#c8f7c5')
+        tree.tag_configure('caida', background='#f7c5c5')
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        estado_var = tk.StringVar(value="Consultando...")
+        tk.Label(ventana, textvariable=estado_var, anchor=tk.W).pack(fill=tk.X, padx=10)
+        
+        # La consulta corre en un hilo; la ventana solo recoge resultados
+        sesion = self.obtener_sesion(puerto)
+        resultados = queue.Queue()
+        sondeo = SondeoPeriodico(
+            lambda: parsear_ip_interface_brief(sesion.ejecutar("show ip interface brief")),
+            INTERVALO_MONITOR,
+            resultados
+        )
+        
+        def quitar_resaltado(iid):
+            if tree.exists(iid):
+                tree.item(iid, tags=())
+        
+        def aplicar_filas(filas):
+            """Actualiza solo las celdas que cambiaron y resalta las transiciones"""
+            vistas = set()
+            for fila in filas:
+                iid = fila['interfaz']
+                vistas.add(iid)
+                valores = [fila[c] for c in columnas]
+                if not tree.exists(iid):
+                    tree.insert('', tk.END, iid=iid, text=iid, values=valores)
+                    continue
+                
+                anterior = tree.set(iid)
+                for columna, valor in zip(columnas, valores):
+                    if anterior[columna] != valor:
+                        tree.set(iid, columna, valor)
+                
+                if (anterior['estado'], anterior['protocolo']) != (fila['estado'], fila['protocolo']):
+                    tag = 'subida' if fila['protocolo'] == 'up' else 'caida'
+                    tree.item(iid, tags=(tag,))
+                    ventana.after(DURACION_RESALTADO, quitar_resaltado, iid)
+            
+            for iid in tree.get_children():
+                if iid not in vistas:
+                    tree.delete(iid)
+        
+        recogida = None  # Próxima recogida programada, para cancelarla al cerrar
         
-        def actualizar_datos():
+        def recoger_resultados():
+            nonlocal recogida
             try:
-                with serial.Serial(puerto, BAUDRATE, timeout=TIMEOUT) as ser:
-                    time.sleep(2)
-                    
-                    # Obtener estado de interfaces
-                    ser.write(b"enable\n")
-                    time.sleep(0.5)
-                    ser.write(b"show ip interface brief\n")
-                    time.sleep(1)
-                    
-                    # Leer respuesta
-                    output = []
-                    start_time = time.time()
-                    while time.time() - start_time < 5:  # Timeout de 5 segundos
-                        if ser.in_waiting:
-                            data = ser.read(ser.in_waiting).decode('ascii', errors='replace')
-                            output.append(data)
-                    
-                    # Mostrar en el área de texto
-                    text_area.config(state='normal')
-                    text_area.delete(1.0, tk.END)
-                    text_area.insert(tk.END, ''.join(output))
-                    text_area.config(state='disabled')
-                    
-                    # Programar próxima actualización
-                    ventana.after(5000, actualizar_datos)
-                    
-            except Exception as e:
-                text_area.config(state='normal')
-                text_area.insert(tk.END, f"Error: {str(e)}")
-                text_area.config(state='disabled')
+                while True:
+                    tipo, dato = resultados.get_nowait()
+                    if tipo == 'datos':
+                        aplicar_filas(dato)
+                        estado_var.set(f"Actualizado: {time.strftime('%H:%M:%S')}")
+                    else:
+                        estado_var.set(f"Error: {dato}")
+            except queue.Empty:
+                pass
+            recogida = ventana.after(200, recoger_resultados)
+        
+        def cerrar():
+            sondeo.detener()
+            ventana.after_cancel(recogida)
+            ventana.destroy()
         
         # Botón para actualizar manualmente
         btn_frame = tk.Frame(ventana)
         btn_frame.pack(pady=5)
         
-        btn_update = tk.Button(btn_frame, text="Actualizar", command=actualizar_datos)
+        btn_update = tk.Button(btn_frame, text="Actualizar", command=sondeo.forzar)
         btn_update.pack(side=tk.LEFT, padx=5)
         
-        btn_close = tk.Button(btn_frame, text="Cerrar", command=ventana.destroy)
+        btn_close = tk.Button(btn_frame, text="Cerrar", command=cerrar)
         btn_close.pack(side=tk.LEFT)
         
+        ventana.protocol("WM_DELETE_WINDOW", cerrar)
+        
         # Iniciar primera actualización
-        actualizar_datos()
+        sondeo.iniciar()
+        recoger_resultados()
     
-    def probar_conectividad(self):
-        """Realiza pruebas de ping y traceroute"""
-        target = simpledialog.askstring("Pruebas de conectividad", "Introduce la IP o dominio a probar:")
-        if not target:
-            return
-            
+    def monitorear_contadores(self):
+        """Muestrea contadores de interfaces y muestra tasas por segundo"""
         puerto = self.puerto_var.get()
         if not puerto:
             messagebox.showerror("Error", "Selecciona un puerto COM.")
             return
-            
+        
         ventana = tk.Toplevel(self.root)
-        ventana.title(f"Pruebas de conectividad a {target}")
+        ventana.title("Contadores de Interfaces")
+        
+        columnas = ('bps_in', 'bps_out', 'pps_in', 'pps_out', 'err_in', 'err_out', 'drops')
+        titulos = ('bits/s entrada', 'bits/s salida', 'paq/s entrada', 'paq/s salida',
+                   'errores/s entrada', 'errores/s salida', 'descartes/s')
+        tree = ttk.Treeview(ventana, columns=columnas)
+        tree.heading('#0', text='Interfaz')
+        for columna, titulo in zip(columnas, titulos):
+            tree.heading(columna, text=titulo)
+            tree.column(columna, width=110, anchor=tk.E)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        estado_var = tk.StringVar(value="Tomando la primera muestra...")
+        tk.Label(ventana, textvariable=estado_var, anchor=tk.W).pack(fill=tk.X, padx=10)
+        
+        sesion = self.obtener_sesion(puerto)
+        muestreador = MuestreadorContadores()
+        resultados = queue.Queue()
+        
+        def consultar():
+            salida = sesion.ejecutar(f"show interfaces | {FILTRO_CONTADORES}", timeout=TIMEOUT_PRUEBAS)
+            return time.time(), parsear_show_interfaces(salida)
+        
+        sondeo = SondeoPeriodico(consultar, INTERVALO_CONTADORES, resultados)
+        
+        def mostrar_tasas():
+            for interfaz, tasas in muestreador.tasas().items():
+                if tasas is None:
+                    continue
+                valores = (
+                    f"{tasas['bytes_entrada'] * 8:,.0f}", f"{tasas['bytes_salida'] * 8:,.0f}",
+                    f"{tasas['paquetes_entrada']:.1f}", f"{tasas['paquetes_salida']:.1f}",
+                    f"{tasas['errores_entrada']:.2f}", f"{tasas['errores_salida']:.2f}",
+                    f"{tasas['descartes_entrada'] + tasas['descartes_salida']:.2f}",
+                )
+                if tree.exists(interfaz):
+                    tree.item(interfaz, values=valores)
+                else:
+                    tree.insert('', tk.END, iid=interfaz, text=interfaz, values=valores)
+        
+        recogida = None  # Próxima recogida programada, para cancelarla al cerrar
         
-        notebook = ttk.Notebook(ventana)
-        notebook.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        def recoger_resultados():
+            nonlocal recogida
+            try:
+                while True:
+                    tipo, dato = resultados.get_nowait()
+                    if tipo == 'datos':
+                        instante, contadores = dato
+                        muestreador.registrar(instante, contadores)
+                        mostrar_tasas()
+                        estado_var.set(f"Última muestra: {time.strftime('%H:%M:%S', time.localtime(instante))}")
+                    else:
+                        estado_var.set(f"Error: {dato}")
+            except queue.Empty:
+                pass
+            recogida = ventana.after(200, recoger_resultados)
+        
+        def cambiar_intervalo():
+            try:
+                sondeo.intervalo = max(1, int(intervalo_var.get()))
+            except ValueError:
+                pass
+        
+        def exportar():
+            archivo = filedialog.asksaveasfilename(
+                parent=ventana,
+                defaultextension=".csv",
+                filetypes=[("CSV", "*.csv"), ("Todos los archivos", "*.*")],
+                title="Exportar contadores"
+            )
+            if archivo:
+                try:
+                    muestreador.exportar_csv(archivo)
+                    self.update_status(f"Contadores exportados a {os.path.basename(archivo)}")
+                except Exception as e:
+                    messagebox.showerror("Error", f"No se pudo exportar:\n{e}", parent=ventana)
+        
+        def cerrar():
+            sondeo.detener()
+            ventana.after_cancel(recogida)
+            ventana.destroy()
         
-        # Pestaña de Ping
-        ping_tab = ttk.Frame(notebook)
-        notebook.add(ping_tab, text="Ping")
+        btn_frame = tk.Frame(ventana)
+        btn_frame.pack(pady=5)
         
-        ping_text = tk.Text(ping_tab, wrap=tk.WORD, state='disabled')
-        ping_text.pack(fill=tk.BOTH, expand=True)
+        tk.Label(btn_frame, text="Intervalo (s):").pack(side=tk.LEFT)
+        intervalo_var = tk.StringVar(value=str(INTERVALO_CONTADORES))
+        tk.Spinbox(
+            btn_frame, from_=1, to=3600, width=5,
+            textvariable=intervalo_var, command=cambiar_intervalo
+        ).pack(side=tk.LEFT, padx=5)
         
-        # Pestaña de Traceroute
-        trace_tab = ttk.Frame(notebook)
-        notebook.add(trace_tab, text="Traceroute")
+        tk.Button(btn_frame, text="Exportar CSV", command=exportar).pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Cerrar", command=cerrar).pack(side=tk.LEFT)
         
-        trace_text = tk.Text(trace_tab, wrap=tk.WORD, state='disabled')
-        trace_text.pack(fill=tk.BOTH, expand=True)
+        ventana.protocol("WM_DELETE_WINDOW", cerrar)
+        
+        sondeo.iniciar()
+        recoger_resultados()
+    
+    def probar_conectividad(self):
+        """Realiza pruebas de ping y traceroute a uno o varios destinos"""
+        puerto = self.puerto_var.get()
+        if not puerto:
+            messagebox.showerror("Error", "Selecciona un puerto COM.")
+            return
+            
+        ventana = tk.Toplevel(self.root)
+        ventana.title("Pruebas de conectividad")
+        
+        frame_destinos = tk.Frame(ventana)
+        frame_destinos.pack(fill=tk.X, padx=5, pady=5)
+        tk.Label(frame_destinos, text="Destinos (IPs, nombres o redes, ej: 10.0.0.1, 192.168.1.0/28):").pack(anchor=tk.W)
+        destinos_entry = tk.Entry(frame_destinos)
+        destinos_entry.pack(fill=tk.X)
+        Tooltip(destinos_entry, f"Separados por comas o espacios; una red se expande a sus hosts (máx. {MAX_DESTINOS})")
+        
+        frame_opciones = tk.Frame(ventana)
+        frame_opciones.pack(fill=tk.X, padx=5)
+        tk.Label(frame_opciones, text="Repeticiones:").pack(side=tk.LEFT)
+        repeticiones_var = tk.StringVar(value=str(REPETICIONES_PING))
+        tk.Spinbox(frame_opciones, from_=1, to=100, width=4, textvariable=repeticiones_var).pack(side=tk.LEFT, padx=5)
+        tk.Label(frame_opciones, text="Timeout (s):").pack(side=tk.LEFT)
+        timeout_var = tk.StringVar(value=str(TIMEOUT_SONDA))
+        tk.Spinbox(frame_opciones, from_=1, to=36, width=4, textvariable=timeout_var).pack(side=tk.LEFT, padx=5)
+        traceroute_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(frame_opciones, text="Traceroute", variable=traceroute_var).pack(side=tk.LEFT, padx=5)
+        
+        columnas = ('exito', 'min', 'avg', 'max', 'saltos')
+        tree = ttk.Treeview(ventana, columns=columnas)
+        tree.heading('#0', text='Destino')
+        tree.heading('exito', text='Éxito')
+        tree.heading('min', text='Mín (ms)')
+        tree.heading('avg', text='Media (ms)')
+        tree.heading('max', text='Máx (ms)')
+        tree.heading('saltos', text='Saltos')
+        for columna in ('exito', 'min', 'avg', 'max'):
+            tree.column(columna, width=80, anchor=tk.E)
+        tree.column('saltos', width=300)
+        tree.tag_configure('fallo', background='#f7c5c5')
+        tree.tag_configure('parcial', background='#f7efc5')
+        tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        # Salida completa del destino seleccionado
+        detalle = tk.Text(ventana, height=10, wrap=tk.NONE, state='disabled', font=('Courier', 9))
+        detalle.pack(fill=tk.BOTH, padx=5, pady=5)
+        salidas = {}
+        
+        def mostrar_detalle(event=None):
+            seleccion = tree.selection()
+            detalle.config(state='normal')
+            detalle.delete(1.0, tk.END)
+            if seleccion:
+                detalle.insert(tk.END, "\n\n".join(salidas.get(seleccion[0], [])))
+            detalle.config(state='disabled')
+        
+        tree.bind("<<TreeviewSelect>>", mostrar_detalle)
+        
+        resultados = queue.Queue()
+        barrido = None
+        
+        def registrar(tipo, destino, dato, salida):
+            if not tree.exists(destino):
+                tree.insert('', tk.END, iid=destino, text=destino, values=('', '', '', '', ''))
+            salidas.setdefault(destino, []).append(salida)
+            if tipo == 'ping':
+                tree.set(destino, 'exito', f"{dato['exito']}%" if dato['exito'] is not None else '?')
+                for campo in ('min', 'avg', 'max'):
+                    tree.set(destino, campo, '' if dato[campo] is None else dato[campo])
+                if not dato['exito']:
+                    tree.item(destino, tags=('fallo',))
+                elif dato['exito'] < 100:
+                    tree.item(destino, tags=('parcial',))
+            elif tipo == 'traceroute':
+                tree.set(destino, 'saltos', " > ".join(ip for _, ip, _ in dato))
+            else:
+                tree.set(destino, 'exito', 'error')
+                tree.item(destino, tags=('fallo',))
+                salidas[destino][-1] = f"Error: {dato}"
+        
+        recogida = None  # Próxima recogida programada mientras hay un barrido en curso
+        
+        def recoger_resultados():
+            nonlocal recogida
+            recogida = None
+            try:
+                while True:
+                    tipo, destino, dato, salida = resultados.get_nowait()
+                    if tipo == 'fin':
+                        btn_run.config(state=tk.NORMAL)
+                        self.update_status("Pruebas de conectividad terminadas")
+                        return
+                    registrar(tipo, destino, dato, salida)
+            except queue.Empty:
+                pass
+            recogida = ventana.after(200, recoger_resultados)
         
         def ejecutar_pruebas():
+            nonlocal barrido
             try:
-                with serial.Serial(puerto, BAUDRATE, timeout=TIMEOUT) as ser:
-                    time.sleep(2)
-                    
-                    # Ejecutar ping
-                    ser.write(b"enable\n")
-                    time.sleep(0.5)
-                    ser.write(f"ping {target}\n".encode())
-                    time.sleep(3)  # Tiempo para el ping
-                    
-                    # Leer resultado del ping
-                    ping_output = []
-                    while ser.in_waiting:
-                        data = ser.read(ser.in_waiting).decode('ascii', errors='replace')
-                        ping_output.append(data)
-                    
-                    # Mostrar ping
-                    ping_text.config(state='normal')
-                    ping_text.delete(1.0, tk.END)
-                    ping_text.insert(tk.END, ''.join(ping_output))
-                    ping_text.config(state='disabled')
-                    
-                    # Ejecutar traceroute
-                    ser.write(f"traceroute {target}\n".encode())
-                    time.sleep(5)  # Tiempo para el traceroute
-                    
-                    # Leer resultado del traceroute
-                    trace_output = []
-                    while ser.in_waiting:
-                        data = ser.read(ser.in_waiting).decode('ascii', errors='replace')
-                        trace_output.append(data)
-                    
-                    # Mostrar traceroute
-                    trace_text.config(state='normal')
-                    trace_text.delete(1.0, tk.END)
-                    trace_text.insert(tk.END, ''.join(trace_output))
-                    trace_text.config(state='disabled')
-                    
-            except Exception as e:
-                ping_text.config(state='normal')
-                ping_text.insert(tk.END, f"Error: {str(e)}")
-                ping_text.config(state='disabled')
-                
-                trace_text.config(state='normal')
-                trace_text.insert(tk.END, f"Error: {str(e)}")
-                trace_text.config(state='disabled')
+                destinos = expandir_destinos(destinos_entry.get())
+                repeticiones = int(repeticiones_var.get())
+                timeout = int(timeout_var.get())
+            except ValueError as e:
+                messagebox.showerror("Error", f"Destinos u opciones no válidos:\n{e}", parent=ventana)
+                return
+            if not destinos:
+                return
+            
+            for iid in tree.get_children():
+                tree.delete(iid)
+            salidas.clear()
+            
+            barrido = BarridoConectividad(
+                self.obtener_sesion(puerto), destinos, resultados,
+                traceroute=traceroute_var.get(), repeticiones=repeticiones, timeout=timeout
+            )
+            btn_run.config(state=tk.DISABLED)
+            barrido.iniciar()
+            recoger_resultados()
+        
+        def detener():
+            if barrido:
+                barrido.detener()
+        
+        def cerrar():
+            detener()
+            if recogida is not None:
+                ventana.after_cancel(recogida)
+            ventana.destroy()
         
-        # Botón para ejecutar pruebas
+        # Botones para ejecutar pruebas
         btn_frame = tk.Frame(ventana)
         btn_frame.pack(pady=5)
         
         btn_run = tk.Button(btn_frame, text="Ejecutar Pruebas", command=ejecutar_pruebas)
         btn_run.pack(side=tk.LEFT, padx=5)
         
-        btn_close = tk.Button(btn_frame, text="Cerrar", command=ventana.destroy)
+        btn_stop = tk.Button(btn_frame, text="Detener", command=detener)
+        btn_stop.pack(side=tk.LEFT, padx=5)
+        
+        btn_close = tk.Button(btn_frame, text="Cerrar", command=cerrar)
         btn_close.pack(side=tk.LEFT)
+        
+        ventana.protocol("WM_DELETE_WINDOW", cerrar)
     
     def mostrar_documentacion(self):
         """Muestra documentación de comandos Cisco"""
+        import webbrowser
         try:
             if os.path.exists(DOCS_FILE):
                 webbrowser.open(f"file://{os.path.abspath(DOCS_FILE)}")
@@ -1299,23 +1978,25 @@ class RouterConfigurator:
         
         tk.Label(self.progress_window, text="Enviando comandos al router...").pack(pady=10)
         
-        self.progress_var = tk.IntVar()
+        self.progress_var = tk.DoubleVar()
         progress_bar = ttk.Progressbar(
             self.progress_window,
             orient=tk.HORIZONTAL,
             length=300,
-            mode='indeterminate',
+            mode='determinate',
             variable=self.progress_var
         )
         progress_bar.pack(pady=10, padx=20)
-        progress_bar.start()
         
-        # Iniciar hilo para el envío
-        Thread(target=self.enviar_config, daemon=True).start()
+        self.progress_eta = tk.StringVar(value="Calculando tiempo restante...")
+        tk.Label(self.progress_window, textvariable=self.progress_eta).pack(pady=(0, 10))
+        
+        # Iniciar hilo para el envío; las contraseñas se leen aquí, en el hilo de Tk
+        sesion = self.obtener_sesion(self.puerto_var.get())
+        Thread(target=self.enviar_config, args=(sesion, self.solo_cambios_var.get()), daemon=True).start()
     
-    def enviar_config(self):
+    def enviar_config(self, sesion, solo_cambios=False):
         """Envía la configuración al router (ejecutado en hilo separado)"""
-        puerto = self.puerto_var.get()
         comandos = self.generar_comandos()
         
         if not comandos:
@@ -1323,43 +2004,91 @@ class RouterConfigurator:
                 self.progress_window.destroy()
             self.habilitar_botones()
             return
+        
+        if OPTIMIZAR_ENVIO:
+            optimizados = optimizar(comandos)
+            lineas, bytes_ = ahorro(comandos, optimizados)
+            # A 9600 baudios cada byte tarda ~1 ms en la línea
+            logging.info(f"Optimización: {lineas} líneas y {bytes_} bytes menos (~{bytes_ * 10 / BAUDRATE:.1f} s)")
+            comandos = optimizados
             
         try:
-            with serial.Serial(puerto, BAUDRATE, timeout=TIMEOUT) as ser:
-                time.sleep(2)  # Esperar inicialización
-                
+            if solo_cambios:
+                self.root.after(0, self.progress_eta.set, "Leyendo la configuración del router...")
+                completos = len(comandos)
+                running, claves_rsa = leer_estado(sesion)
+                con_quitar = calcular_delta(comandos, running, claves_rsa, quitar=True)
+                comandos = calcular_delta(comandos, running, claves_rsa)
+                # Quitar lo que sobra solo si el usuario lo confirma viendo qué se borraría
+                if quitadas := lineas_quitadas(con_quitar, comandos):
+                    listado = "\n".join(quitadas[:20]) + ("\n..." if len(quitadas) > 20 else "")
+                    if self.preguntar(
+                        "Configuración que sobra",
+                        f"El router tiene configuración que esta plantilla ya no genera:\n\n{listado}\n\n"
+                        "¿Quitarla también? Con «No» solo se añade y modifica."
+                    ):
+                        comandos = con_quitar
+                logging.info(f"Envío por diferencias: {len(comandos)} de {completos} comandos")
+                if not comandos:
+                    self.root.after(0, messagebox.showinfo, "Sin cambios", "El router ya tiene esta configuración.")
+                    self.root.after(0, self.update_status, "El router ya tiene esta configuración")
+                    return
+            with sesion:
                 total_comandos = len(comandos)
-                for i, cmd in enumerate(comandos, 1):
-                    ser.write((cmd + "\n").encode())
-                    logging.info(f"Enviado: {cmd}")
+                inicio = time.monotonic()
+                ritmo_previo = sesion.metricas.segundos_por_comando()
+                self.root.after(0, self.actualizar_progreso, 0, estimar_restante(0, total_comandos, 0, ritmo_previo))
+                
+                def al_confirmar(i, cmd, salida):
+                    logging.debug(f"Enviado: {cmd}")
+                    if respuesta := "\n".join(salida).strip():
+                        logging.debug(f"Respuesta: {respuesta}")
                     
                     # Actualizar progreso
                     if hasattr(self, 'progress_window'):
-                        self.progress_var.set((i/total_comandos)*100)
-                        self.progress_window.update()
-                    
-                    time.sleep(DELAY_ENTRE_COMANDOS)
-                    
-                    # Leer respuesta (opcional)
-                    if ser.in_waiting:
-                        respuesta = ser.read(ser.in_waiting).decode().strip()
-                        if respuesta:
-                            logging.info(f"Respuesta: {respuesta}")
+                        restante = estimar_restante(i, total_comandos, time.monotonic() - inicio)
+                        self.root.after(0, self.actualizar_progreso, (i/total_comandos)*100, restante)
                 
-                messagebox.showinfo("Éxito", "Configuración enviada al router.")
-                logging.info("Configuración enviada correctamente")
-                self.update_status("Configuración enviada correctamente")
+                if total_comandos >= PEGAR_DESDE:
+                    resultado = sesion.pegar_config(comandos, al_confirmar, CONTROL_FLUJO)
+                else:
+                    resultado = sesion.enviar_config(comandos, al_confirmar)
+            
+            # Los avisos se muestran con la sesión ya libre: mientras esperan al usuario,
+            # el monitor y el terminal pueden seguir usando el puerto
+            if resultado.errores:
+                logging.warning(f"{len(resultado.errores)} comandos rechazados por el router")
+            logging.info("Configuración enviada correctamente")
+            self.root.after(0, self.avisar_fin_envio, resultado.errores)
         
         except Exception as e:
-            messagebox.showerror("Error", f"No se pudo enviar configuración:\n{str(e)}")
             logging.error(f"Error al enviar configuración: {str(e)}")
-            self.update_status("Error al enviar configuración")
+            self.root.after(0, messagebox.showerror, "Error", f"No se pudo enviar configuración:\n{str(e)}")
+            self.root.after(0, self.update_status, "Error al enviar configuración")
         
         finally:
             if hasattr(self, 'progress_window'):
                 self.progress_window.destroy()
             self.habilitar_botones()
     
+    def avisar_fin_envio(self, errores):
+        """Informa del resultado de un envío (en el hilo de Tk, ya sin la sesión ocupada)"""
+        if errores:
+            detalle = "\n".join(f"{cmd}: {error}" for cmd, error in errores[:10])
+            messagebox.showwarning("Advertencia", f"El router rechazó algunos comandos:\n{detalle}")
+        messagebox.showinfo("Éxito", "Configuración enviada al router.")
+        self.update_status("Configuración enviada correctamente")
+    
+    def actualizar_progreso(self, porcentaje, restante):
+        """Muestra el avance del envío y el tiempo estimado que falta"""
+        if not hasattr(self, 'progress_window') or not self.progress_window.winfo_exists():
+            return
+        self.progress_var.set(porcentaje)
+        if restante is None:
+            self.progress_eta.set("Calculando tiempo restante...")
+        else:
+            self.progress_eta.set(f"Quedan unos {restante:.0f} s")
+    
     def habilitar_botones(self):
         """Habilita todos los botones de la interfaz"""
         for widget in self.root.winfo_children():
@@ -1369,4 +2098,5 @@ class RouterConfigurator:
 if __name__ == "__main__":
     root = tk.Tk()
     app = RouterConfigurator(root)
+    root.after_idle(lambda: logging.info(f"Arranque en {(time.perf_counter() - ARRANQUE) * 1000:.0f} ms"))
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,245 @@
+import os
+import sys
+import time
+import queue
+import logging
+import argparse
+
+import nucleo
+from aprovisionamiento import leer_comandos, leer_mapa
+from registro import configurar_registro
+from optimizador import optimizar
+from almacen_backups import DIRECTORIO_BACKUPS, AlmacenBackups, respaldar
+
+
+def comandos_de(archivo, optimizado=True):
+    """Comandos de un archivo: especificación .json o lista de comandos .txt
+
+    Los .txt se envían tal cual; lo generado a partir de un .json se optimiza.
+    """
+    if archivo.lower().endswith('.json'):
+        comandos = nucleo.generar_comandos(nucleo.cargar_spec(archivo))
+        return optimizar(comandos) if optimizado else comandos
+    return leer_comandos(archivo)
+
+
+def cmd_generar(args):
+    """Genera la configuración de cada especificación"""
+    if args.salida:
+        os.makedirs(args.salida, exist_ok=True)
+    for archivo in args.specs:
+        comandos = comandos_de(archivo, not args.sin_optimizar)
+        if args.salida:
+            nombre = os.path.splitext(os.path.basename(archivo))[0]
+            with open(os.path.join(args.salida, f"{nombre}.txt"), 'w') as f:
+                f.write("\n".join(comandos) + "\n")
+        else:
+            print(f"! {archivo}")
+            print("\n".join(comandos))
+    return 0
+
+
+def cmd_lote(args):
+    """Renderiza un inventario completo usando varios procesos"""
+    from inventario import renderizar_inventario
+    
+    def al_avanzar(escritos, errores):
+        print(f"\r{escritos} configuraciones, {errores} errores", end="", file=sys.stderr)
+    
+    escritos, errores = renderizar_inventario(args.inventario, args.salida, args.procesos, al_avanzar=al_avanzar)
+    print(file=sys.stderr)
+    for fila, nombre, error in errores:
+        print(f"Fila {fila} ({nombre}): {error}", file=sys.stderr)
+    return 1 if errores else 0
+
+
+def cmd_desplegar(args):
+    """Envía configuraciones a uno o varios puertos en paralelo"""
+    # Importación diferida: generar no necesita pyserial
+    from consola import GestorSesiones
+    from aprovisionamiento import Aprovisionador
+    
+    if args.mapa:
+        base = os.path.dirname(args.mapa)
+        asignaciones = {
+            puerto: comandos_de(os.path.join(base, archivo), not args.sin_optimizar)
+            for puerto, archivo in leer_mapa(args.mapa)
+        }
+    elif args.puerto and args.archivo:
+        asignaciones = {args.puerto: comandos_de(args.archivo, not args.sin_optimizar)}
+    else:
+        print("Indica --mapa o --puerto y un archivo", file=sys.stderr)
+        return 2
+    
+    gestor = GestorSesiones(args.baudrate, velocidad_alta=args.acelerar)
+    cola = queue.Queue()
+    Aprovisionador(
+        gestor, asignaciones, cola,
+        consola_pass=args.consola_pass, enable_pass=args.enable_pass, solo_cambios=args.solo_cambios,
+        quitar_sobrantes=args.quitar_sobrantes,
+        pegar=args.pegar or bool(args.control_flujo), control_flujo=args.control_flujo
+    ).iniciar()
+    
+    fallos = 0
+    try:
+        while True:
+            tipo, puerto, dato = cola.get()
+            if tipo == 'fin':
+                resultado, duracion = dato
+                fallos += bool(resultado.errores)
+                print(f"{puerto}: {len(resultado.respuestas)} comandos en {duracion:.1f} s, "
+                      f"{len(resultado.errores)} rechazados")
+                for cmd, error in resultado.errores:
+                    print(f"{puerto}:   {cmd}: {error}")
+            elif tipo == 'error':
+                fallos += 1
+                print(f"{puerto}: error: {dato[0]}")
+            elif tipo == 'terminado':
+                print(f"Terminado en {dato:.1f} s")
+                break
+    finally:
+        gestor.cerrar_todas()
+    return 1 if fallos else 0
+
+
+def cmd_backup(args):
+    """Guarda en el almacén la running-config de uno o varios puertos a la vez"""
+    from concurrent.futures import ThreadPoolExecutor
+    from consola import GestorSesiones
+    from aprovisionamiento import MAX_PUERTOS_PARALELO
+    
+    almacen = AlmacenBackups(args.directorio)
+    gestor = GestorSesiones(args.baudrate, velocidad_alta=args.acelerar)
+    
+    def respaldar_puerto(puerto):
+        try:
+            sesion = gestor.obtener(puerto, args.consola_pass, args.enable_pass)
+            inicio = time.monotonic()
+            entrada, nueva, resultado = respaldar(sesion, almacen, forzar=args.forzar)
+        except Exception as e:
+            print(f"{puerto}: error: {e}")
+            return False
+        if resultado is None:
+            estado = "sin cambios (no descargado)"
+        else:
+            estado = "versión nueva" if nueva else "sin cambios"
+        aviso = "" if resultado is None or resultado.verificado else " (tamaño distinto del anunciado)"
+        print(f"{puerto}: {entrada['hostname']} {estado} {entrada['sha256'][:12]} "
+              f"en {time.monotonic() - inicio:.1f} s{aviso}")
+        return True
+    
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_PUERTOS_PARALELO) as pool:
+            correctos = list(pool.map(respaldar_puerto, args.puertos))
+    finally:
+        gestor.cerrar_todas()
+    return 0 if all(correctos) else 1
+
+
+def cmd_historial(args):
+    """Lista los backups guardados sin descomprimirlos"""
+    almacen = AlmacenBackups(args.directorio)
+    anterior = {}
+    for entrada in almacen.historial(args.hostname):
+        cambio = "*" if anterior.get(entrada['hostname']) != entrada['sha256'] else " "
+        anterior[entrada['hostname']] = entrada['sha256']
+        print(f"{entrada['fecha']} {cambio} {entrada['hostname']:<20} {entrada['sha256'][:12]} "
+              f"{entrada['lineas']:>6} líneas")
+    return 0
+
+
+def cmd_diferencias(args):
+    """Diff entre dos versiones guardadas (por defecto, las dos últimas del hostname)"""
+    almacen = AlmacenBackups(args.directorio)
+    try:
+        shas = [almacen.buscar(v)['sha256'] for v in args.versiones[:2]]
+    except KeyError as e:
+        print(e.args[0], file=sys.stderr)
+        return 2
+    if not shas:
+        shas = [v['sha256'] for v in almacen.versiones(args.hostname)[-2:]]
+    elif len(shas) == 1 and (ultimo := almacen.ultimo(args.hostname)):
+        shas.append(ultimo['sha256'])
+    if len(shas) < 2:
+        print(f"No hay dos versiones de {args.hostname}", file=sys.stderr)
+        return 2
+    print("\n".join(almacen.diferencias(*shas)))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Configurador de Router Cisco sin interfaz gráfica")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Muestra el registro detallado")
+    parser.add_argument("--log", help="Archivo de registro (rota por tamaño)")
+    parser.add_argument("--log-json", action="store_true", help="Escribe el archivo de registro como JSON Lines")
+    sub = parser.add_subparsers(dest="orden", required=True)
+    
+    p_generar = sub.add_parser("generar", help="Genera comandos a partir de especificaciones JSON")
+    p_generar.add_argument("specs", nargs="+", help="Archivos .json con los campos de plantillas/")
+    p_generar.add_argument("-o", "--salida", help="Directorio donde escribir un .txt por especificación")
+    p_generar.add_argument("--sin-optimizar", action="store_true", help="No une bloques ni agrupa interfaces")
+    p_generar.set_defaults(func=cmd_generar)
+    
+    p_lote = sub.add_parser("lote", help="Renderiza un inventario CSV o JSON Lines en paralelo")
+    p_lote.add_argument("inventario", help="CSV con columnas como las claves de plantillas/ o .jsonl")
+    p_lote.add_argument("-o", "--salida", required=True, help="Directorio de salida (un .txt por router)")
+    p_lote.add_argument("-j", "--procesos", type=int, help="Procesos a usar (por defecto, uno por CPU)")
+    p_lote.set_defaults(func=cmd_lote)
+    
+    p_desplegar = sub.add_parser("desplegar", help="Envía configuraciones por consola serial")
+    p_desplegar.add_argument("archivo", nargs="?", help="Especificación .json o comandos .txt")
+    p_desplegar.add_argument("-p", "--puerto", help="Puerto COM del router")
+    p_desplegar.add_argument("-m", "--mapa", help="CSV 'puerto,archivo' para varios routers a la vez")
+    p_desplegar.add_argument("-b", "--baudrate", type=int, default=9600)
+    p_desplegar.add_argument("--consola-pass", default="", help="Contraseña de consola actual")
+    p_desplegar.add_argument("--enable-pass", default="", help="Contraseña enable actual")
+    p_desplegar.add_argument("--sin-optimizar", action="store_true", help="Envía los comandos generados sin optimizar")
+    p_desplegar.add_argument("--solo-cambios", action="store_true",
+                             help="Lee la running-config y envía solo lo que cambia")
+    p_desplegar.add_argument("--quitar-sobrantes", action="store_true",
+                             help="Con --solo-cambios, quita también lo que la configuración ya no genera "
+                                  "(proceso de enrutamiento anterior, IPs, exclusiones DHCP...)")
+    p_desplegar.add_argument("--pegar", action="store_true",
+                             help="Envía en bloque regulado por el eco y reenvía solo las líneas dañadas")
+    p_desplegar.add_argument("--control-flujo", choices=("xonxoff", "rtscts"),
+                             help="Pega con control de flujo (el router debe tener 'flowcontrol' en line con 0)")
+    p_desplegar.add_argument("--acelerar", type=int, nargs="?", const=115200, choices=(19200, 38400, 57600, 115200),
+                             metavar="BAUDIOS",
+                             help="Sube la consola (por defecto a 115200) y la devuelve a --baudrate antes de guardar")
+    p_desplegar.set_defaults(func=cmd_desplegar)
+    
+    p_backup = sub.add_parser("backup", help="Guarda la running-config en el almacén de backups")
+    p_backup.add_argument("puertos", nargs="+", help="Puertos COM de los routers")
+    p_backup.add_argument("-d", "--directorio", default=DIRECTORIO_BACKUPS, help="Directorio del almacén")
+    p_backup.add_argument("-b", "--baudrate", type=int, default=9600)
+    p_backup.add_argument("--consola-pass", default="", help="Contraseña de consola actual")
+    p_backup.add_argument("--enable-pass", default="", help="Contraseña enable actual")
+    p_backup.add_argument("--acelerar", type=int, nargs="?", const=115200, choices=(19200, 38400, 57600, 115200),
+                          metavar="BAUDIOS", help="Sube la consola mientras dura la descarga")
+    p_backup.add_argument("--forzar", action="store_true",
+                          help="Descarga aunque la marca de último cambio del router no haya cambiado")
+    p_backup.set_defaults(func=cmd_backup)
+    
+    p_historial = sub.add_parser("historial", help="Lista los backups del almacén")
+    p_historial.add_argument("hostname", nargs="?", help="Solo los de este hostname")
+    p_historial.add_argument("-d", "--directorio", default=DIRECTORIO_BACKUPS, help="Directorio del almacén")
+    p_historial.set_defaults(func=cmd_historial)
+    
+    p_diferencias = sub.add_parser("diferencias", help="Compara dos versiones guardadas de un router")
+    p_diferencias.add_argument("hostname")
+    p_diferencias.add_argument("versiones", nargs="*", help="sha256 (o su principio) de una o dos versiones")
+    p_diferencias.add_argument("-d", "--directorio", default=DIRECTORIO_BACKUPS, help="Directorio del almacén")
+    p_diferencias.set_defaults(func=cmd_diferencias)
+    
+    args = parser.parse_args(argv)
+    configurar_registro(
+        args.log,
+        nivel=logging.DEBUG if args.verbose else logging.INFO,
+        formato_json=args.log_json,
+        nivel_consola=logging.NOTSET if args.verbose else logging.WARNING
+    )
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
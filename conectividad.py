@@ -0,0 +1,76 @@
+import re
+import logging
+import ipaddress
+from threading import Thread, Event
+
+from analizador_ios import parsear_ping, parsear_traceroute
+
+MAX_DESTINOS = 256
+REPETICIONES_PING = 5
+TIMEOUT_SONDA = 2       # Segundos que el router espera cada respuesta
+SALTOS_MAXIMOS = 15
+SEPARADORES = re.compile(r'[\s,;]+')
+
+
+def expandir_destinos(texto, maximo=MAX_DESTINOS):
+    """Convierte 'ip, nombre, red/prefijo ...' en una lista de destinos"""
+    destinos = []
+    for elemento in SEPARADORES.split(texto.strip()):
+        if not elemento:
+            continue
+        if '/' in elemento:
+            red = ipaddress.ip_network(elemento, strict=False)
+            hosts = red.hosts() if red.num_addresses > 1 else [red.network_address]
+            for host in hosts:
+                destinos.append(str(host))
+                if len(destinos) > maximo:
+                    break
+        else:
+            destinos.append(elemento)
+        if len(destinos) > maximo:
+            raise ValueError(f"Demasiados destinos (máximo {maximo})")
+    return destinos
+
+
+class BarridoConectividad:
+    """Lanza ping (y opcionalmente traceroute) a varios destinos y publica cada resultado"""
+    def __init__(self, sesion, destinos, cola, traceroute=False,
+                 repeticiones=REPETICIONES_PING, timeout=TIMEOUT_SONDA, saltos=SALTOS_MAXIMOS):
+        self.sesion = sesion
+        self.destinos = destinos
+        self.cola = cola
+        self.traceroute = traceroute
+        self.repeticiones = repeticiones
+        self.timeout = timeout
+        self.saltos = saltos
+        self._parar = Event()
+
+    def iniciar(self):
+        Thread(target=self._ejecutar, daemon=True).start()
+
+    def detener(self):
+        """Termina al acabar el destino en curso"""
+        self._parar.set()
+
+    def _ejecutar(self):
+        # Un router ejecuta un comando de consola cada vez: los destinos van seguidos y
+        # cada uno termina en cuanto vuelve el prompt, no tras un tiempo fijo
+        limite = (self.timeout + 1) * max(self.repeticiones, self.saltos * 3)
+        for destino in self.destinos:
+            if self._parar.is_set():
+                break
+            try:
+                salida = self.sesion.ejecutar(
+                    f"ping {destino} repeat {self.repeticiones} timeout {self.timeout}", timeout=limite
+                )
+                self.cola.put(('ping', destino, parsear_ping(salida), salida))
+                if self.traceroute:
+                    salida = self.sesion.ejecutar(
+                        f"traceroute {destino} numeric timeout {self.timeout} probe 3 ttl 1 {self.saltos}",
+                        timeout=limite
+                    )
+                    self.cola.put(('traceroute', destino, parsear_traceroute(salida), salida))
+            except Exception as e:
+                logging.error(f"Error probando {destino}: {e}")
+                self.cola.put(('error', destino, e, ''))
+        self.cola.put(('fin', None, None, ''))
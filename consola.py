@@ -0,0 +1,1172 @@
+import os
+import re
+import time
+import logging
+import queue
+import difflib
+import hashlib
+import threading
+from collections import deque
+import serial
+
+from nucleo import hostname_de
+from optimizador import CABECERAS
+from metricas import MedicionComando, MetricasSesion
+
+# Configuración del envío
+FIN_LINEA = "\n"
+VENTANA_COMANDOS = 8          # Comandos sin confirmar como máximo
+MAX_BYTES_EN_VUELO = 200      # No desbordar el buffer de entrada de la consola
+TIMEOUT_LECTURA = 0.1
+TIMEOUT_LECTOR = 0.5          # Espera bloqueante del hilo lector; solo limita el cierre
+TAM_BUFFER_RX = 64 * 1024     # Buffer del driver para ráfagas largas (show tech)
+TIMEOUT_RESPUESTA = 10        # Segundos sin datos antes de dar el comando por perdido
+TIMEOUT_LENTO = 60            # Para comandos que tardan (claves RSA, write memory)
+KEEPALIVE_INTERVALO = 120     # Menor que el exec-timeout por defecto (10 min)
+TAM_BLOQUE_PEGADO = 64        # Bytes por escritura al pegar un bloque de comandos
+VENTANA_PEGADO_FLUJO = 1024   # Bytes sin eco al pegar con control de flujo: frena el router
+CONTROLES_FLUJO = ('xonxoff', 'rtscts')
+VELOCIDADES = (9600, 19200, 38400, 57600, 115200)  # Las que admite 'speed' en line con 0
+TIMEOUT_VELOCIDAD = 3         # Segundos para que el router conteste tras cambiar de velocidad
+SILENCIO_PEGADO = 1.0         # Segundos en el prompt sin más eco para dar un bloque por terminado
+SILENCIO_VOLCADO = 1.0        # Ídem tras 'end' y el prompt cuando el tamaño anunciado no cuadra
+# Modo del prompt al que lleva cada cabecera de submodo
+MODOS_SUBMODO = (
+    ('interface range', 'config-if-range'), ('interface', 'config-if'), ('line', 'config-line'),
+    ('router', 'config-router'), ('vlan', 'config-vlan'), ('ip dhcp pool', 'dhcp-config'),
+)
+
+PATRON_TAMANO = re.compile(r'^Current configuration\s*:\s*(\d+) bytes')
+SUFIJO_PARCIAL = ".parcial"    # El backup se escribe aparte y solo sustituye al archivo si termina
+
+# Comandos que no se encadenan: pueden pedir confirmación o tardar mucho
+COMANDOS_BARRERA = ("enable", "crypto key", "write", "copy", "reload", "erase")
+# Guardan la running-config: antes hay que devolver la consola a su velocidad original
+COMANDOS_GUARDADO = re.compile(r'^(wr(ite)?(\s+mem(ory)?)?|copy\s+run\S*\s+start\S*)\s*$', re.I)
+
+# Prompt IOS al inicio de línea: Router>, Router#, Router(config-if)#
+PATRON_PROMPT = re.compile(r'^([A-Za-z0-9][\w.\-]*)(?:\(([\w\-]+)\))?([#>])')
+PATRON_PROMPT_COMPLETO = re.compile(r'^[A-Za-z0-9][\w.\-]*(?:\([\w\-]+\))?[#>]\s*$')
+# Preguntas interactivas: "modulus [512]: ", "[yes/no]: ", "[startup-config]?"
+PATRON_PREGUNTA = re.compile(r'(\[[^\]\r\n]*\]\s*[:?]|^Password:)\s*')
+PATRON_ERROR = re.compile(r'^%\s*(Invalid input|Incomplete command|Ambiguous command|Unknown command)')
+CARACTERES_CONTROL = re.compile(r'[\x00-\x08\x0b-\x1f\x7f]')
+RETROCESO = re.compile(r'[^\n\x08]\x08')
+PAGINADOR = "--More--"
+BORRAR_LINEA = b"\x15"  # Ctrl-U
+
+
+class ErrorConsola(Exception):
+    """Error de comunicación con la consola del router"""
+
+
+class CanalSerial:
+    """Adapta un serial.Serial a la interfaz escribir/leer del enviador"""
+    def __init__(self, ser):
+        self.ser = ser
+
+    def escribir(self, datos):
+        self.ser.write(datos)
+
+    def leer(self, timeout=TIMEOUT_LECTURA):
+        """Bloquea hasta que llegan datos o vence el timeout"""
+        if self.ser.timeout != timeout:
+            self.ser.timeout = timeout
+        return self.ser.read(self.ser.in_waiting or 1)
+
+
+class AnalizadorConsola:
+    """Separa la salida de la consola en respuestas delimitadas por el prompt"""
+    def __init__(self):
+        self.linea = ''
+        self.linea_contada = False
+        self.salida = []
+        self.ultimo_prompt = ''
+        self.modo = ''
+
+    def alimentar(self, texto):
+        """Procesa texto recibido y devuelve [(prompt, lineas_de_salida), ...]"""
+        eventos = []
+        texto = self.linea + texto.replace('\r', '')
+        # IOS borra "--More--" con retrocesos; aplicarlos antes de limpiar
+        while '\x08' in texto:
+            texto, n = RETROCESO.subn('', texto)
+            if not n:
+                break
+        partes = CARACTERES_CONTROL.sub('', texto).split('\n')
+        self.linea = partes.pop()
+
+        for linea in partes:
+            if self.linea_contada:
+                # El prompt ya se contó cuando llegó incompleto; el resto es eco
+                self.linea_contada = False
+            elif self._es_prompt(linea) or PATRON_PREGUNTA.search(linea):
+                eventos.append(self._cerrar(linea))
+            else:
+                self.salida.append(linea)
+
+        if not self.linea_contada and (
+            PATRON_PROMPT_COMPLETO.match(self.linea) or PATRON_PREGUNTA.search(self.linea)
+        ):
+            eventos.append(self._cerrar(self.linea))
+            self.linea_contada = True
+
+        return eventos
+
+    def _es_prompt(self, linea):
+        return PATRON_PROMPT.match(linea) is not None
+
+    def _cerrar(self, linea):
+        """Registra un prompt y devuelve la salida acumulada hasta él"""
+        if m := PATRON_PROMPT.match(linea):
+            self.ultimo_prompt = m.group(0)
+            self.modo = m.group(2) or ("privilegiado" if m.group(3) == "#" else "usuario")
+        salida, self.salida = self.salida, []
+        return linea, salida
+
+
+def clase_modo(modo):
+    """'exec', 'config' o 'submodo' a partir del modo de un prompt ('config-if' -> 'submodo')"""
+    if modo in ('usuario', 'privilegiado', '', None):
+        return 'exec'
+    return 'config' if modo == 'config' else 'submodo'
+
+
+def modo_submodo(cabecera):
+    """Modo del prompt tras una cabecera ('interface Fa0/1' -> 'config-if'), o None si no se conoce"""
+    cabecera = " ".join(cabecera.lower().split())
+    for prefijo, modo in MODOS_SUBMODO:
+        if cabecera.startswith(prefijo + " "):
+            return modo
+    return None
+
+
+def es_cambio_modo(cmd):
+    """configure terminal, exit o end: solo cambian de modo"""
+    palabras = cmd.lower().split()
+    if len(palabras) >= 2 and 'configure'.startswith(palabras[0]) and 'terminal'.startswith(palabras[1]):
+        return True
+    return palabras[:1] in (['exit'], ['end'])
+
+
+def contextos_comandos(comandos, modo_inicial='exec'):
+    """Modo en que debe ejecutarse cada comando y el índice de su cabecera de submodo
+
+    Devuelve ([(clase_modo, índice de cabecera o None), ...], clase de modo final).
+    """
+    contextos = []
+    modo, cabecera = modo_inicial, None
+    for i, cmd in enumerate(comandos):
+        contextos.append((modo, cabecera))
+        palabras = cmd.lower().split()
+        if not palabras:
+            continue
+        if modo == 'exec':
+            if len(palabras) >= 2 and 'configure'.startswith(palabras[0]) and 'terminal'.startswith(palabras[1]):
+                modo = 'config'
+        elif palabras[0] == 'end':
+            modo, cabecera = 'exec', None
+        elif palabras[0] == 'exit':
+            modo, cabecera = ('config' if modo == 'submodo' else 'exec'), None
+        elif CABECERAS.match(cmd.strip()):
+            modo, cabecera = 'submodo', i
+    return contextos, modo
+
+
+class SeguidorEco:
+    """Reconstruye a partir del eco de un bloque pegado qué recibió el router en cada prompt"""
+    def __init__(self, prompt):
+        self.linea = prompt  # El eco del primer comando sigue al prompt que ya se mostró
+        self.registros = []  # [(modo del prompt o None en exec, eco, líneas de salida)]
+        self.bytes_eco = 0
+
+    def alimentar(self, texto):
+        texto = self.linea + texto.replace('\r', '')
+        while '\x08' in texto:
+            texto, n = RETROCESO.subn('', texto)
+            if not n:
+                break
+        partes = CARACTERES_CONTROL.sub('', texto).split('\n')
+        self.linea = partes.pop()
+        for linea in partes:
+            if m := PATRON_PROMPT.match(linea):
+                self.registros.append((m.group(2), linea[m.end():].strip(), []))
+                self.bytes_eco += len(linea) - m.end() + 1
+            elif self.registros:
+                self.registros[-1][2].append(linea)
+
+    @property
+    def eco_total(self):
+        """Bytes de comandos que el router ya ha devuelto, incluida la línea en curso"""
+        m = PATRON_PROMPT.match(self.linea)
+        return self.bytes_eco + (len(self.linea) - m.end() if m else 0)
+
+    @property
+    def en_prompt(self):
+        return PATRON_PROMPT_COMPLETO.match(self.linea) is not None
+
+    @property
+    def esperando(self):
+        """El router espera entrada: está en el prompt, quizá con una línea a medias"""
+        return PATRON_PROMPT.match(self.linea) is not None
+
+
+class ResultadoEnvio:
+    """Respuestas y errores de un envío de comandos"""
+    def __init__(self):
+        self.respuestas = []
+        self.errores = []
+        self.duracion = 0.0
+
+
+class ResultadoBackup:
+    """Tamaño y huella de una running-config volcada a archivo"""
+    def __init__(self):
+        self.lineas = 0
+        self.bytes = 0  # De la configuración, contados como IOS: tras 'Current configuration'
+        self.bytes_declarados = None
+        self.sha256 = None  # Del archivo escrito
+        self.duracion = 0.0
+
+    @property
+    def verificado(self):
+        """Si el tamaño recibido coincide con el que anuncia el router"""
+        return self.bytes_declarados is not None and self.bytes == self.bytes_declarados
+
+
+class EnviadorComandos:
+    """Envía comandos encadenados confirmando cada uno con el prompt del router"""
+    def __init__(self, canal, ventana=VENTANA_COMANDOS, max_bytes=MAX_BYTES_EN_VUELO, metricas=None):
+        self.canal = canal
+        self.ventana = ventana
+        self.max_bytes = max_bytes
+        self.metricas = metricas
+        self.analizador = AnalizadorConsola()
+        self.bytes_leidos = 0
+        self._marca_bytes = 0
+
+    def _leer_eventos(self, timeout=TIMEOUT_LECTURA):
+        datos = self.canal.leer(timeout)
+        if not datos:
+            return None
+        self.bytes_leidos += len(datos)
+        return self.analizador.alimentar(datos.decode('ascii', errors='replace'))
+
+    def _escribir_comando(self, cmd):
+        """Escribe un comando; devuelve (bytes escritos, medición o None si no se mide)"""
+        datos = (cmd + FIN_LINEA).encode()
+        inicio = time.monotonic()
+        self.canal.escribir(datos)
+        if self.metricas is None:
+            return len(datos), None
+        return len(datos), MedicionComando(cmd, inicio, time.monotonic() - inicio, len(datos))
+
+    def _confirmar(self, medicion, ahora):
+        """Cierra la medición de un comando con los bytes recibidos desde el anterior"""
+        if medicion is None:
+            return
+        if medicion.primer_eco is None:
+            medicion.primer_eco = ahora
+        medicion.prompt = ahora
+        medicion.bytes_entrada = self.bytes_leidos - self._marca_bytes
+        self._marca_bytes = self.bytes_leidos
+        self.metricas.registrar(medicion)
+
+    def sincronizar(self, intentos=3, timeout=TIMEOUT_RESPUESTA):
+        """Despierta la consola y espera un prompt antes de enviar"""
+        for _ in range(intentos):
+            self.canal.escribir(FIN_LINEA.encode())
+            limite = time.monotonic() + timeout / intentos
+            while time.monotonic() < limite:
+                eventos = self._leer_eventos()
+                if eventos:
+                    # Consumir prompts adicionales de salida pendiente
+                    while (mas := self._leer_eventos(timeout=0.2)) is not None:
+                        eventos.extend(mas)
+                    return eventos[-1][0]
+        raise ErrorConsola("El router no muestra el prompt")
+
+    def descartar_pendiente(self):
+        """Consume sin esperar la salida no solicitada (logs, prompts repetidos)"""
+        while self._leer_eventos(timeout=0) is not None:
+            pass
+
+    def ejecutar(self, comando, timeout=TIMEOUT_RESPUESTA):
+        """Envía un comando y devuelve (prompt, salida) al volver al prompt"""
+        self._marca_bytes = self.bytes_leidos
+        _, medicion = self._escribir_comando(comando)
+        ultimo_dato = time.monotonic()
+        respondida_en = -1  # Líneas de salida que había al responder al último --More--
+        while True:
+            eventos = self._leer_eventos()
+            if eventos is None:
+                if time.monotonic() - ultimo_dato > timeout:
+                    raise ErrorConsola(f"Sin respuesta del router al comando '{comando}'")
+                continue
+            ultimo_dato = time.monotonic()
+            if medicion and medicion.primer_eco is None:
+                medicion.primer_eco = ultimo_dato
+            if eventos:
+                self._confirmar(medicion, ultimo_dato)
+                return eventos[0]
+            # Avanzar el paginador si la salida no cabe en pantalla; cada página
+            # nueva trae líneas, aunque llegue en el mismo bloque que el --More-- anterior
+            if PAGINADOR in self.analizador.linea and len(self.analizador.salida) != respondida_en:
+                self.canal.escribir(b" ")
+                respondida_en = len(self.analizador.salida)
+
+    def volcar(self, comando, escribir, timeout=TIMEOUT_RESPUESTA, ultima="end", completa=None):
+        """Ejecuta un comando pasando cada línea de salida a escribir() según llega
+
+        Para salidas largas que no conviene acumular, como la running-config. Solo
+        termina con el prompt que sigue a la línea 'ultima': una línea con forma de
+        prompt en medio de la salida (un banner) se trata como salida. Si completa()
+        dice que aún falta, ese prompt solo cuenta cuando el router deja de enviar.
+        Devuelve el prompt.
+        """
+        self._marca_bytes = self.bytes_leidos
+        _, medicion = self._escribir_comando(comando)
+        ultimo_dato = time.monotonic()
+        anterior = None  # Última línea pasada a escribir()
+        rechazo = None
+        pendiente = None  # (prompt tras 'ultima' que completa() no dio por bueno, si estaba incompleto)
+        lineas = 0
+        respondida_en = -1
+
+        def pasar(salida):
+            nonlocal anterior, rechazo, lineas, pendiente
+            if pendiente is not None:
+                # Llegó más: no era el final. Si estaba incompleto, llegará entero como salida
+                prompt, parcial = pendiente
+                pendiente = None
+                if not parcial:
+                    pasar([prompt])
+            for linea in salida:
+                escribir(linea)
+                anterior = linea
+                lineas += 1
+                if rechazo is None and PATRON_ERROR.match(linea):
+                    rechazo = linea
+
+        while True:
+            eventos = self._leer_eventos()
+            if eventos is None:
+                silencio = time.monotonic() - ultimo_dato
+                if pendiente is not None and silencio > SILENCIO_VOLCADO:
+                    prompt, parcial = pendiente
+                    self.analizador.linea_contada = parcial
+                    self._confirmar(medicion, ultimo_dato)
+                    return prompt
+                if silencio > timeout:
+                    raise ErrorConsola(f"Salida incompleta de '{comando}' tras {lineas} líneas")
+                continue
+            ultimo_dato = time.monotonic()
+            if medicion and medicion.primer_eco is None:
+                medicion.primer_eco = ultimo_dato
+            for j, (prompt, salida) in enumerate(eventos):
+                pasar(salida)
+                parcial = j == len(eventos) - 1 and self.analizador.linea_contada
+                if anterior is not None and anterior.strip() == ultima:
+                    if completa is None or completa():
+                        self._confirmar(medicion, ultimo_dato)
+                        self.analizador.salida = []
+                        return prompt
+                    pendiente = (prompt, parcial)
+                elif rechazo is not None:
+                    raise ErrorConsola(f"El router rechazó '{comando}': {rechazo}")
+                elif not parcial:
+                    pasar([prompt])
+                if parcial:
+                    # Línea aún incompleta: cuando llegue entera se tratará como salida
+                    self.analizador.linea_contada = False
+            # Lo que llega se escribe ya, sin esperar al prompt
+            if self.analizador.salida:
+                pasar(self.analizador.salida)
+                self.analizador.salida = []
+            if PAGINADOR in self.analizador.linea and lineas != respondida_en:
+                self.canal.escribir(b" ")
+                respondida_en = lineas
+
+    def enviar(self, comandos, al_confirmar=None, ventana=None):
+        """Envía la lista de comandos manteniendo una ventana acotada en vuelo
+
+        ventana (por defecto la del enviador) es el máximo de comandos sin confirmar;
+        con 1 cada comando espera al prompt del anterior.
+        """
+        ventana = ventana or self.ventana
+        resultado = ResultadoEnvio()
+        inicio = time.monotonic()
+        en_vuelo = deque()
+        bytes_en_vuelo = 0
+        siguiente = 0
+        ultimo_dato = time.monotonic()
+        self._marca_bytes = self.bytes_leidos
+
+        while siguiente < len(comandos) or en_vuelo:
+            while siguiente < len(comandos) and self._hay_hueco(en_vuelo, bytes_en_vuelo, comandos[siguiente], ventana):
+                cmd = comandos[siguiente]
+                # La respuesta a una barrera (p. ej. el tamaño de clave RSA) también tarda
+                lento = self._es_barrera(cmd) or (siguiente > 0 and self._es_barrera(comandos[siguiente - 1]))
+                tam, medicion = self._escribir_comando(cmd)
+                en_vuelo.append((cmd, tam, lento, medicion))
+                bytes_en_vuelo += tam
+                siguiente += 1
+                ultimo_dato = time.monotonic()
+
+            eventos = self._leer_eventos()
+            if eventos is None:
+                cmd, _, lento, _ = en_vuelo[0]
+                limite = TIMEOUT_LENTO if lento else TIMEOUT_RESPUESTA
+                if time.monotonic() - ultimo_dato > limite:
+                    raise ErrorConsola(f"Sin respuesta del router al comando '{cmd}'")
+                continue
+
+            ultimo_dato = time.monotonic()
+            # El primer dato tras escribir un comando y confirmar el anterior es su eco
+            if en_vuelo and (medicion := en_vuelo[0][3]) and medicion.primer_eco is None:
+                medicion.primer_eco = ultimo_dato
+            for _prompt, salida in eventos:
+                if not en_vuelo:
+                    break
+                cmd, tam, _, medicion = en_vuelo.popleft()
+                bytes_en_vuelo -= tam
+                self._confirmar(medicion, ultimo_dato)
+                resultado.respuestas.append((cmd, salida))
+                resultado.errores.extend((cmd, l) for l in salida if PATRON_ERROR.match(l))
+                if al_confirmar:
+                    al_confirmar(len(resultado.respuestas), cmd, salida)
+            if en_vuelo and self.analizador.linea and (medicion := en_vuelo[0][3]) and medicion.primer_eco is None:
+                medicion.primer_eco = ultimo_dato
+
+        resultado.duracion = time.monotonic() - inicio
+        if self.metricas is not None:
+            self.metricas.registrar_envio(len(comandos), resultado.duracion)
+        logging.debug(f"{len(comandos)} comandos confirmados en {resultado.duracion:.1f} s")
+        return resultado
+
+    def pegar(self, comandos, al_confirmar=None, max_bytes=None):
+        """Envía los comandos como un bloque continuo, regulado solo por el eco del router
+
+        No espera el prompt de cada comando: limita lo escrito que el router todavía no
+        ha devuelto como eco a max_bytes. Al terminar compara el eco y el modo de cada
+        prompt con lo enviado y reenvía uno a uno, con su cabecera de submodo, solo los
+        comandos que llegaron mal. Los comandos barrera y la línea que les sigue (la
+        respuesta a su pregunta) se envían siempre con enviar().
+        """
+        resultado = ResultadoEnvio()
+        inicio = time.monotonic()
+        i = 0
+        while i < len(comandos):
+            fin = i
+            while fin < len(comandos) and not self._es_barrera(comandos[fin]):
+                fin += 1
+            hechos = len(resultado.respuestas)
+            avance = al_confirmar and (lambda n, cmd, salida: al_confirmar(hechos + n, cmd, salida))
+            if fin == i:
+                fin = i + 2
+                tramo = self.enviar(comandos[i:fin], avance)
+            else:
+                tramo = self._pegar_tramo(comandos[i:fin], max_bytes or self.max_bytes, avance)
+            resultado.respuestas.extend(tramo.respuestas)
+            resultado.errores.extend(tramo.errores)
+            i = fin
+        resultado.duracion = time.monotonic() - inicio
+        return resultado
+
+    def _pegar_tramo(self, comandos, max_bytes, al_confirmar=None):
+        """Pega comandos sin barreras y reenvía los que el eco muestra dañados"""
+        inicio = time.monotonic()
+        comandos = [c.strip() for c in comandos]
+        flujo = "".join(c + FIN_LINEA for c in comandos).encode()
+        contextos, final = contextos_comandos(comandos, clase_modo(self.analizador.modo))
+        seguidor = SeguidorEco(self.analizador.ultimo_prompt)
+        escritos = 0
+        confirmados = 0
+        ultimo_dato = time.monotonic()
+
+        while True:
+            while escritos < len(flujo) and (hueco := max_bytes - (escritos - seguidor.eco_total)) > 0:
+                trozo = flujo[escritos:escritos + min(TAM_BLOQUE_PEGADO, hueco)]
+                self.canal.escribir(trozo)
+                escritos += len(trozo)
+                ultimo_dato = time.monotonic()
+            datos = self.canal.leer(TIMEOUT_LECTURA)
+            if not datos:
+                silencio = time.monotonic() - ultimo_dato
+                # Con líneas perdidas nunca llegan todos los prompts: basta con que el router
+                # se quede en el prompt después de haberlo recibido todo
+                if (escritos == len(flujo) and seguidor.esperando and silencio > SILENCIO_PEGADO) \
+                        or silencio > TIMEOUT_RESPUESTA:
+                    break
+                continue
+            ultimo_dato = time.monotonic()
+            self.bytes_leidos += len(datos)
+            texto = datos.decode('ascii', errors='replace')
+            self.analizador.alimentar(texto)
+            seguidor.alimentar(texto)
+            # Un comando ha terminado cuando aparece el prompt del siguiente
+            completos = len(seguidor.registros) - (0 if seguidor.en_prompt else 1)
+            while al_confirmar and confirmados < min(completos, len(comandos)):
+                confirmados += 1
+                al_confirmar(confirmados, comandos[confirmados - 1], seguidor.registros[confirmados - 1][2])
+            if escritos == len(flujo) and len(seguidor.registros) >= len(comandos) and seguidor.en_prompt:
+                break
+
+        resultado = ResultadoEnvio()
+        afectados = set()
+        registros = seguidor.registros
+        emparejador = difflib.SequenceMatcher(None, comandos, [r[1] for r in registros], autojunk=False)
+        for etiqueta, a1, a2, b1, _ in emparejador.get_opcodes():
+            if etiqueta == 'equal':
+                for k in range(a2 - a1):
+                    modo, _, salida = registros[b1 + k]
+                    clase, cabecera = contextos[a1 + k]
+                    esperado = modo_submodo(comandos[cabecera]) if cabecera is not None else None
+                    if clase_modo(modo) != clase or (esperado and modo != esperado):
+                        # Llegó bien pero en otro modo: se perdió su cabecera o un exit
+                        afectados.add(a1 + k)
+                        continue
+                    resultado.respuestas.append((comandos[a1 + k], salida))
+                    resultado.errores.extend((comandos[a1 + k], l) for l in salida if PATRON_ERROR.match(l))
+            elif etiqueta in ('replace', 'delete'):
+                afectados.update(range(a1, a2))
+
+        if not seguidor.en_prompt:
+            # Se perdió un salto de línea al final: se borra la línea a medias (Ctrl-U)
+            self.canal.escribir(BORRAR_LINEA)
+            self.sincronizar()
+        if afectados:
+            reenvio = self._reenvio(comandos, contextos, final, afectados)
+            logging.warning(f"{len(afectados)} de {len(comandos)} comandos pegados llegaron mal; "
+                            f"reenviando {len(reenvio)} líneas")
+            # Lo pegado ya desbordó el buffer del router: la ventana normal podría volver
+            # a hacerlo y una línea perdida aquí no tendría arreglo
+            tramo = self.enviar(reenvio, ventana=1)
+            resultado.respuestas.extend(tramo.respuestas)
+            resultado.errores.extend(tramo.errores)
+        resultado.duracion = time.monotonic() - inicio
+        if self.metricas is not None:
+            self.metricas.registrar_envio(len(comandos), resultado.duracion)
+        return resultado
+
+    def _reenvio(self, comandos, contextos, final, afectados):
+        """Líneas que reenvían los comandos afectados en su modo y vuelven al modo final"""
+        pendientes = set()
+        for i in afectados:
+            if es_cambio_modo(comandos[i]):
+                continue  # Los cambios de modo los pone el recorrido de abajo
+            pendientes.add(i)
+            if CABECERAS.match(comandos[i]):
+                # Sus subcomandos se aplicaron a la sección anterior: se repiten los dos bloques
+                # para dejar cada subcomando en la suya
+                anterior = next((c for _, c in reversed(contextos[:i]) if c is not None), None)
+                for cabecera in (anterior, i):
+                    if cabecera is not None:
+                        pendientes.add(cabecera)
+                        pendientes.update(
+                            j for j, (_, c) in enumerate(contextos)
+                            if c == cabecera and not es_cambio_modo(comandos[j])
+                        )
+
+        lineas = []
+        modo, cabecera = clase_modo(self.analizador.modo), None
+
+        def ir_a(destino):
+            nonlocal modo, cabecera
+            if destino == 'exec' and modo != 'exec':
+                lineas.append("end")
+            elif destino != 'exec' and modo == 'exec':
+                lineas.append("configure terminal")
+            elif destino == 'config' and modo == 'submodo':
+                lineas.append("exit")
+            if destino != 'submodo' or modo == 'exec':
+                modo, cabecera = ('config' if destino == 'submodo' else destino), None
+
+        for i in sorted(pendientes):
+            destino, cab = contextos[i]
+            if destino != 'exec' and CABECERAS.match(comandos[i]):
+                ir_a('submodo')
+                modo, cabecera = 'submodo', i
+            elif destino == 'submodo':
+                ir_a('submodo')
+                if cab is not None and cab != cabecera:
+                    lineas.append(comandos[cab])
+                    modo, cabecera = 'submodo', cab
+            else:
+                ir_a(destino)
+            lineas.append(comandos[i])
+        if final != 'submodo':
+            ir_a(final)
+        return lineas
+
+    def _es_barrera(self, cmd):
+        return cmd.strip().startswith(COMANDOS_BARRERA)
+
+    def _hay_hueco(self, en_vuelo, bytes_en_vuelo, cmd, ventana):
+        """Indica si el siguiente comando cabe en la ventana"""
+        if not en_vuelo:
+            return True
+        if self._es_barrera(cmd) or self._es_barrera(en_vuelo[-1][0]):
+            return False
+        return len(en_vuelo) < ventana and bytes_en_vuelo + len(cmd) + 1 <= self.max_bytes
+
+
+class PuertoCompartido:
+    """Único lector de un puerto COM que reparte lo recibido entre suscriptores"""
+    def __init__(self, puerto, baudrate=9600):
+        self.puerto = puerto
+        self.ser = serial.Serial(puerto, baudrate, timeout=TIMEOUT_LECTOR)
+        if hasattr(self.ser, 'set_buffer_size'):
+            self.ser.set_buffer_size(rx_size=TAM_BUFFER_RX)
+        self.suscripciones = []
+        self.error = None
+        # Árbitro de escritura: quien lo tiene escribe sin que otros intercalen comandos
+        self.turno = threading.RLock()
+        self._bloqueo = threading.Lock()
+        self._activo = True
+        threading.Thread(target=self._leer, daemon=True).start()
+        logging.info(f"Puerto {puerto} abierto")
+
+    @property
+    def cerrado(self):
+        return not self._activo
+
+    def suscribir(self):
+        """Crea una suscripción que recibe todo lo que llegue desde ahora"""
+        suscripcion = Suscripcion(self)
+        with self._bloqueo:
+            self.suscripciones.append(suscripcion)
+        return suscripcion
+
+    def desuscribir(self, suscripcion):
+        with self._bloqueo:
+            if suscripcion in self.suscripciones:
+                self.suscripciones.remove(suscripcion)
+
+    def escribir(self, datos):
+        """Escribe respetando el turno de quien esté ejecutando una operación"""
+        if self.error:
+            raise self.error
+        with self.turno:
+            self.ser.write(datos)
+
+    @property
+    def baudrate(self):
+        return self.ser.baudrate
+
+    def cambiar_velocidad(self, baudios):
+        """Espera a que salga lo ya escrito y cambia la velocidad del puerto local"""
+        with self.turno:
+            self.ser.flush()
+            self.ser.baudrate = baudios
+
+    def fijar_control_flujo(self, tipo=None):
+        """Activa el control de flujo 'xonxoff' (software) o 'rtscts' (hardware); None lo quita"""
+        if tipo is not None and tipo not in CONTROLES_FLUJO:
+            raise ValueError(f"Control de flujo desconocido: {tipo}")
+        with self.turno:
+            self.ser.xonxoff = tipo == 'xonxoff'
+            self.ser.rtscts = tipo == 'rtscts'
+
+    def _leer(self):
+        """Hilo lector: el único que lee del puerto"""
+        while self._activo:
+            try:
+                # Bloquea hasta el primer byte (sin consumir CPU) y vacía la ráfaga de una vez
+                datos = self.ser.read(1)
+                if datos and (pendientes := self.ser.in_waiting):
+                    datos += self.ser.read(pendientes)
+            except Exception as e:
+                if self._activo:
+                    logging.error(f"Error lectura serial en {self.puerto}: {e}")
+                    self.error = e if isinstance(e, OSError) else OSError(str(e))
+                break
+            if datos:
+                with self._bloqueo:
+                    suscripciones = list(self.suscripciones)
+                for suscripcion in suscripciones:
+                    suscripcion.cola.put(datos)
+        self._activo = False
+
+    def cerrar(self):
+        """Detiene el lector y libera el puerto"""
+        self._activo = False
+        if hasattr(self.ser, 'cancel_read'):
+            self.ser.cancel_read()
+        if self.ser.is_open:
+            self.ser.close()
+        logging.info(f"Puerto {self.puerto} cerrado")
+
+
+class Suscripcion:
+    """Canal de un consumidor del puerto compartido (interfaz escribir/leer)"""
+    def __init__(self, compartido):
+        self.compartido = compartido
+        self.cola = queue.Queue()
+
+    def escribir(self, datos):
+        self.compartido.escribir(datos)
+
+    def leer(self, timeout=TIMEOUT_LECTURA):
+        """Devuelve todo lo pendiente, esperando hasta timeout si no hay nada"""
+        try:
+            partes = [self.cola.get(timeout=timeout) if timeout else self.cola.get_nowait()]
+        except queue.Empty:
+            if self.compartido.error:
+                raise self.compartido.error
+            return b''
+        while True:
+            try:
+                partes.append(self.cola.get_nowait())
+            except queue.Empty:
+                return b''.join(partes)
+
+    def cerrar(self):
+        self.compartido.desuscribir(self)
+
+
+class SesionConsola:
+    """Sesión de consola persistente que se mantiene en modo privilegiado"""
+    def __init__(self, puerto, gestor, consola_pass='', enable_pass=''):
+        self.puerto = puerto
+        self.gestor = gestor
+        self.consola_pass = consola_pass
+        self.enable_pass = enable_pass
+        self.suscripcion = None
+        self.enviador = None
+        self.bloqueo = threading.RLock()
+        self.ultimo_uso = 0.0
+        # Sobrevive a las reaperturas: acumula todo lo medido en este puerto
+        self.metricas = MetricasSesion(puerto)
+        self.velocidad_original = None  # Velocidad a la que devolver la consola si se subió
+        self.aceleracion_fallida = False  # No volver a intentarlo en esta sesión
+        self.sin_acelerar = 0  # Operaciones en curso que no deben subir la velocidad
+        self._marca_transferencia = None
+        self._niveles = []  # Puerto compartido de cada 'with' en curso, del más externo al más interno
+        self._cerrar_al_salir = False
+
+    @property
+    def abierta(self):
+        return self.suscripcion is not None and not self.suscripcion.compartido.cerrado
+
+    def abrir(self):
+        """Se suscribe al puerto compartido y prepara el enviador"""
+        self.suscripcion = self.gestor.compartido(self.puerto).suscribir()
+        self.enviador = EnviadorComandos(self.suscripcion, metricas=self.metricas)
+        self.ultimo_uso = 0.0
+        logging.info(f"Sesión abierta en {self.puerto}", extra={'puerto': self.puerto})
+
+    def cerrar(self):
+        """Abandona el puerto; la próxima operación volverá a suscribirse"""
+        with self.bloqueo:
+            if self.suscripcion:
+                self.suscripcion.cerrar()
+                logging.info(f"Sesión cerrada en {self.puerto}", extra={'puerto': self.puerto})
+            self.suscripcion = None
+            self.enviador = None
+
+    def __enter__(self):
+        self.bloqueo.acquire()
+        try:
+            if not self.abierta:
+                self.abrir()
+            compartido = self.suscripcion.compartido
+            compartido.turno.acquire()
+        except Exception:
+            self.bloqueo.release()
+            raise
+        # Un 'with' anidado (p. ej. enviar_config dentro de otro 'with sesion') apila su nivel:
+        # cada salida libera el turno que tomó y solo la más externa cierra la sesión
+        self._niveles.append(compartido)
+        try:
+            self._preparar()
+            if self.gestor.velocidad_alta and self.velocidad_original is None and not self.aceleracion_fallida \
+                    and not self.sin_acelerar:
+                self._acelerar(self.gestor.velocidad_alta)
+        except Exception as e:
+            self.__exit__(type(e), e, None)
+            raise
+        if len(self._niveles) == 1:
+            self._marca_transferencia = (self.enviador.bytes_leidos, time.monotonic())
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        compartido = self._niveles.pop()
+        try:
+            self.ultimo_uso = time.monotonic()
+            if isinstance(valor, ErrorConsola) and self.velocidad_original is not None and self.abierta:
+                # El router dejó de contestar a la velocidad alta: volver a la original
+                self._recuperar_velocidad()
+            if isinstance(valor, (OSError, ErrorConsola)):
+                # Puerto desconectado o consola desincronizada: empezar de cero
+                self._cerrar_al_salir = True
+            if not self._niveles:
+                if self._marca_transferencia and self.enviador:
+                    bytes_leidos, inicio = self._marca_transferencia
+                    self.metricas.registrar_transferencia(
+                        compartido.baudrate, self.enviador.bytes_leidos - bytes_leidos, self.ultimo_uso - inicio
+                    )
+                self._marca_transferencia = None
+        finally:
+            compartido.turno.release()
+            if not self._niveles and self._cerrar_al_salir:
+                self._cerrar_al_salir = False
+                self.cerrar()
+            self.bloqueo.release()
+        return False
+
+    def acelerar(self, baudios):
+        """Sube la velocidad de la consola del router y la del puerto local mientras dure la sesión
+
+        Devuelve True si el router contesta a la nueva velocidad; si no, sigue a la
+        anterior y no se vuelve a intentar en esta sesión.
+        """
+        with self:
+            return self._acelerar(baudios)
+
+    def _acelerar(self, baudios):
+        anterior = self.suscripcion.compartido.baudrate
+        if baudios == anterior or self.velocidad_original is not None:
+            return baudios == anterior
+        try:
+            acelerada = self._cambiar_velocidad(baudios)
+        except ErrorConsola:
+            # Que __exit__ busque a qué velocidad quedó el router y lo devuelva a la anterior
+            self.velocidad_original = anterior
+            raise
+        if acelerada:
+            self.velocidad_original = anterior
+            logging.info(f"{self.puerto}: consola a {baudios} baudios", extra={'puerto': self.puerto})
+            return True
+        self.aceleracion_fallida = True
+        logging.warning(f"{self.puerto}: el router no admite {baudios} baudios; se sigue a {anterior}",
+                        extra={'puerto': self.puerto})
+        return False
+
+    def restaurar_velocidad(self):
+        """Devuelve la consola a la velocidad que tenía antes de acelerar"""
+        if self.velocidad_original is None or not self.abierta:
+            return
+        with self:
+            self._restaurar()
+
+    def _restaurar(self):
+        alta, original = self.suscripcion.compartido.baudrate, self.velocidad_original
+        if not self._cambiar_velocidad(original):
+            raise ErrorConsola(f"No se pudo devolver la consola a {original} baudios")
+        self.velocidad_original = None
+        ritmos = self.metricas.ritmo_por_velocidad()
+        if ritmos.get(alta) and ritmos.get(original):
+            logging.info(
+                f"{self.puerto}: {ritmos[alta]:.0f} B/s a {alta} baudios frente a {ritmos[original]:.0f} B/s "
+                f"a {original} (x{ritmos[alta] / ritmos[original]:.1f})", extra={'puerto': self.puerto}
+            )
+
+    def _cambiar_velocidad(self, baudios):
+        """Cambia 'speed' en line con 0 y el puerto local; True si el router contesta a la nueva"""
+        compartido = self.suscripcion.compartido
+        anterior = compartido.baudrate
+        self.enviador.enviar(["configure terminal", "line con 0"])
+        # El router cambia al procesar la línea: su prompt ya llega a la nueva velocidad
+        orden = f"speed {baudios}"
+        self.enviador.canal.escribir(f"{orden}{FIN_LINEA}".encode())
+        # Su eco aún llega a la velocidad anterior: hasta verlo, la línea no ha salido entera
+        eco, limite = b"", time.monotonic() + TIMEOUT_VELOCIDAD
+        while orden.encode() not in eco and time.monotonic() < limite:
+            eco += self.enviador.canal.leer(timeout=0.1)
+        for velocidad in (baudios, anterior):
+            compartido.cambiar_velocidad(velocidad)
+            try:
+                self.enviador.descartar_pendiente()
+                self.enviador.sincronizar(timeout=TIMEOUT_VELOCIDAD)
+            except ErrorConsola:
+                continue
+            self.enviador.ejecutar("end")
+            return velocidad == baudios
+        raise ErrorConsola(f"La consola no responde tras pasar a {baudios} baudios")
+
+    def _recuperar_velocidad(self):
+        """Busca la velocidad a la que contesta el router y lo deja en la original"""
+        compartido = self.suscripcion.compartido
+        original = self.velocidad_original
+        self.aceleracion_fallida = True
+        for baudios in (original, compartido.baudrate) + VELOCIDADES:
+            try:
+                compartido.cambiar_velocidad(baudios)
+                self.enviador.descartar_pendiente()
+                self.enviador.sincronizar(timeout=TIMEOUT_VELOCIDAD)
+                if baudios != original:
+                    self._restaurar()
+                self.velocidad_original = None
+                logging.warning(f"{self.puerto}: consola recuperada a {original} baudios",
+                                extra={'puerto': self.puerto})
+                return
+            except (ErrorConsola, OSError):
+                continue
+        logging.error(f"{self.puerto}: el router no contesta a ninguna velocidad", extra={'puerto': self.puerto})
+
+    def _enviar_guardando(self, comandos, enviar, al_confirmar):
+        """Envía con enviar(); con la consola acelerada, la restaura antes del primer guardado
+
+        Si no, 'write memory' dejaría 'speed' guardado en la startup-config.
+        """
+        corte = next((i for i, c in enumerate(comandos) if COMANDOS_GUARDADO.match(c.strip())), None)
+        if self.velocidad_original is None or corte is None:
+            return enviar(comandos, al_confirmar)
+        resultado = enviar(comandos[:corte], al_confirmar)
+        self._restaurar()
+        avance = al_confirmar and (lambda n, cmd, salida: al_confirmar(corte + n, cmd, salida))
+        resto = enviar(comandos[corte:], avance)
+        resultado.respuestas.extend(resto.respuestas)
+        resultado.errores.extend(resto.errores)
+        resultado.duracion += resto.duracion
+        return resultado
+
+    def _preparar(self):
+        """Deja la consola en modo privilegiado, reutilizando el estado si es reciente"""
+        analizador = self.enviador.analizador
+        reciente = time.monotonic() - self.ultimo_uso < KEEPALIVE_INTERVALO
+        if reciente and analizador.modo == "privilegiado":
+            self.enviador.descartar_pendiente()
+            if analizador.modo == "privilegiado":
+                return
+
+        linea = self.enviador.sincronizar()
+        for _ in range(4):
+            if linea.startswith("Password"):
+                clave = self.enable_pass if analizador.modo == "usuario" else self.consola_pass
+                if not clave:
+                    raise ErrorConsola("El router pide una contraseña")
+                linea, _ = self.enviador.ejecutar(clave)
+            elif analizador.modo == "usuario":
+                linea, _ = self.enviador.ejecutar("enable")
+            elif analizador.modo != "privilegiado":
+                linea, _ = self.enviador.ejecutar("end")
+            else:
+                return
+        raise ErrorConsola("No se pudo entrar en modo privilegiado")
+
+    def ejecutar(self, comando, timeout=TIMEOUT_RESPUESTA, acelerar=True):
+        """Ejecuta un comando y devuelve su salida como texto
+
+        Con acelerar=False no se sube la velocidad de la consola para él: 'speed'
+        cambia la marca de último cambio de configuración del router.
+        """
+        with self.bloqueo:
+            self.sin_acelerar += not acelerar
+            try:
+                with self:
+                    _, salida = self.enviador.ejecutar(comando, timeout)
+                    return "\n".join(salida)
+            finally:
+                self.sin_acelerar -= not acelerar
+
+    def guardar_running(self, archivo, al_recibir=None, timeout=TIMEOUT_LENTO):
+        """Vuelca la running-config a un archivo a medida que llega, sin paginar
+
+        Termina en cuanto el router muestra el prompt tras 'end'. Devuelve un
+        ResultadoBackup con el tamaño (para compararlo con 'Current configuration')
+        y el sha256 del archivo; al_recibir(lineas) permite mostrar el avance. Si
+        falla, el archivo anterior queda como estaba. Con la consola acelerada no se
+        guarda el 'speed' de line con 0, que solo dura lo que la sesión.
+        """
+        resultado = ResultadoBackup()
+        huella = hashlib.sha256()
+        parcial = archivo + SUFIJO_PARCIAL
+        inicio = time.monotonic()
+        seccion = None
+        try:
+            with open(parcial, 'w', encoding='utf-8', newline='\n') as f:
+                def escribir(linea):
+                    nonlocal seccion
+                    texto = linea + "\n"
+                    if not linea[:1].isspace():
+                        seccion = linea.strip()
+                    elif self.velocidad_original is not None and seccion == "line con 0" \
+                            and linea.split() == ["speed", str(self.suscripcion.compartido.baudrate)]:
+                        return
+                    f.write(texto)
+                    huella.update(texto.encode('utf-8'))
+                    resultado.lineas += 1
+                    if al_recibir and resultado.lineas % 50 == 0:
+                        al_recibir(resultado.lineas)
+
+                resultado.bytes, resultado.bytes_declarados = self._volcar_running(escribir, timeout)
+            os.replace(parcial, archivo)
+        except BaseException:
+            if os.path.exists(parcial):
+                os.remove(parcial)
+            raise
+        resultado.sha256 = huella.hexdigest()
+        resultado.duracion = time.monotonic() - inicio
+        if not resultado.verificado:
+            logging.warning(
+                f"{self.puerto}: backup de {resultado.bytes} bytes, el router anunciaba {resultado.bytes_declarados}",
+                extra={'puerto': self.puerto}
+            )
+        logging.info(
+            f"{self.puerto}: backup de {resultado.lineas} líneas en {resultado.duracion:.1f} s "
+            f"(sha256 {resultado.sha256[:12]})", extra={'puerto': self.puerto, 'duracion': resultado.duracion}
+        )
+        return resultado
+
+    def leer_running(self, timeout=TIMEOUT_LENTO):
+        """Texto de la running-config, leído con la misma detección del final que guardar_running
+
+        A diferencia de ejecutar(), una línea con forma de prompt en un banner no la corta.
+        """
+        lineas = []
+        self._volcar_running(lineas.append, timeout)
+        return "\n".join(lineas)
+
+    def _volcar_running(self, escribir, timeout):
+        """Pasa cada línea de la running-config a escribir()
+
+        Termina con el prompt tras 'end' cuando ya han llegado los bytes que anuncia
+        'Current configuration'. Devuelve (bytes recibidos tras esa línea, bytes anunciados).
+        """
+        recibidos, declarados = 0, None
+
+        def contar(linea):
+            nonlocal recibidos, declarados
+            if declarados is not None:
+                recibidos += len(linea) + 1
+            elif m := PATRON_TAMANO.match(linea):
+                declarados = int(m.group(1))
+            escribir(linea)
+
+        with self:
+            self.enviador.ejecutar("terminal length 0")
+            # Una línea 'end' en un banner no acaba la lectura si aún faltan bytes
+            self.enviador.volcar(
+                "show running-config", contar, timeout,
+                completa=lambda: declarados is None or recibidos >= declarados
+            )
+        return recibidos, declarados
+
+    def enviar_config(self, comandos, al_confirmar=None):
+        """Envía una lista de comandos de configuración"""
+        with self:
+            resultado = self._enviar_guardando(comandos, self.enviador.enviar, al_confirmar)
+        logging.info(
+            f"{self.puerto}: {len(comandos)} comandos en {resultado.duracion:.1f} s, "
+            f"{len(resultado.errores)} rechazados",
+            extra={'puerto': self.puerto, 'hostname': hostname_de(comandos), 'duracion': resultado.duracion}
+        )
+        return resultado
+
+    def pegar_config(self, comandos, al_confirmar=None, control_flujo=None):
+        """Envía una configuración larga como un bloque continuo (ver EnviadorComandos.pegar)
+
+        control_flujo ('xonxoff' o 'rtscts') deja que el router frene el envío y permite
+        tener más datos sin eco en vuelo; requiere 'flowcontrol software' o 'hardware'
+        en 'line con 0'. Sin él, el envío se regula por el eco.
+        """
+        with self:
+            compartido = self.suscripcion.compartido
+            if control_flujo:
+                compartido.fijar_control_flujo(control_flujo)
+            try:
+                ventana = VENTANA_PEGADO_FLUJO if control_flujo else None
+                resultado = self._enviar_guardando(
+                    comandos, lambda cmds, avance: self.enviador.pegar(cmds, avance, ventana), al_confirmar
+                )
+            finally:
+                if control_flujo:
+                    compartido.fijar_control_flujo(None)
+        logging.info(
+            f"{self.puerto}: {len(comandos)} comandos pegados en {resultado.duracion:.1f} s, "
+            f"{len(resultado.errores)} rechazados",
+            extra={'puerto': self.puerto, 'hostname': hostname_de(comandos), 'duracion': resultado.duracion}
+        )
+        return resultado
+
+    def mantener(self):
+        """Refresca la consola si lleva inactiva más del intervalo de keepalive"""
+        if not self.bloqueo.acquire(blocking=False):
+            return
+        try:
+            if not self.abierta:
+                return
+            # Lo que otras herramientas provoquen en la consola también pasa por aquí
+            self.enviador.descartar_pendiente()
+            if time.monotonic() - self.ultimo_uso > KEEPALIVE_INTERVALO:
+                with self.suscripcion.compartido.turno:
+                    self.enviador.sincronizar()
+                self.ultimo_uso = time.monotonic()
+        except Exception as e:
+            logging.warning(f"Keepalive fallido en {self.puerto}: {e}")
+            self.cerrar()
+        finally:
+            self.bloqueo.release()
+
+
+class GestorSesiones:
+    """Conserva una sesión por puerto COM y las mantiene vivas"""
+    def __init__(self, baudrate=9600, velocidad_alta=None):
+        self.baudrate = baudrate
+        # Si se indica, cada sesión sube la consola a esta velocidad al abrirse (ver SesionConsola.acelerar)
+        self.velocidad_alta = velocidad_alta
+        self.sesiones = {}
+        self.puertos = {}
+        self._bloqueo = threading.Lock()
+        self._parar = threading.Event()
+        threading.Thread(target=self._mantener_vivas, daemon=True).start()
+
+    def obtener(self, puerto, consola_pass='', enable_pass=''):
+        """Devuelve la sesión del puerto, creándola si no existe"""
+        with self._bloqueo:
+            sesion = self.sesiones.get(puerto)
+            if sesion is None:
+                sesion = self.sesiones[puerto] = SesionConsola(puerto, self)
+        sesion.consola_pass = consola_pass
+        sesion.enable_pass = enable_pass
+        return sesion
+
+    def restaurar_velocidades(self):
+        """Devuelve a su velocidad original las consolas aceleradas (al desactivar la opción)"""
+        with self._bloqueo:
+            sesiones = list(self.sesiones.values())
+        for sesion in sesiones:
+            sesion.aceleracion_fallida = False
+            try:
+                sesion.restaurar_velocidad()
+            except Exception as e:
+                logging.error(f"{sesion.puerto}: no se pudo restaurar la velocidad: {e}")
+
+    def metricas(self):
+        """Métricas de tiempos de todas las sesiones abiertas alguna vez"""
+        with self._bloqueo:
+            return [sesion.metricas for sesion in self.sesiones.values()]
+
+    def compartido(self, puerto):
+        """Devuelve el lector único del puerto, abriéndolo si hace falta"""
+        with self._bloqueo:
+            compartido = self.puertos.get(puerto)
+            if compartido is None or compartido.cerrado:
+                compartido = self.puertos[puerto] = PuertoCompartido(puerto, self.baudrate)
+            return compartido
+
+    def cerrar_todas(self):
+        """Cierra todas las sesiones y detiene el keepalive"""
+        self._parar.set()
+        with self._bloqueo:
+            sesiones = list(self.sesiones.values())
+            puertos = list(self.puertos.values())
+            self.sesiones.clear()
+            self.puertos.clear()
+        for sesion in sesiones:
+            try:
+                sesion.restaurar_velocidad()
+            except Exception as e:
+                logging.error(f"{sesion.puerto}: no se pudo restaurar la velocidad: {e}")
+            sesion.cerrar()
+        for compartido in puertos:
+            compartido.cerrar()
+
+    def _mantener_vivas(self):
+        while not self._parar.wait(KEEPALIVE_INTERVALO / 4):
+            with self._bloqueo:
+                sesiones = list(self.sesiones.values())
+            for sesion in sesiones:
+                sesion.mantener()
@@ -0,0 +1,294 @@
+import re
+import base64
+import hashlib
+
+from optimizador import (
+    Bloque, CABECERAS, clave_subcomando, expandir_rango, fusionar_bloques, leer_seccion,
+    normalizar_cabecera, optimizar,
+)
+
+TIMEOUT_RUNNING = 120  # Segundos sin salida al leer la running-config
+# Subcomandos que genera nucleo en cada tipo de bloque: solo estos se quitan con 'no' si sobran
+HIJOS_GESTIONADOS = {
+    'interface': (('ip', 'address'), ('clock', 'rate'), ('switchport', 'mode'), ('switchport', 'access', 'vlan')),
+    'line': (('password',), ('login',), ('transport', 'input')),
+    'router': (('network',), ('version',)),
+    'ip dhcp pool': (('network',), ('default-router',)),
+    'vlan': (('name',),),
+}
+# Procesos de enrutamiento que genera nucleo: al cambiar de protocolo se quita el anterior.
+# Los demás (BGP, otro proceso OSPF...), las VLANs y los pools del router no se tocan
+ROUTER_GESTIONADO = re.compile(r'^router (rip|ospf 1|eigrp \d+)$')
+GLOBALES_GESTIONADOS = (('ip', 'dhcp', 'excluded-address'),)
+OMITIR_RUNNING = re.compile(r'^(Building configuration|Current configuration|version |end$|!)')
+BANNER = re.compile(r'^(banner \S+) (\^C|\S)(.*)\2$', re.S)
+CLAVE_TIPO_0 = re.compile(r'\b(password|secret) 0 ')
+CLAVE_TIPO_7 = re.compile(r'\bpassword 7 ([0-9A-Fa-f]{4,})$')
+ENABLE_SECRET = re.compile(r'^enable secret (?:(\d) )?(\S+)$')
+# Tabla de 'service password-encryption' (tipo 7, reversible)
+XLAT_TIPO_7 = "dsfd;kfoA,.iyewrkldJKDHSUBsgvca69834ncxv9873254k;fg87"
+# Los hashes de IOS usan el alfabeto de crypt() en vez del de base64
+ALFABETO_CRYPT = './0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+ALFABETO_BASE64 = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+
+
+def descifrar_tipo_7(texto):
+    desfase = int(texto[:2])
+    return "".join(
+        chr(int(texto[i:i + 2], 16) ^ ord(XLAT_TIPO_7[(desfase + j) % len(XLAT_TIPO_7)]))
+        for j, i in enumerate(range(2, len(texto) - 1, 2))
+    )
+
+
+def _md5_crypt(clave, sal):
+    """Hash MD5-crypt ($1$, 'enable secret 5') de una clave con la sal dada"""
+    clave, sal = clave.encode(), sal.encode()[:8]
+    final = hashlib.md5(clave + sal + clave).digest()
+    contexto = clave + b'$1$' + sal
+    for restante in range(len(clave), 0, -16):
+        contexto += final[:min(16, restante)]
+    i = len(clave)
+    while i:
+        contexto += b'\0' if i & 1 else clave[:1]
+        i >>= 1
+    final = hashlib.md5(contexto).digest()
+    for i in range(1000):
+        bloque = clave if i & 1 else final
+        if i % 3:
+            bloque += sal
+        if i % 7:
+            bloque += clave
+        bloque += final if i & 1 else clave
+        final = hashlib.md5(bloque).digest()
+    texto = ""
+    for a, b, c in ((0, 6, 12), (1, 7, 13), (2, 8, 14), (3, 9, 15), (4, 10, 5), (None, None, 11)):
+        valor = (final[a] << 16 | final[b] << 8 if a is not None else 0) | final[c]
+        for _ in range(4 if a is not None else 2):
+            texto += ALFABETO_CRYPT[valor & 0x3f]
+            valor >>= 6
+    return texto
+
+
+def secreto_coincide(clave, guardado):
+    """Si la clave en claro corresponde a un secreto cifrado de la running-config
+
+    Admite los tipos 5 (MD5-crypt), 8 (PBKDF2-SHA256) y 9 (scrypt); con otros
+    devuelve False y el secreto se vuelve a enviar.
+    """
+    m = ENABLE_SECRET.match(guardado)
+    if not m:
+        return False
+    tipo, valor = m.groups()
+    if tipo in (None, '0'):
+        return valor == clave
+    partes = valor.split('$')
+    if len(partes) != 4:
+        return False
+    _, _, sal, resumen = partes
+    if tipo == '5':
+        return _md5_crypt(clave, sal) == resumen
+    if tipo == '8':
+        derivada = hashlib.pbkdf2_hmac('sha256', clave.encode(), sal.encode(), 20000, 32)
+    elif tipo == '9':
+        derivada = hashlib.scrypt(clave.encode(), salt=sal.encode(), n=16384, r=1, p=1, dklen=32)
+    else:
+        return False
+    codificada = base64.b64encode(derivada).decode().rstrip('=')
+    return codificada.translate(str.maketrans(ALFABETO_BASE64, ALFABETO_CRYPT)) == resumen
+
+
+def normalizar(linea):
+    """Forma comparable de una línea: espacios, delimitadores del banner y claves tipo 0"""
+    m = BANNER.match(linea.strip())
+    if m:
+        return f"{m[1]} {' '.join(m[3].split())}"
+    linea = CLAVE_TIPO_0.sub(r'\1 ', " ".join(linea.split()))
+    # Con 'service password-encryption' las claves se muestran cifradas con el tipo 7
+    return CLAVE_TIPO_7.sub(lambda m: f"password {descifrar_tipo_7(m[1])}", linea)
+
+
+def tipo_bloque(clave):
+    for tipo in ('ip dhcp pool', 'interface', 'line', 'router', 'vlan'):
+        if clave.startswith(tipo):
+            return tipo
+    return None
+
+
+def familia(linea, familias):
+    """Familia de comandos a la que pertenece una línea (sin 'no' delante), o None"""
+    palabras = tuple(p.lower() for p in linea.split())
+    for f in familias:
+        if palabras[:len(f)] == f:
+            return f
+    return None
+
+
+class Configuracion:
+    """Modelo jerárquico de una configuración: grupos de comandos globales y bloques por cabecera"""
+    def __init__(self):
+        self.elementos = []  # Listas de líneas globales y Bloques, en orden
+        self.bloques = {}  # Clave normalizada de la cabecera -> Bloque
+
+    def anadir_bloque(self, cabecera, hijos):
+        clave = normalizar_cabecera(cabecera)
+        if clave.startswith("interface range "):
+            for nombre in expandir_rango(cabecera.split(None, 2)[2]):
+                self.anadir_bloque(f"interface {nombre}", hijos)
+            return None
+        if clave not in self.bloques:
+            self.bloques[clave] = Bloque(cabecera)
+            self.elementos.append(self.bloques[clave])
+        self.bloques[clave].fusionar(hijos)
+        return self.bloques[clave]
+
+    def globales(self):
+        return [e for e in self.elementos if not isinstance(e, Bloque)]
+
+    @classmethod
+    def desde_comandos(cls, comandos):
+        """Configuración que dejan las secciones 'configure terminal' de una lista de comandos"""
+        config = cls()
+        comandos = [c.strip() for c in comandos if c.strip()]
+        i = 0
+        while i < len(comandos):
+            palabras = comandos[i].lower().split()
+            i += 1
+            if len(palabras) >= 2 and 'configure'.startswith(palabras[0]) and 'terminal'.startswith(palabras[1]):
+                elementos, i = leer_seccion(comandos, i)
+                for elemento in fusionar_bloques(elementos):
+                    if isinstance(elemento, Bloque):
+                        config.anadir_bloque(elemento.cabecera, elemento.hijos)
+                    else:
+                        config.elementos.append(elemento)
+        return config
+
+    @classmethod
+    def desde_running(cls, texto):
+        """Configuración a partir de la salida de 'show running-config'"""
+        config = cls()
+        bloque = None
+        banner = None
+        for linea in texto.splitlines():
+            linea = linea.rstrip()
+            if banner is not None:
+                # Un banner de varias líneas termina en la que vuelve a tener el delimitador
+                banner.append(linea)
+                if "^C" in linea:
+                    config.elementos.append([normalizar("\n".join(banner))])
+                    banner = None
+                continue
+            if not linea.strip() or OMITIR_RUNNING.match(linea):
+                continue
+            if linea[0].isspace():
+                if bloque is not None:
+                    bloque.hijos.append(linea.strip())
+                continue
+            if linea.startswith("banner ") and linea.count("^C") == 1:
+                banner = [linea]
+            elif CABECERAS.match(linea):
+                bloque = Bloque(linea)
+                config.bloques[bloque.clave] = bloque
+                config.elementos.append(bloque)
+            else:
+                # Los subcomandos de secciones que no se gestionan (control-plane...) se ignoran
+                bloque = None
+                config.elementos.append([linea])
+        return config
+
+
+def _delta_hijos(deseado, actual, quitar=False):
+    """Subcomandos que faltan en un bloque existente, precedidos (con quitar) de los 'no' de los que sobran"""
+    actuales = [normalizar(h) for h in actual.hijos]
+    deseados = [normalizar(h) for h in deseado.hijos]
+    hijos = []
+    for hijo, texto in zip(deseado.hijos, deseados):
+        if texto.startswith("no "):
+            # 'no X' solo hace falta si X está configurado (p. ej. 'no shutdown' en una interfaz apagada)
+            if any(a == texto[3:] or a.startswith(texto[3:] + " ") for a in actuales):
+                hijos.append(hijo)
+        elif texto not in actuales:
+            hijos.append(hijo)
+    if not quitar:
+        return hijos
+
+    claves = {clave_subcomando(d) for d in deseados}
+    gestionadas = HIJOS_GESTIONADOS.get(tipo_bloque(deseado.clave), ())
+    sobran = [
+        f"no {a}" for a in actuales
+        if not a.startswith("no ") and a not in deseados
+        and familia(a, gestionadas) and clave_subcomando(a) not in claves
+    ]
+    return sobran + hijos
+
+
+def _presente(linea, actual, presentes):
+    """Si un comando global ya está en la running-config"""
+    if m := ENABLE_SECRET.match(linea):
+        # Se muestra cifrado: se comprueba la clave contra el hash guardado
+        return any(secreto_coincide(m[2], g[0]) for g in actual.globales() if ENABLE_SECRET.match(g[0]))
+    return normalizar(linea) in presentes
+
+
+def calcular_delta(comandos, running, claves_rsa=False, quitar=False):
+    """Comandos mínimos para pasar de la running-config a la configuración de 'comandos'
+
+    Por defecto solo se añade o modifica. Con quitar, además se quita con 'no' lo que
+    sobra de lo que genera nucleo: subcomandos de HIJOS_GESTIONADOS, el proceso de
+    enrutamiento anterior al cambiar de protocolo (ROUTER_GESTIONADO) y los
+    GLOBALES_GESTIONADOS; lo demás que tenga el router se deja como está.
+    Devuelve una lista vacía si no hay nada que cambiar.
+    """
+    deseada = Configuracion.desde_comandos(comandos)
+    actual = Configuracion.desde_running(running)
+
+    quitados = []
+    if quitar:
+        if any(ROUTER_GESTIONADO.match(clave) for clave in deseada.bloques):
+            for clave, bloque in actual.bloques.items():
+                if ROUTER_GESTIONADO.match(clave) and clave not in deseada.bloques:
+                    quitados.append(["no " + bloque.cabecera])
+        deseados = {normalizar(g[0]) for g in deseada.globales()}
+        familias = {familia(g, GLOBALES_GESTIONADOS) for g in deseados} - {None}
+        for grupo in actual.globales():
+            linea = normalizar(grupo[0])
+            if familia(linea, familias) and linea not in deseados:
+                quitados.append(["no " + linea])
+
+    presentes = {normalizar(g[0]) for g in actual.globales()}
+    cambios = []
+    for elemento in deseada.elementos:
+        if isinstance(elemento, Bloque):
+            previo = actual.bloques.get(elemento.clave)
+            hijos = elemento.hijos if previo is None else _delta_hijos(elemento, previo, quitar)
+            if previo is None or hijos:
+                cambios.append([elemento.cabecera] + hijos + ["exit"])
+        elif elemento[0].lower().startswith("crypto key generate"):
+            # Las claves no aparecen en la running-config: se generan solo si no hay
+            if not claves_rsa:
+                cambios.append(elemento)
+        elif not _presente(elemento[0], actual, presentes):
+            cambios.append(elemento)
+
+    if not quitados and not cambios:
+        return []
+    lineas = ["configure terminal"]
+    for grupo in quitados + cambios:
+        lineas.extend(grupo)
+    return optimizar(lineas + ["end", "write memory"])
+
+
+def lineas_quitadas(con_quitar, sin_quitar):
+    """Líneas 'no ...' que solo están en el delta calculado con quitar=True"""
+    return [c for c in con_quitar if c.startswith("no ") and c not in sin_quitar]
+
+
+def leer_estado(sesion, timeout=TIMEOUT_RUNNING):
+    """(running-config, si el router ya tiene claves RSA) de una SesionConsola"""
+    running = sesion.leer_running(timeout)
+    claves_rsa = "Key name" in sesion.ejecutar("show crypto key mypubkey rsa")
+    return running, claves_rsa
+
+
+def comandos_delta(sesion, comandos, quitar=False):
+    """Lee el estado del router y devuelve solo los comandos que cambian algo"""
+    return calcular_delta(comandos, *leer_estado(sesion), quitar=quitar)
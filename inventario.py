@@ -0,0 +1,128 @@
+import os
+import re
+import csv
+import json
+import logging
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import nucleo
+from registro import registro_proceso_hijo
+
+FILAS_POR_LOTE = 500
+NOMBRE_NO_VALIDO = re.compile(r'[^\w.\-]')
+
+
+def parsear_vlans(texto):
+    """Convierte 'id:nombre:interfaz:modo;...' (columna vlans del CSV) en una lista"""
+    vlans = []
+    for elemento in filter(None, (e.strip() for e in texto.split(';'))):
+        partes = [p.strip() for p in elemento.split(':')]
+        if len(partes) != 4:
+            raise ValueError(f"VLAN no válida {elemento!r}: se espera id:nombre:interfaz:modo")
+        vlan_id, nombre, interfaz, modo = partes
+        vlans.append({'id': vlan_id, 'nombre': nombre, 'interfaz': interfaz, 'modo': modo})
+    return vlans
+
+
+def spec_desde_fila(fila):
+    """Adapta una fila de CSV (todo texto) a una especificación"""
+    spec = {clave: valor for clave, valor in fila.items() if clave in nucleo.CAMPOS_SPEC}
+    spec['vlans'] = parsear_vlans(fila.get('vlans') or '')
+    if 'serial_activar' in spec:
+        spec['serial_activar'] = spec['serial_activar'].strip().lower() not in ('0', 'no', 'false', '')
+    return spec
+
+
+def leer_inventario(archivo):
+    """Recorre el inventario (CSV o JSON Lines) devolviendo (fila, especificación, error)
+
+    Una fila que no se puede interpretar sale con especificación None y el motivo
+    en error, sin detener la lectura del resto.
+    """
+    with open(archivo, 'r', encoding='utf-8', newline='') as f:
+        if archivo.lower().endswith(('.jsonl', '.ndjson')):
+            filas, convertir = (linea for linea in f if linea.strip()), json.loads
+        else:
+            filas, convertir = csv.DictReader(f), spec_desde_fila
+        for n, fila in enumerate(filas, 1):
+            try:
+                spec = convertir(fila)
+                if not isinstance(spec, dict):
+                    raise ValueError("la fila no es un objeto JSON")
+            except Exception as e:
+                yield n, None, str(e)
+            else:
+                yield n, spec, None
+
+
+def nombre_archivo(spec, n):
+    """Nombre (sin extensión) del archivo de configuración de una fila"""
+    return NOMBRE_NO_VALIDO.sub('_', nucleo.campo(spec, 'hostname')) or f"fila_{n}"
+
+
+def filas_validas(archivo, errores):
+    """Filas del inventario que se pueden renderizar, como (fila, nombre, especificación)
+
+    Las filas ilegibles y las que escribirían el mismo archivo que una anterior
+    (hostname repetido) se añaden a errores en vez de devolverse.
+    """
+    usados = {}
+    for n, spec, error in leer_inventario(archivo):
+        if error:
+            errores.append((n, f"fila_{n}", error))
+            continue
+        nombre = nombre_archivo(spec, n)
+        # Windows no distingue mayúsculas: R1.txt y r1.txt serían el mismo archivo
+        anterior = usados.setdefault(nombre.lower(), n)
+        if anterior != n:
+            errores.append((n, nombre, f"hostname repetido, ya usado en la fila {anterior}"))
+            continue
+        yield n, nombre, spec
+
+
+def _renderizar_lote(filas, destino):
+    """Genera y escribe las configuraciones de un lote (ejecutado en otro proceso)"""
+    escritos, errores = 0, []
+    for n, nombre, spec in filas:
+        try:
+            comandos = nucleo.generar_comandos(spec)
+            with open(os.path.join(destino, f"{nombre}.txt"), 'w') as f:
+                f.write("\n".join(comandos) + "\n")
+            escritos += 1
+        except Exception as e:
+            errores.append((n, nombre, str(e)))
+    return escritos, errores
+
+
+def renderizar_inventario(archivo, destino, procesos=None, filas_por_lote=FILAS_POR_LOTE, al_avanzar=None):
+    """Renderiza todo el inventario en paralelo, con memoria acotada a unos pocos lotes"""
+    os.makedirs(destino, exist_ok=True)
+    procesos = procesos or os.cpu_count() or 1
+    escritos, errores = 0, []
+    filas = filas_validas(archivo, errores)
+    
+    with ProcessPoolExecutor(max_workers=procesos, initializer=registro_proceso_hijo) as pool:
+        # No leer más lotes de los que los procesos pueden atender
+        max_pendientes = 2 * procesos
+        pendientes = set()
+        while True:
+            while len(pendientes) < max_pendientes:
+                lote = list(islice(filas, filas_por_lote))
+                if not lote:
+                    break
+                pendientes.add(pool.submit(_renderizar_lote, lote, destino))
+            if not pendientes:
+                break
+            
+            hechos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in hechos:
+                n, fallos = futuro.result()
+                escritos += n
+                errores.extend(fallos)
+            if al_avanzar:
+                al_avanzar(escritos, len(errores))
+    
+    errores.sort()
+    logging.info(f"Inventario {archivo}: {escritos} configuraciones, {len(errores)} errores")
+    return escritos, errores
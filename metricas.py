@@ -0,0 +1,210 @@
+import json
+import threading
+from collections import deque
+
+# Límites superiores (s) de los cubos de los histogramas de latencia
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+MAX_MEDICIONES = 2000  # Comandos recientes que se conservan con detalle por sesión
+MIN_BYTES_RITMO = 512  # Operaciones más pequeñas miden latencia, no velocidad de la línea
+
+
+class Histograma:
+    """Histograma acumulativo de cubos fijos (como los de Prometheus)"""
+    def __init__(self, limites=LIMITES_LATENCIA):
+        self.limites = limites
+        self.cuentas = [0] * (len(limites) + 1)  # El último cubo es +Inf
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                break
+        else:
+            i = len(self.limites)
+        self.cuentas[i] += 1
+        self.suma += valor
+        self.total += 1
+
+    def media(self):
+        return self.suma / self.total if self.total else 0.0
+
+    def percentil(self, p):
+        """Límite del cubo donde cae el percentil p (0-100); una cota superior"""
+        if not self.total:
+            return 0.0
+        objetivo = self.total * p / 100
+        acumulado = 0
+        for i, cuenta in enumerate(self.cuentas):
+            acumulado += cuenta
+            if acumulado >= objetivo:
+                return self.limites[i] if i < len(self.limites) else float('inf')
+        return float('inf')
+
+    def a_dict(self):
+        return {
+            'limites': list(self.limites),
+            'cuentas': list(self.cuentas),
+            'suma': self.suma,
+            'total': self.total,
+        }
+
+
+class MedicionComando:
+    """Tiempos de un comando, en segundos de time.monotonic()"""
+    __slots__ = ('comando', 'escrito', 'escritura', 'primer_eco', 'prompt', 'bytes_salida', 'bytes_entrada')
+
+    def __init__(self, comando, escrito, escritura, bytes_salida):
+        self.comando = comando
+        self.escrito = escrito  # Instante en que empezó la escritura
+        self.escritura = escritura  # Lo que tardó la llamada a escribir
+        self.primer_eco = None  # Primer byte recibido que le corresponde
+        self.prompt = None  # Vuelta al prompt
+        self.bytes_salida = bytes_salida
+        self.bytes_entrada = 0
+
+    @property
+    def latencia_eco(self):
+        return self.primer_eco - self.escrito if self.primer_eco is not None else None
+
+    @property
+    def latencia_prompt(self):
+        return self.prompt - self.escrito if self.prompt is not None else None
+
+    def a_dict(self):
+        return {
+            'comando': self.comando,
+            'escritura': self.escritura,
+            'eco': self.latencia_eco,
+            'prompt': self.latencia_prompt,
+            'bytes_salida': self.bytes_salida,
+            'bytes_entrada': self.bytes_entrada,
+        }
+
+
+class MetricasSesion:
+    """Tiempos por comando de una sesión de consola, agregados en histogramas"""
+    def __init__(self, puerto):
+        self.puerto = puerto
+        self.escritura = Histograma()
+        self.eco = Histograma()
+        self.prompt = Histograma()
+        self.recientes = deque(maxlen=MAX_MEDICIONES)
+        self.bytes_salida = 0
+        self.bytes_entrada = 0
+        self.comandos = 0
+        # Envíos completos, para estimar cuánto tardará el siguiente
+        self.comandos_enviados = 0
+        self.tiempo_envios = 0.0
+        # baudios -> [bytes recibidos, segundos], para comparar la consola acelerada con la original
+        self.transferencias = {}
+        self._bloqueo = threading.Lock()
+
+    def registrar(self, medicion):
+        with self._bloqueo:
+            self.recientes.append(medicion)
+            self.comandos += 1
+            self.bytes_salida += medicion.bytes_salida
+            self.bytes_entrada += medicion.bytes_entrada
+            self.escritura.observar(medicion.escritura)
+            if medicion.latencia_eco is not None:
+                self.eco.observar(medicion.latencia_eco)
+            if medicion.latencia_prompt is not None:
+                self.prompt.observar(medicion.latencia_prompt)
+
+    def registrar_envio(self, comandos, duracion):
+        with self._bloqueo:
+            self.comandos_enviados += comandos
+            self.tiempo_envios += duracion
+
+    def registrar_transferencia(self, baudios, bytes_, segundos):
+        if bytes_ < MIN_BYTES_RITMO or segundos <= 0:
+            return
+        with self._bloqueo:
+            total = self.transferencias.setdefault(baudios, [0, 0.0])
+            total[0] += bytes_
+            total[1] += segundos
+
+    def ritmo_por_velocidad(self):
+        """Bytes recibidos por segundo a cada velocidad de la consola"""
+        with self._bloqueo:
+            return {baudios: b / t for baudios, (b, t) in self.transferencias.items()}
+
+    def segundos_por_comando(self):
+        """Ritmo medido en envíos anteriores (con comandos encadenados), o None si no hay datos"""
+        if not self.comandos_enviados:
+            return None
+        return self.tiempo_envios / self.comandos_enviados
+
+    def mas_lentos(self, n=10):
+        with self._bloqueo:
+            medidos = [m for m in self.recientes if m.prompt is not None]
+        return sorted(medidos, key=lambda m: m.latencia_prompt, reverse=True)[:n]
+
+    def a_dict(self):
+        with self._bloqueo:
+            return {
+                'puerto': self.puerto,
+                'comandos': self.comandos,
+                'bytes_salida': self.bytes_salida,
+                'bytes_entrada': self.bytes_entrada,
+                'segundos_por_comando': self.segundos_por_comando(),
+                'bytes_por_segundo': {str(b): n / t for b, (n, t) in self.transferencias.items()},
+                'escritura': self.escritura.a_dict(),
+                'eco': self.eco.a_dict(),
+                'prompt': self.prompt.a_dict(),
+            }
+
+
+def estimar_restante(hechos, total, transcurrido, segundos_por_comando=None):
+    """Segundos que faltan: ritmo del envío en curso, o el de envíos anteriores al empezar"""
+    if hechos:
+        return transcurrido / hechos * (total - hechos)
+    if segundos_por_comando:
+        return segundos_por_comando * total
+    return None
+
+
+def exportar_json(metricas, archivo):
+    """Guarda las métricas de varias sesiones en un archivo JSON"""
+    with open(archivo, 'w', encoding='utf-8') as f:
+        json.dump([m.a_dict() for m in metricas], f, indent=2)
+
+
+def texto_prometheus(metricas):
+    """Métricas de varias sesiones en el formato de texto de Prometheus"""
+    lineas = []
+    for nombre, ayuda in (
+        ('escritura', "Tiempo de escritura de un comando en el puerto"),
+        ('eco', "Tiempo hasta el primer byte de eco de un comando"),
+        ('prompt', "Tiempo hasta que el router vuelve al prompt"),
+    ):
+        metrica = f"consola_{nombre}_segundos"
+        lineas.append(f"# HELP {metrica} {ayuda}")
+        lineas.append(f"# TYPE {metrica} histogram")
+        for m in metricas:
+            datos = m.a_dict()[nombre]
+            etiqueta = f'puerto="{m.puerto}"'
+            acumulado = 0
+            for limite, cuenta in zip(datos['limites'] + ['+Inf'], datos['cuentas']):
+                acumulado += cuenta
+                lineas.append(f'{metrica}_bucket{{{etiqueta},le="{limite}"}} {acumulado}')
+            lineas.append(f"{metrica}_sum{{{etiqueta}}} {datos['suma']}")
+            lineas.append(f"{metrica}_count{{{etiqueta}}} {datos['total']}")
+    metrica = "consola_bytes_por_segundo"
+    lineas.append(f"# HELP {metrica} Bytes recibidos por segundo a cada velocidad de la consola")
+    lineas.append(f"# TYPE {metrica} gauge")
+    for m in metricas:
+        for baudios, ritmo in sorted(m.ritmo_por_velocidad().items()):
+            lineas.append(f'{metrica}{{puerto="{m.puerto}",baudios="{baudios}"}} {ritmo}')
+    for nombre, ayuda in (
+        ('bytes_salida', "Bytes enviados al router"),
+        ('bytes_entrada', "Bytes recibidos del router"),
+        ('comandos', "Comandos medidos"),
+    ):
+        metrica = f"consola_{nombre}_total"
+        lineas.append(f"# HELP {metrica} {ayuda}")
+        lineas.append(f"# TYPE {metrica} counter")
+        for m in metricas:
+            lineas.append(f'{metrica}{{puerto="{m.puerto}"}} {getattr(m, nombre)}')
+    return "\n".join(lineas) + "\n"
@@ -0,0 +1,135 @@
+import csv
+import time
+import logging
+from array import array
+from threading import Thread, Event
+
+CAMPOS_CONTADORES = (
+    'bytes_entrada', 'paquetes_entrada', 'errores_entrada', 'descartes_entrada',
+    'bytes_salida', 'paquetes_salida', 'errores_salida', 'descartes_salida',
+)
+CAPACIDAD_MUESTRAS = 8640  # 24 h a una muestra cada 10 s
+
+
+class SondeoPeriodico:
+    """Ejecuta una consulta periódica en segundo plano y entrega los resultados a una cola
+
+    Si la consulta devuelve None no se entrega nada (p. ej. cuando no hay cambios).
+    """
+    def __init__(self, consulta, intervalo, cola):
+        self.consulta = consulta
+        self.intervalo = intervalo
+        self.cola = cola
+        self._parar = Event()
+        self._despertar = Event()
+
+    def iniciar(self):
+        Thread(target=self._ejecutar, daemon=True).start()
+
+    def forzar(self):
+        """Adelanta la próxima consulta"""
+        self._despertar.set()
+
+    def detener(self):
+        self._parar.set()
+        self._despertar.set()
+
+    def _ejecutar(self):
+        while not self._parar.is_set():
+            try:
+                if (datos := self.consulta()) is not None:
+                    self.cola.put(('datos', datos))
+            except Exception as e:
+                logging.error(f"Error en sondeo periódico: {e}")
+                self.cola.put(('error', e))
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+
+
+class SerieContadores:
+    """Buffer circular de muestras de una interfaz; la memoria no crece con el tiempo"""
+    def __init__(self, capacidad=CAPACIDAD_MUESTRAS):
+        self.capacidad = capacidad
+        self.instantes = array('d', [0.0]) * capacidad
+        self.valores = {campo: array('Q', [0]) * capacidad for campo in CAMPOS_CONTADORES}
+        self.siguiente = 0
+        self.total = 0
+
+    def __len__(self):
+        return self.total
+
+    def _posicion(self, i):
+        """Posición en los arrays de la muestra i (0 = la más antigua conservada)"""
+        if i < 0:
+            i += self.total
+        return (self.siguiente - self.total + i) % self.capacidad
+
+    def agregar(self, instante, contadores):
+        self.instantes[self.siguiente] = instante
+        for campo, valores in self.valores.items():
+            valores[self.siguiente] = contadores.get(campo, 0)
+        self.siguiente = (self.siguiente + 1) % self.capacidad
+        self.total = min(self.total + 1, self.capacidad)
+
+    def muestra(self, i):
+        """Devuelve (instante, {campo: valor}) de la muestra i"""
+        pos = self._posicion(i)
+        return self.instantes[pos], {campo: valores[pos] for campo, valores in self.valores.items()}
+
+    def deltas(self, i):
+        """Diferencias entre la muestra i y la anterior, y segundos transcurridos"""
+        actual, previa = self._posicion(i), self._posicion(i - 1)
+        segundos = self.instantes[actual] - self.instantes[previa]
+        deltas = {}
+        for campo, valores in self.valores.items():
+            delta = valores[actual] - valores[previa]
+            # Contador reiniciado (clear counters, recarga o desbordamiento)
+            deltas[campo] = delta if delta >= 0 else valores[actual]
+        return deltas, segundos
+
+    def tasas(self, i=-1):
+        """Tasas por segundo de cada contador en la muestra i"""
+        if self.total < 2:
+            return None
+        deltas, segundos = self.deltas(i)
+        if segundos <= 0:
+            return None
+        return {campo: delta / segundos for campo, delta in deltas.items()}
+
+
+class MuestreadorContadores:
+    """Guarda series de contadores por interfaz y calcula tasas"""
+    def __init__(self, capacidad=CAPACIDAD_MUESTRAS):
+        self.capacidad = capacidad
+        self.series = {}
+
+    def registrar(self, instante, contadores):
+        """Añade una muestra {interfaz: {campo: valor}} tomada en instante"""
+        for interfaz, valores in contadores.items():
+            serie = self.series.get(interfaz)
+            if serie is None:
+                serie = self.series[interfaz] = SerieContadores(self.capacidad)
+            serie.agregar(instante, valores)
+
+    def tasas(self):
+        """Última tasa por segundo de cada interfaz"""
+        return {interfaz: serie.tasas() for interfaz, serie in self.series.items()}
+
+    def exportar_csv(self, archivo):
+        """Escribe todas las muestras conservadas con sus tasas por segundo"""
+        with open(archivo, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(
+                ['instante', 'interfaz', *CAMPOS_CONTADORES,
+                 *(f"{campo}_por_s" for campo in CAMPOS_CONTADORES)]
+            )
+            for interfaz, serie in self.series.items():
+                for i in range(len(serie)):
+                    instante, valores = serie.muestra(i)
+                    tasas = serie.tasas(i) if i > 0 else None
+                    writer.writerow([
+                        time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(instante)),
+                        interfaz,
+                        *(valores[campo] for campo in CAMPOS_CONTADORES),
+                        *((f"{tasas[campo]:.2f}" if tasas else '') for campo in CAMPOS_CONTADORES),
+                    ])
@@ -0,0 +1,262 @@
+import re
+import json
+import logging
+
+# Claves de una especificación de router (las mismas que plantillas/*.json)
+CAMPOS_SPEC = (
+    # Básico
+    'hostname', 'consola_pass', 'enable_pass', 'banner',
+    'lan_interface', 'lan_ip', 'lan_mask', 'interfaz_borrar',
+    # Serial
+    'serial_interface', 'serial_ip', 'serial_mask', 'serial_clock_rate', 'serial_activar',
+    # SSH
+    'ssh_dominio', 'ssh_usuario', 'ssh_clave',
+    # DHCP
+    'dhcp_pool', 'dhcp_red', 'dhcp_mascara', 'dhcp_gateway', 'dhcp_rango_ini', 'dhcp_rango_fin',
+    # Enrutamiento
+    'protocolo', 'ruteo_red', 'ruteo_wc', 'ruteo_area', 'ruteo_as',
+    # VLANs: lista de {'id', 'nombre', 'interfaz', 'modo'}
+    'vlans',
+)
+
+
+def campo(spec, clave):
+    """Devuelve el valor de texto de un campo, vacío si no existe"""
+    valor = spec.get(clave)
+    return "" if valor is None else str(valor).strip()
+
+
+def cargar_spec(archivo):
+    """Lee una especificación JSON"""
+    with open(archivo, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def validar_ip(ip):
+    """Valida que una cadena sea una dirección IP válida"""
+    import ipaddress
+    try:
+        ipaddress.ip_address(ip)
+        return True
+    except ValueError:
+        return False
+
+
+def validar_formato_ip(ip):
+    """Valida formato de IP con expresiones regulares"""
+    patron_ip = r'^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}$'
+    if not re.match(patron_ip, ip):
+        return False
+    return all(0 <= int(octeto) <= 255 for octeto in ip.split('.'))
+
+
+def generar_comandos_basicos(spec):
+    """Genera los comandos de configuración básica"""
+    comandos = ["enable", "configure terminal"]
+    
+    # Hostname
+    if hostname := campo(spec, 'hostname'):
+        comandos.append(f"hostname {hostname}")
+    
+    # Contraseñas
+    if enable_pass := campo(spec, 'enable_pass'):
+        comandos.append(f"enable secret {enable_pass}")
+    
+    if consola_pass := campo(spec, 'consola_pass'):
+        comandos.extend([
+            "line console 0",
+            f"password {consola_pass}",
+            "login",
+            "exit"
+        ])
+    
+    # Banner
+    if banner := campo(spec, 'banner'):
+        delimitador = "$" if "$" not in banner else "#"
+        comandos.append(f"banner motd {delimitador}{banner}{delimitador}")
+    
+    # Interfaz LAN
+    if (interfaz := campo(spec, 'lan_interface')) and \
+       (ip := campo(spec, 'lan_ip')) and \
+       (mask := campo(spec, 'lan_mask')):
+        if validar_ip(ip):
+            comandos.extend([
+                f"interface {interfaz}",
+                f"ip address {ip} {mask}",
+                "no shutdown",
+                "exit"
+            ])
+        else:
+            logging.warning(f"IP LAN no válida: {ip}")
+    
+    # Borrar interfaz
+    if interfaz := campo(spec, 'interfaz_borrar'):
+        comandos.extend([
+            f"interface {interfaz}",
+            "shutdown",
+            "no ip address",
+            "no clock rate",
+            "exit"
+        ])
+    
+    return comandos
+
+
+def generar_comandos_serial(spec):
+    """Genera los comandos para interfaz serial"""
+    comandos = []
+    
+    if (interfaz := campo(spec, 'serial_interface')) and \
+       (ip := campo(spec, 'serial_ip')) and \
+       (mask := campo(spec, 'serial_mask')):
+        
+        if not validar_ip(ip):
+            logging.warning(f"IP serial no válida: {ip}")
+            return comandos
+            
+        comandos.extend([
+            f"interface {interfaz}",
+            f"ip address {ip} {mask}"
+        ])
+        
+        if clock_rate := campo(spec, 'serial_clock_rate'):
+            if clock_rate.isdigit():
+                comandos.append(f"clock rate {clock_rate}")
+            else:
+                logging.warning(f"Clock rate no válido: {clock_rate}")
+        
+        if spec.get('serial_activar', True):
+            comandos.append("no shutdown")
+        
+        comandos.append("exit")
+    
+    return comandos
+
+
+def generar_comandos_ssh(spec):
+    """Genera los comandos para configuración SSH"""
+    comandos = []
+    
+    if (dominio := campo(spec, 'ssh_dominio')) and \
+       (usuario := campo(spec, 'ssh_usuario')) and \
+       (clave := campo(spec, 'ssh_clave')):
+        
+        comandos.extend([
+            f"ip domain-name {dominio}",
+            f"username {usuario} password {clave}",
+            "crypto key generate rsa",
+            "1024",  # Tamaño de clave
+            "line vty 0 4",
+            "transport input ssh",
+            "login local",
+            "exit"
+        ])
+    
+    return comandos
+
+
+def generar_comandos_dhcp(spec):
+    """Genera los comandos para configuración DHCP"""
+    comandos = []
+    
+    if (pool := campo(spec, 'dhcp_pool')) and \
+       (red := campo(spec, 'dhcp_red')) and \
+       (mascara := campo(spec, 'dhcp_mascara')) and \
+       (gateway := campo(spec, 'dhcp_gateway')):
+        
+        if ini := campo(spec, 'dhcp_rango_ini'):
+            if fin := campo(spec, 'dhcp_rango_fin'):
+                if validar_ip(ini) and validar_ip(fin):
+                    comandos.append(f"ip dhcp excluded-address {ini} {fin}")
+                else:
+                    logging.warning("Rango DHCP no válido")
+        
+        comandos.extend([
+            f"ip dhcp pool {pool}",
+            f"network {red} {mascara}",
+            f"default-router {gateway}"
+        ])
+    
+    return comandos
+
+
+def generar_comandos_ruteo(spec):
+    """Genera los comandos para enrutamiento dinámico"""
+    comandos = []
+    proto = campo(spec, 'protocolo')
+    
+    if proto == "rip" and (red := campo(spec, 'ruteo_red')):
+        comandos.extend([
+            "router rip",
+            "version 2",
+            f"network {red}",
+            "exit"
+        ])
+    
+    elif proto == "ospf" and (red := campo(spec, 'ruteo_red')) and \
+         (wc := campo(spec, 'ruteo_wc')) and \
+         (area := campo(spec, 'ruteo_area')):
+        
+        comandos.extend([
+            "router ospf 1",
+            f"network {red} {wc} area {area}",
+            "exit"
+        ])
+    
+    elif proto == "eigrp" and (red := campo(spec, 'ruteo_red')) and \
+         (asn := campo(spec, 'ruteo_as')):
+        
+        if asn.isdigit():
+            comandos.extend([
+                f"router eigrp {asn}",
+                f"network {red}",
+                "exit"
+            ])
+        else:
+            logging.warning("ASN debe ser numérico")
+    
+    return comandos
+
+
+def generar_comandos_vlans(spec):
+    """Genera comandos para configuración de VLANs"""
+    comandos = []
+    
+    for vlan in spec.get('vlans') or []:
+        vlan_id, mode = campo(vlan, 'id'), campo(vlan, 'modo')
+        
+        comandos.extend([
+            f"vlan {vlan_id}",
+            f"name {campo(vlan, 'nombre')}",
+            "exit",
+            f"interface {campo(vlan, 'interfaz')}",
+            f"switchport mode {mode}",
+            f"switchport access vlan {vlan_id}" if mode == "access" else "",
+            "no shutdown",
+            "exit"
+        ])
+    
+    return [cmd for cmd in comandos if cmd]  # Elimina cadenas vacías
+
+
+def hostname_de(comandos):
+    """Hostname que fija una lista de comandos, o cadena vacía si no lo cambia"""
+    for cmd in comandos:
+        if cmd.startswith("hostname "):
+            return cmd.split(None, 1)[1].strip()
+    return ""
+
+
+def generar_comandos(spec):
+    """Genera todos los comandos de configuración de una especificación"""
+    comandos = []
+    comandos.extend(generar_comandos_basicos(spec))
+    comandos.extend(generar_comandos_serial(spec))
+    comandos.extend(generar_comandos_ssh(spec))
+    comandos.extend(generar_comandos_dhcp(spec))
+    comandos.extend(generar_comandos_ruteo(spec))
+    comandos.extend(generar_comandos_vlans(spec))
+    
+    # Comandos finales: 'end' vuelve a modo privilegiado desde cualquier submodo
+    comandos.extend(["end", "write memory"])
+    return comandos
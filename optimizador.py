@@ -0,0 +1,230 @@
+import re
+
+# Nombres completos de interfaz, en el orden en que se prueban las abreviaturas ('fa', 'gi0/1', 's0/0/0'...)
+TIPOS_INTERFAZ = (
+    'FastEthernet', 'GigabitEthernet', 'Serial', 'Ethernet', 'TenGigabitEthernet',
+    'Loopback', 'Vlan', 'Port-channel', 'Tunnel',
+)
+# Comandos que abren un submodo de configuración
+CABECERAS = re.compile(r'^(interface|line|router|vlan\s+\d+|ip\s+dhcp\s+pool|ip\s+access-list)\b', re.I)
+# Comandos de modo privilegiado: si aparecen en configuración, la sección ya terminó
+SOLO_EXEC = {'write', 'copy', 'reload', 'show', 'ping', 'traceroute', 'clear', 'configure'}
+# Subcomandos que sustituyen al anterior con las mismas palabras (con o sin 'no' delante)
+SUSTITUIBLES = (
+    ('shutdown',), ('ip', 'address'), ('description',), ('clock', 'rate'), ('switchport', 'mode'),
+    ('switchport', 'access', 'vlan'), ('name',), ('password',), ('login',), ('transport', 'input'),
+    ('default-router',), ('speed',), ('duplex',), ('encapsulation',), ('exec-timeout',), ('version',),
+)
+INTERFAZ_SIMPLE = re.compile(r'^([A-Za-z-]+)((?:\d+/)*)(\d+)$')
+MAX_RANGOS = 5  # IOS admite como mucho cinco rangos por 'interface range'
+RESPUESTA_CLAVES = re.compile(r'^(\d+|yes|no)$', re.I)
+
+
+def normalizar_interfaz(nombre):
+    """Nombre completo de una interfaz escrita abreviada: 'fa0/1' -> 'FastEthernet0/1'"""
+    nombre = nombre.replace(" ", "")
+    m = re.match(r'^([A-Za-z-]+)(.*)$', nombre)
+    if not m:
+        return nombre
+    prefijo, resto = m.groups()
+    for tipo in TIPOS_INTERFAZ:
+        if tipo.lower().startswith(prefijo.lower()):
+            return tipo + resto
+    return nombre
+
+
+def normalizar_cabecera(linea):
+    """Clave de una cabecera de submodo, igual para 'interface fa0/1' e 'interface FastEthernet0/1'"""
+    palabras = linea.split()
+    if palabras[0].lower() == 'interface' and len(palabras) > 1 and palabras[1].lower() != 'range':
+        return "interface " + normalizar_interfaz("".join(palabras[1:]))
+    palabras = [p.lower() for p in palabras]
+    if palabras[0] == 'line' and len(palabras) > 1 and 'console'.startswith(palabras[1]):
+        palabras[1] = 'con'  # 'line console 0' se muestra como 'line con 0' en la running-config
+    return " ".join(palabras)
+
+
+def clave_subcomando(linea):
+    """Clave para detectar subcomandos que se sustituyen entre sí dentro de un bloque"""
+    palabras = linea.split()
+    base = palabras[1:] if palabras[0].lower() == 'no' else palabras
+    if base and base[-1] != 'secondary':
+        for clave in SUSTITUIBLES:
+            if tuple(p.lower() for p in base[:len(clave)]) == clave:
+                return clave
+    return linea
+
+
+def expandir_rango(texto):
+    """Interfaces de un 'interface range': 'Fa0/1 - 3 , Fa0/7' -> [FastEthernet0/1, ..., FastEthernet0/7]"""
+    interfaces = []
+    for parte in texto.split(","):
+        inicio, _, fin = parte.partition("-")
+        m = INTERFAZ_SIMPLE.match(normalizar_interfaz(inicio.strip()))
+        if not m:
+            continue
+        tipo, ranura, primero = m.groups()
+        ultimo = int(fin) if fin.strip().isdigit() else int(primero)
+        interfaces.extend(f"{tipo}{ranura}{n}" for n in range(int(primero), ultimo + 1))
+    return interfaces
+
+
+class Bloque:
+    """Cabecera de submodo y sus subcomandos"""
+    def __init__(self, cabecera):
+        self.cabecera = cabecera
+        self.clave = normalizar_cabecera(cabecera)
+        self.hijos = []
+
+    def fusionar(self, hijos):
+        """Añade subcomandos; uno nuevo sustituye al anterior con la misma clave"""
+        for hijo in hijos:
+            clave = clave_subcomando(hijo)
+            self.hijos = [h for h in self.hijos if clave_subcomando(h) != clave]
+            self.hijos.append(hijo)
+
+
+def leer_seccion(comandos, i):
+    """Elementos de una sección de configuración a partir de comandos[i]
+
+    Devuelve (elementos, índice siguiente); cada elemento es una lista de líneas
+    globales que van juntas o un Bloque.
+    """
+    elementos = []
+    bloque = None
+    while i < len(comandos):
+        linea = comandos[i]
+        palabras = linea.split()
+        primera = palabras[0].lower()
+        if primera == 'end' or (primera == 'exit' and bloque is None) or primera in SOLO_EXEC:
+            return elementos, i + (primera in ('end', 'exit'))
+        i += 1
+        if primera == 'exit':
+            bloque = None
+        elif CABECERAS.match(linea):
+            bloque = Bloque(linea)
+            elementos.append(bloque)
+        elif bloque is not None:
+            bloque.fusionar([linea])
+        elif linea.lower().startswith("crypto key generate") and i < len(comandos) \
+                and RESPUESTA_CLAVES.match(comandos[i]):
+            # La respuesta a la pregunta del tamaño de clave va pegada a su comando
+            elementos.append([linea, comandos[i]])
+            i += 1
+        else:
+            elementos.append([linea])
+    return elementos, i
+
+
+def fusionar_bloques(elementos):
+    """Une los bloques con la misma cabecera en su última aparición"""
+    ultimos = {}
+    for bloque in (e for e in elementos if isinstance(e, Bloque)):
+        if bloque.clave in ultimos:
+            bloque.hijos, anteriores = [], bloque.hijos
+            bloque.fusionar(ultimos[bloque.clave].hijos)
+            bloque.fusionar(anteriores)
+        ultimos[bloque.clave] = bloque
+    return [e for e in elementos if not isinstance(e, Bloque) or ultimos[e.clave] is e]
+
+
+def _texto_rangos(interfaces):
+    """Rangos de interfaces ('FastEthernet0/1 - 3') agrupando los puertos consecutivos"""
+    por_ranura = {}
+    for nombre in interfaces:
+        tipo, ranura, puerto = INTERFAZ_SIMPLE.match(nombre).groups()
+        por_ranura.setdefault((tipo, ranura), []).append(int(puerto))
+    rangos = []
+    for (tipo, ranura), puertos in por_ranura.items():
+        puertos.sort()
+        inicio = anterior = puertos[0]
+        for puerto in puertos[1:] + [None]:
+            if puerto is not None and puerto == anterior + 1:
+                anterior = puerto
+                continue
+            rango = f"{tipo}{ranura}{inicio}"
+            if anterior != inicio:
+                rango += f" - {anterior}"
+            rangos.append(rango)
+            if puerto is not None:
+                inicio = anterior = puerto
+    return rangos
+
+
+def _agrupar_rangos(elementos):
+    """Sustituye las interfaces con subcomandos idénticos por 'interface range'"""
+    grupos = {}
+    for bloque in elementos:
+        if isinstance(bloque, Bloque) and bloque.hijos and bloque.clave.startswith("interface ") \
+                and INTERFAZ_SIMPLE.match(bloque.clave.split(None, 1)[1]):
+            grupos.setdefault(tuple(bloque.hijos), []).append(bloque)
+
+    sustitutos = {}  # id del último bloque de cada grupo -> bloques 'interface range'
+    quitados = set()
+    for hijos, bloques in grupos.items():
+        if len(bloques) < 2:
+            continue
+        rangos = _texto_rangos([b.clave.split(None, 1)[1] for b in bloques])
+        nuevos = []
+        for j in range(0, len(rangos), MAX_RANGOS):
+            rango = Bloque("interface range " + " , ".join(rangos[j:j + MAX_RANGOS]))
+            rango.hijos = list(hijos)
+            nuevos.append(rango)
+        quitados.update(id(b) for b in bloques)
+        sustitutos[id(bloques[-1])] = nuevos
+
+    resultado = []
+    for elemento in elementos:
+        if id(elemento) in sustitutos:
+            resultado.extend(sustitutos[id(elemento)])
+        elif id(elemento) not in quitados:
+            resultado.append(elemento)
+    return resultado
+
+
+def _escribir_seccion(elementos):
+    """Líneas de una sección; 'exit' solo hace falta antes de un comando global"""
+    lineas = []
+    for j, elemento in enumerate(elementos):
+        if isinstance(elemento, Bloque):
+            lineas.append(elemento.cabecera)
+            lineas.extend(elemento.hijos)
+            siguiente = elementos[j + 1] if j + 1 < len(elementos) else None
+            if siguiente is not None and not isinstance(siguiente, Bloque):
+                lineas.append("exit")
+        else:
+            lineas.extend(elemento)
+    lineas.append("end")
+    return lineas
+
+
+def optimizar(comandos, rangos=True):
+    """Reduce las líneas a enviar por consola sin cambiar la configuración resultante
+
+    Une los bloques de un mismo submodo repetidos (p. ej. una interfaz por cada VLAN),
+    quita subcomandos repetidos o sustituidos más adelante, agrupa las interfaces con
+    los mismos subcomandos en 'interface range' y quita los 'exit' innecesarios.
+    Los comandos fuera de 'configure terminal' se dejan como están.
+    """
+    comandos = [c.strip() for c in comandos if c.strip()]
+    resultado = []
+    i = 0
+    while i < len(comandos):
+        linea = comandos[i]
+        i += 1
+        resultado.append(linea)
+        palabras = linea.lower().split()
+        if len(palabras) >= 2 and 'configure'.startswith(palabras[0]) and 'terminal'.startswith(palabras[1]):
+            elementos, i = leer_seccion(comandos, i)
+            elementos = fusionar_bloques(elementos)
+            if rangos:
+                elementos = _agrupar_rangos(elementos)
+            resultado.extend(_escribir_seccion(elementos))
+    return resultado
+
+
+def ahorro(original, optimizado):
+    """(líneas, bytes) que se ahorran al enviar la versión optimizada (cada línea lleva su salto)"""
+    lineas = len(original) - len(optimizado)
+    bytes_ = sum(len(c) + 1 for c in original) - sum(len(c) + 1 for c in optimizado)
+    return lineas, bytes_
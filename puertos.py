@@ -0,0 +1,53 @@
+import logging
+
+from monitoreo import SondeoPeriodico
+
+INTERVALO_VIGILANCIA = 2  # Segundos entre enumeraciones de puertos
+
+
+def identidad(info):
+    """Clave estable de un adaptador: VID:PID:número de serie, o el nombre del puerto si no es USB"""
+    if info.vid is not None:
+        return f"{info.vid:04X}:{info.pid:04X}:{info.serial_number or ''}"
+    return info.device
+
+
+def enumerar_puertos():
+    """Devuelve {puerto: (identidad, descripción)} de los puertos serie presentes"""
+    # Importación diferida: solo hace falta al enumerar y puede tardar en cargarse
+    import serial.tools.list_ports
+    return {info.device: (identidad(info), info.description) for info in serial.tools.list_ports.comports()}
+
+
+class VigilantePuertos(SondeoPeriodico):
+    """Enumera los puertos serie en segundo plano y entrega solo los cambios
+
+    Cada mensaje es ('datos', (nuevos, quitados)): nuevos es {puerto: (identidad, descripción)}
+    con los puertos que aparecieron o cambiaron de adaptador y quitados la lista de los que
+    desaparecieron. El primer mensaje trae todos los puertos presentes.
+    """
+    def __init__(self, cola, intervalo=INTERVALO_VIGILANCIA):
+        super().__init__(self._cambios, intervalo, cola)
+        self.conocidos = None
+        self.informar = False
+
+    def forzar(self):
+        """Enumera de inmediato y entrega un mensaje aunque no haya cambios"""
+        self.informar = True
+        super().forzar()
+
+    def _cambios(self):
+        actuales = enumerar_puertos()
+        anteriores = self.conocidos or {}
+        nuevos = {puerto: datos for puerto, datos in actuales.items() if anteriores.get(puerto) != datos}
+        quitados = [puerto for puerto in anteriores if puerto not in actuales]
+        informar = self.informar or self.conocidos is None
+        self.informar = False
+        self.conocidos = actuales
+        if not (nuevos or quitados or informar):
+            return None
+        for puerto in quitados:
+            logging.info(f"Puerto {puerto} desconectado")
+        for puerto, (clave, descripcion) in nuevos.items():
+            logging.info(f"Puerto {puerto} disponible: {descripcion} ({clave})")
+        return nuevos, quitados
@@ -0,0 +1,81 @@
+import json
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+FORMATO = '%(asctime)s - %(levelname)s - %(message)s'
+MAX_BYTES_LOG = 5 * 1024 * 1024  # Tamaño a partir del cual se rota el archivo
+COPIAS_LOG = 5  # Archivos rotados que se conservan (.1 ... .5)
+# Campos de sesión que se pasan con extra={...} y el formato JSON guarda aparte
+CAMPOS_SESION = ('puerto', 'hostname', 'duracion')
+
+_escritor = None
+
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON por registro, con los campos de sesión si el registro los trae"""
+    def format(self, record):
+        datos = {
+            'hora': self.formatTime(record),
+            'nivel': record.levelname,
+            'mensaje': record.getMessage(),
+        }
+        for campo in CAMPOS_SESION:
+            if (valor := getattr(record, campo, None)) is not None:
+                datos[campo] = round(valor, 3) if isinstance(valor, float) else valor
+        return json.dumps(datos, ensure_ascii=False)
+
+
+def configurar_registro(archivo=None, nivel=logging.INFO, formato_json=False, nivel_consola=logging.NOTSET):
+    """Envía el registro a una cola que un hilo aparte escribe en disco
+
+    Así el hilo que habla con el router nunca espera al disco. El archivo rota por
+    tamaño. Se puede llamar varias veces: los manejadores se instalan una sola vez y
+    sustituyen a los que hubiera (p. ej. de un basicConfig) para no duplicar líneas.
+    nivel_consola=None no escribe en stderr.
+    """
+    global _escritor
+    raiz = logging.getLogger()
+    raiz.setLevel(nivel)
+    if _escritor is not None:
+        return
+
+    manejadores = []
+    if archivo:
+        archivo_log = RotatingFileHandler(archivo, maxBytes=MAX_BYTES_LOG, backupCount=COPIAS_LOG, encoding='utf-8')
+        archivo_log.setFormatter(FormatoJSON() if formato_json else logging.Formatter(FORMATO))
+        manejadores.append(archivo_log)
+    if nivel_consola is not None:
+        pantalla = logging.StreamHandler()
+        pantalla.setLevel(nivel_consola)
+        pantalla.setFormatter(logging.Formatter(FORMATO))
+        manejadores.append(pantalla)
+
+    for manejador in raiz.handlers[:]:
+        raiz.removeHandler(manejador)
+    cola = queue.SimpleQueue()
+    raiz.addHandler(QueueHandler(cola))
+    _escritor = QueueListener(cola, *manejadores, respect_handler_level=True)
+    _escritor.start()
+    atexit.register(detener_registro)
+
+
+def detener_registro():
+    """Escribe lo que quede en la cola y cierra los archivos"""
+    global _escritor
+    if _escritor is None:
+        return
+    _escritor.stop()
+    for manejador in _escritor.handlers:
+        manejador.close()
+    _escritor = None
+
+
+def registro_proceso_hijo():
+    """Inicializador de pools de procesos: la cola del padre no existe en el hijo
+
+    Sin manejadores, los avisos del hijo salen por stderr (logging.lastResort).
+    """
+    for manejador in logging.getLogger().handlers[:]:
+        logging.getLogger().removeHandler(manejador)
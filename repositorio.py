@@ -0,0 +1,215 @@
+import json
+import time
+import sqlite3
+import logging
+
+from nucleo import CAMPOS_SPEC
+
+# Claves de metadatos que pueden venir dentro de un .json de plantillas/
+CAMPOS_META = ('padre', 'sitio', 'etiquetas')
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS plantillas (
+    nombre TEXT PRIMARY KEY,
+    padre TEXT,
+    sitio TEXT NOT NULL DEFAULT '',
+    hostname TEXT NOT NULL DEFAULT '',
+    datos TEXT NOT NULL,
+    modificado REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_plantillas_hostname ON plantillas(hostname);
+CREATE INDEX IF NOT EXISTS idx_plantillas_sitio ON plantillas(sitio);
+CREATE INDEX IF NOT EXISTS idx_plantillas_padre ON plantillas(padre);
+CREATE TABLE IF NOT EXISTS etiquetas (
+    etiqueta TEXT NOT NULL,
+    nombre TEXT NOT NULL REFERENCES plantillas(nombre) ON DELETE CASCADE,
+    PRIMARY KEY (etiqueta, nombre)
+);
+CREATE INDEX IF NOT EXISTS idx_etiquetas_nombre ON etiquetas(nombre);
+"""
+
+
+class RepositorioPlantillas:
+    """Plantillas y especificaciones de routers en SQLite, con herencia entre plantillas
+
+    Una plantilla puede heredar de otra (p. ej. un sitio de su región): solo guarda los
+    campos que difieren del padre y el resto se toma de él al resolverla.
+    """
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.conexion = sqlite3.connect(ruta)
+        self.conexion.execute("PRAGMA foreign_keys = ON")
+        self.conexion.executescript(ESQUEMA)
+        # nombre -> especificación completa ya resuelta; se vacía al cambiar cualquier plantilla
+        self.resueltas = {}
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def _fila(self, nombre):
+        return self.conexion.execute(
+            "SELECT padre, sitio, datos, modificado FROM plantillas WHERE nombre = ?", (nombre,)
+        ).fetchone()
+
+    def existe(self, nombre):
+        return self._fila(nombre) is not None
+
+    def nombres(self):
+        return [n for (n,) in self.conexion.execute("SELECT nombre FROM plantillas ORDER BY nombre")]
+
+    def buscar(self, texto='', hostname=None, sitio=None, etiqueta=None):
+        """Nombres de las plantillas que cumplen todos los filtros indicados
+
+        hostname, sitio y etiqueta son búsquedas exactas por índice; texto busca
+        subcadenas en el nombre, el hostname, el sitio y las etiquetas.
+        """
+        condiciones, parametros = [], []
+        if hostname:
+            condiciones.append("p.hostname = ?")
+            parametros.append(hostname)
+        if sitio:
+            condiciones.append("p.sitio = ?")
+            parametros.append(sitio)
+        if etiqueta:
+            condiciones.append("p.nombre IN (SELECT nombre FROM etiquetas WHERE etiqueta = ?)")
+            parametros.append(etiqueta)
+        texto = texto.strip()
+        if texto:
+            patron = f"%{texto}%"
+            condiciones.append(
+                "(p.nombre LIKE ? OR p.hostname LIKE ? OR p.sitio LIKE ?"
+                " OR p.nombre IN (SELECT nombre FROM etiquetas WHERE etiqueta LIKE ?))"
+            )
+            parametros.extend([patron] * 4)
+
+        consulta = "SELECT p.nombre FROM plantillas p"
+        if condiciones:
+            consulta += " WHERE " + " AND ".join(condiciones)
+        consulta += " ORDER BY p.nombre"
+        return [n for (n,) in self.conexion.execute(consulta, parametros)]
+
+    def metadatos(self, nombre):
+        """Devuelve {'padre', 'sitio', 'etiquetas'} de una plantilla, o None si no existe"""
+        fila = self._fila(nombre)
+        if fila is None:
+            return None
+        etiquetas = [e for (e,) in self.conexion.execute(
+            "SELECT etiqueta FROM etiquetas WHERE nombre = ? ORDER BY etiqueta", (nombre,)
+        )]
+        return {'padre': fila[0] or '', 'sitio': fila[1], 'etiquetas': etiquetas}
+
+    def resolver(self, nombre):
+        """Especificación completa de la plantilla aplicando la cadena de herencia
+
+        El resultado se cachea; no modificarlo. Devuelve None si la plantilla no existe.
+        """
+        if nombre in self.resueltas:
+            return self.resueltas[nombre]
+
+        cadena = []
+        actual = nombre
+        while actual:
+            if actual in cadena:
+                raise ValueError(f"Herencia circular en la plantilla '{nombre}'")
+            fila = self._fila(actual)
+            if fila is None:
+                if actual == nombre:
+                    return None
+                raise ValueError(f"La plantilla '{cadena[-1]}' hereda de '{actual}', que no existe")
+            cadena.append(actual)
+            if actual in self.resueltas:
+                break
+            actual = fila[0]
+
+        # Recorre la cadena desde el ancestro más lejano, cacheando cada nivel
+        spec = {}
+        for eslabon in reversed(cadena):
+            if eslabon in self.resueltas:
+                spec = self.resueltas[eslabon]
+                continue
+            spec = dict(spec)
+            spec.update(json.loads(self._fila(eslabon)[2]))
+            self.resueltas[eslabon] = spec
+        return spec
+
+    def guardar(self, nombre, spec, padre=None, sitio='', etiquetas=(), modificado=None):
+        """Guarda una especificación; si hereda, solo se almacenan los campos propios"""
+        if padre:
+            if padre == nombre:
+                raise ValueError("Una plantilla no puede heredar de sí misma")
+            base = self.resolver(padre)
+            if base is None:
+                raise ValueError(f"La plantilla padre '{padre}' no existe")
+            if self.existe(nombre) and nombre in self._ancestros(padre):
+                raise ValueError(f"'{padre}' ya hereda de '{nombre}'")
+            datos = {clave: valor for clave, valor in spec.items() if base.get(clave) != valor}
+        else:
+            datos = dict(spec)
+
+        desconocidos = set(datos) - set(CAMPOS_SPEC)
+        if desconocidos:
+            logging.warning(f"Plantilla '{nombre}': campos desconocidos {sorted(desconocidos)}")
+
+        hostname = str(spec.get('hostname', '') or '')
+        with self.conexion:
+            self.conexion.execute(
+                "INSERT INTO plantillas (nombre, padre, sitio, hostname, datos, modificado)"
+                " VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(nombre) DO UPDATE SET padre = excluded.padre, sitio = excluded.sitio,"
+                " hostname = excluded.hostname, datos = excluded.datos, modificado = excluded.modificado",
+                (nombre, padre or None, sitio or '', hostname, json.dumps(datos), modificado or time.time())
+            )
+            self.conexion.execute("DELETE FROM etiquetas WHERE nombre = ?", (nombre,))
+            self.conexion.executemany(
+                "INSERT OR IGNORE INTO etiquetas (etiqueta, nombre) VALUES (?, ?)",
+                [(e.strip(), nombre) for e in etiquetas if e.strip()]
+            )
+        # Cualquier descendiente puede haber cambiado: se vuelve a resolver bajo demanda
+        self.resueltas.clear()
+
+    def _ancestros(self, nombre):
+        ancestros = []
+        while nombre and nombre not in ancestros:
+            ancestros.append(nombre)
+            fila = self._fila(nombre)
+            nombre = fila[0] if fila else None
+        return ancestros
+
+    def importar(self, almacen):
+        """Copia las plantillas JSON nuevas o modificadas de un AlmacenPlantillas
+
+        Devuelve cuántas se importaron. Las que se guardaron después desde la aplicación
+        (más recientes que el archivo) no se sobrescriben.
+        """
+        almacen.sincronizar()
+        pendientes = []
+        for nombre in almacen.nombres():
+            mtime = almacen.indice[nombre]['mtime']
+            fila = self._fila(nombre)
+            if fila is None or fila[3] < mtime:
+                pendientes.append((nombre, mtime))
+
+        importadas = 0
+        # Los padres deben existir antes que sus hijos: se reintenta hasta que no haya progreso
+        while pendientes:
+            restantes = []
+            for nombre, mtime in pendientes:
+                datos = dict(almacen.obtener(nombre) or {})
+                meta = {clave: datos.pop(clave, None) for clave in CAMPOS_META}
+                if meta['padre'] and not self.existe(meta['padre']):
+                    restantes.append((nombre, mtime))
+                    continue
+                etiquetas = meta['etiquetas'] or []
+                if isinstance(etiquetas, str):
+                    etiquetas = etiquetas.split(',')
+                try:
+                    self.guardar(nombre, datos, meta['padre'], meta['sitio'] or '', etiquetas, mtime)
+                    importadas += 1
+                except ValueError as e:
+                    logging.error(f"Error importando plantilla {nombre}: {e}")
+            if len(restantes) == len(pendientes):
+                for nombre, _ in restantes:
+                    logging.error(f"Error importando plantilla {nombre}: su plantilla padre no existe")
+                break
+            pendientes = restantes
+        return importadas
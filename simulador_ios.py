@@ -0,0 +1,629 @@
+import os
+import re
+import sys
+import time
+import select
+import termios
+import argparse
+import threading
+from datetime import datetime, timezone
+
+from optimizador import expandir_rango
+
+# Interfaces del router simulado: nombre -> dirección IP inicial (None = sin asignar)
+INTERFACES = {
+    'GigabitEthernet0/0': None,
+    'GigabitEthernet0/1': None,
+    'Serial0/0/0': None,
+    'Serial0/0/1': None,
+}
+LINEAS_TERMINAL = 24  # Como "terminal length" por defecto en una consola
+PAGINADOR = " --More-- "
+BORRAR_PAGINADOR = "\b" * len(PAGINADOR) + " " * len(PAGINADOR) + "\b" * len(PAGINADOR)
+ERROR_ENTRADA = "% Invalid input detected at '^' marker."
+XOFF, XON = b"\x13", b"\x11"
+BITS_CARACTER = 10  # 8N1: arranque, 8 datos y parada
+
+# Primera palabra de los comandos de configuración que acepta el simulador
+COMANDOS_CONFIG = {
+    'hostname', 'enable', 'banner', 'service', 'no', 'ip', 'ipv6', 'interface', 'line', 'router',
+    'vlan', 'username', 'crypto', 'password', 'login', 'transport', 'network', 'clock', 'shutdown',
+    'description', 'switchport', 'encapsulation', 'duplex', 'speed', 'default-router', 'dns-server',
+    'domain-name', 'lease', 'exec-timeout', 'logging', 'access-list', 'spanning-tree', 'name',
+    'passive-interface', 'auto-summary', 'version', 'snmp-server', 'ntp', 'aaa', 'area',
+    'redistribute', 'default-information', 'privilege', 'history', 'stopbits', 'flowcontrol',
+}
+# Comandos que sustituyen a uno anterior con las mismas dos primeras palabras
+COMANDOS_UNICOS = {
+    'hostname', 'ip', 'ipv6', 'password', 'description', 'clock', 'speed', 'duplex', 'encapsulation',
+    'switchport', 'exec-timeout', 'enable', 'banner', 'default-router', 'dns-server', 'domain-name',
+    'lease', 'name', 'logging', 'network', 'login', 'transport',
+}
+# Modo al que lleva cada comando de configuración que abre una sección
+SUBMODOS = (
+    (re.compile(r'^interface\s+range\s'), 'config-if-range'),
+    (re.compile(r'^interface\s'), 'config-if'),
+    (re.compile(r'^line\s'), 'config-line'),
+    (re.compile(r'^router\s'), 'config-router'),
+    (re.compile(r'^vlan\s+\d'), 'config-vlan'),
+    (re.compile(r'^ip\s+dhcp\s+pool\s'), 'dhcp-config'),
+)
+
+
+def es(palabras, *claves):
+    """Comprueba si las palabras son abreviaturas de las claves (p. ej. 'sh run')"""
+    if len(palabras) < len(claves):
+        return False
+    return all(clave.startswith(palabra.lower()) for palabra, clave in zip(palabras, claves))
+
+
+class SimuladorIOS:
+    """Consola IOS simulada en un pseudoterminal, para pruebas y benchmarks sin hardware
+
+    Hace eco de lo que recibe, sigue los modos y el prompt, pagina con --More--, puede
+    procesar cada carácter con una latencia y perder lo que no cabe en un buffer de
+    entrada acotado, como un router real ocupado. Solo funciona en sistemas POSIX.
+    """
+    def __init__(self, hostname="Router", latencia_caracter=0.0, retardo_comando=0.0,
+                 buffer_entrada=0, enable_pass="", lineas_extra=0, inalcanzables=(), control_flujo=False,
+                 velocidad=9600, modelar_linea=False):
+        self.hostname = hostname
+        self.latencia_caracter = latencia_caracter
+        self.retardo_comando = retardo_comando
+        self.buffer_entrada = buffer_entrada  # 0 = ilimitado
+        self.control_flujo = control_flujo  # XOFF al llenarse el buffer en vez de perder datos
+        self.pausado = False
+        # Velocidad de 'line con 0': si el puerto del cliente va a otra, no se entienden
+        self.velocidad = velocidad
+        self.modelar_linea = modelar_linea  # Cada carácter tarda lo que en una línea serie real
+        self.enable_pass = enable_pass
+        self.inalcanzables = set(inalcanzables)
+
+        self.modo = 'usuario'
+        self.lineas_terminal = LINEAS_TERMINAL
+        self.linea = ''
+        self.ultimo_caracter = ''
+        self.pregunta = None  # (función que recibe la respuesta, si se muestra lo escrito)
+        self.paginado = None  # Líneas pendientes de mostrar tras --More--
+        self.seccion = None  # Cabeceras de las secciones a las que van los subcomandos
+        self.claves_rsa = False
+        self.ultimo_cambio = datetime.now(timezone.utc)
+
+        self.globales = ["service timestamps debug datetime msec", "service timestamps log datetime msec"]
+        self.globales += [f"access-list 100 permit ip host 10.{i // 250}.{i % 250}.1 any" for i in range(lineas_extra)]
+        self.secciones = {}
+        self.interfaces = {}
+        for nombre, ip in INTERFACES.items():
+            self.interfaces[nombre] = {'activa': False, 'ip': ip, 'paquetes': 0}
+            self.secciones[f"interface {nombre}"] = ["no ip address", "shutdown"]
+        self.secciones["line con 0"] = []
+        self.secciones["line vty 0 4"] = ["login"]
+
+        # Estadísticas
+        self.recibidos = 0
+        self.descartados = 0
+        self.comandos = 0
+
+        self.maestro, self.esclavo = os.openpty()
+        self.puerto = os.ttyname(self.esclavo)
+        self._entrada = bytearray()
+        self._hay_entrada = threading.Condition()
+        self._activo = False
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc):
+        self.detener()
+
+    def iniciar(self):
+        # Sin eco ni edición de línea en el lado del cliente: el eco lo hace el "router"
+        import tty
+        tty.setraw(self.esclavo)
+        self._activo = True
+        threading.Thread(target=self._recibir, daemon=True).start()
+        threading.Thread(target=self._procesar, daemon=True).start()
+
+    def detener(self):
+        self._activo = False
+        with self._hay_entrada:
+            self._hay_entrada.notify()
+        for fd in (self.maestro, self.esclavo):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    # --- Transporte -------------------------------------------------------
+
+    def _recibir(self):
+        """Lee del pseudoterminal; lo que no cabe en el buffer de entrada se pierde
+
+        Con control de flujo solo lee lo que cabe y manda XOFF al llenarse, como haría
+        un router con 'flowcontrol software'; lo demás espera en el pseudoterminal.
+        """
+        while self._activo:
+            tam = 4096
+            if self.control_flujo and self.buffer_entrada:
+                with self._hay_entrada:
+                    tam = self.buffer_entrada - len(self._entrada)
+                    if tam <= 0:
+                        if not self.pausado:
+                            self.pausado = True
+                            os.write(self.maestro, XOFF)
+                        self._hay_entrada.wait(0.2)
+                        continue
+            try:
+                listos, _, _ = select.select([self.maestro], [], [], 0.2)
+                if not listos:
+                    continue
+                datos = os.read(self.maestro, tam)
+            except OSError:
+                return
+            if not self._misma_velocidad():
+                self.recibidos += len(datos)
+                self.descartados += len(datos)
+                continue
+            with self._hay_entrada:
+                self.recibidos += len(datos)
+                if self.buffer_entrada:
+                    hueco = max(0, self.buffer_entrada - len(self._entrada))
+                    self.descartados += max(0, len(datos) - hueco)
+                    datos = datos[:hueco]
+                self._entrada.extend(datos)
+                self._hay_entrada.notify()
+
+    def _procesar(self):
+        objetivo = time.monotonic()
+        while self._activo:
+            with self._hay_entrada:
+                while self._activo and not self._entrada:
+                    self._hay_entrada.wait(0.2)
+                if not self._activo:
+                    return
+                caracter = chr(self._entrada.pop(0))
+                if self.pausado and len(self._entrada) <= self.buffer_entrada // 2:
+                    self.pausado = False
+                    os.write(self.maestro, XON)
+                self._hay_entrada.notify()
+            latencia = self.latencia_caracter + (BITS_CARACTER / self.velocidad if self.modelar_linea else 0)
+            if latencia:
+                # Acumula la latencia y duerme solo cuando supera la resolución del reloj
+                objetivo = max(objetivo, time.monotonic() - 0.01) + latencia
+                if (espera := objetivo - time.monotonic()) > 0.002:
+                    time.sleep(espera)
+            try:
+                self._caracter(caracter)
+            except OSError:
+                return
+
+    def _escribir(self, texto):
+        datos = texto.replace('\n', '\r\n').encode('ascii', errors='replace')
+        if self.modelar_linea:
+            time.sleep(len(datos) * BITS_CARACTER / self.velocidad)
+        if not self._misma_velocidad():
+            return  # El cliente solo recibiría basura
+        os.write(self.maestro, datos)
+
+    def _misma_velocidad(self):
+        """Si el puerto del cliente está a la velocidad de la consola simulada"""
+        try:
+            return termios.tcgetattr(self.esclavo)[5] == getattr(termios, f"B{self.velocidad}")
+        except (termios.error, AttributeError):
+            return True
+
+    # --- Línea de comandos ------------------------------------------------
+
+    @property
+    def prompt(self):
+        if self.modo == 'usuario':
+            return f"{self.hostname}>"
+        if self.modo == 'privilegiado':
+            return f"{self.hostname}#"
+        return f"{self.hostname}({self.modo})#"
+
+    def _caracter(self, c):
+        if self.paginado is not None:
+            self._paginar(c)
+            return
+        if c in '\r\n':
+            # CR LF cuenta como un solo fin de línea
+            if c == '\n' and self.ultimo_caracter == '\r':
+                self.ultimo_caracter = c
+                return
+            self.ultimo_caracter = c
+            linea, self.linea = self.linea, ''
+            self._escribir('\n')
+            self._linea(linea)
+            return
+        self.ultimo_caracter = c
+        if c in '\x08\x7f':
+            if self.linea:
+                self.linea = self.linea[:-1]
+                self._escribir('\b \b')
+        elif c == '\x15':  # Ctrl-U
+            self._escribir('\b \b' * len(self.linea))
+            self.linea = ''
+        elif c == '\x1a':  # Ctrl-Z
+            if self.modo not in ('usuario', 'privilegiado'):
+                self.modo = 'privilegiado'
+                self._escribir(f"^Z\n{self.prompt}")
+        elif c >= ' ':
+            self.linea += c
+            if self.pregunta is None or self.pregunta[1]:
+                self._escribir(c)
+
+    def _linea(self, linea):
+        if self.pregunta is not None:
+            responder, _ = self.pregunta
+            self.pregunta = None
+            responder(linea.strip())
+            return
+        linea = linea.strip()
+        if linea:
+            self.comandos += 1
+            if self.retardo_comando:
+                time.sleep(self.retardo_comando)
+            salida = self._ejecutar(linea)
+        else:
+            salida = None
+        if self.pregunta is None:
+            self._mostrar(salida or [])
+
+    def _preguntar(self, texto, responder, eco=True):
+        self._escribir(texto)
+        self.pregunta = (responder, eco)
+
+    def _mostrar(self, lineas):
+        """Envía la salida paginando con --More-- y termina con el prompt"""
+        if self.lineas_terminal and len(lineas) >= self.lineas_terminal:
+            pagina = self.lineas_terminal - 1
+            self._escribir("".join(l + "\n" for l in lineas[:pagina]) + PAGINADOR)
+            self.paginado = lineas[pagina:]
+            return
+        self._escribir("".join(l + "\n" for l in lineas) + self.prompt)
+
+    def _paginar(self, c):
+        pendientes, self.paginado = self.paginado, None
+        self._escribir(BORRAR_PAGINADOR)
+        if c == ' ':
+            self._mostrar(pendientes)
+        elif c in '\r\n':
+            self._escribir(pendientes[0] + "\n")
+            if len(pendientes) > 1:
+                self._escribir(PAGINADOR)
+                self.paginado = pendientes[1:]
+            else:
+                self._escribir(self.prompt)
+        else:
+            self._escribir(self.prompt)
+
+    # --- Comandos ---------------------------------------------------------
+
+    def _ejecutar(self, linea):
+        palabras = linea.split()
+        if self.modo in ('usuario', 'privilegiado'):
+            return self._exec(linea, palabras)
+        if es(palabras, 'do') and len(palabras) > 1:
+            return self._exec(linea.split(None, 1)[1], palabras[1:])
+        return self._config(linea, palabras)
+
+    def _exec(self, linea, palabras):
+        filtro = None
+        if '|' in linea:
+            linea, filtro = (parte.strip() for parte in linea.split('|', 1))
+            palabras = linea.split()
+
+        if es(palabras, 'enable'):
+            if self.modo == 'usuario':
+                if self.enable_pass:
+                    self._preguntar("Password: ", self._comprobar_enable, eco=False)
+                else:
+                    self.modo = 'privilegiado'
+            return []
+        if es(palabras, 'disable'):
+            self.modo = 'usuario'
+            return []
+        if es(palabras, 'exit') or es(palabras, 'logout'):
+            self.modo = 'usuario'
+            return []
+        if es(palabras, 'ping') and len(palabras) > 1:
+            return self._ping(palabras)
+        if es(palabras, 'traceroute') and len(palabras) > 1:
+            return self._traceroute(palabras)
+        if es(palabras, 'show'):
+            salida = self._show(palabras[1:])
+            if salida is None:
+                return [ERROR_ENTRADA]
+            return self._filtrar(salida, filtro) if filtro else salida
+        if self.modo == 'usuario':
+            return [ERROR_ENTRADA]
+
+        if es(palabras, 'configure', 'terminal') or (es(palabras, 'configure') and len(palabras) == 1):
+            self.modo = 'config'
+            return ["Enter configuration commands, one per line.  End with CNTL/Z."]
+        if es(palabras, 'terminal', 'length') and len(palabras) == 3 and palabras[2].isdigit():
+            self.lineas_terminal = int(palabras[2])
+            return []
+        if es(palabras, 'write') and (len(palabras) == 1 or es(palabras, 'write', 'memory')):
+            return ["Building configuration...", "[OK]"]
+        if es(palabras, 'copy', 'running-config', 'startup-config'):
+            self._preguntar("Destination filename [startup-config]? ",
+                            lambda _: self._mostrar(["Building configuration...", "[OK]"]))
+            return []
+        return [ERROR_ENTRADA]
+
+    def _comprobar_enable(self, clave):
+        if clave == self.enable_pass:
+            self.modo = 'privilegiado'
+            self._mostrar([])
+        else:
+            self._mostrar(["% Access denied"])
+
+    def _config(self, linea, palabras):
+        primera = palabras[0].lower()
+        if primera == 'end':
+            self.modo = 'privilegiado'
+            self.seccion = None
+            return []
+        if primera == 'exit':
+            if self.modo == 'config':
+                self.modo = 'privilegiado'
+            else:
+                self.modo = 'config'
+                self.seccion = None
+            return []
+        if primera not in COMANDOS_CONFIG:
+            return [ERROR_ENTRADA]
+
+        if es(palabras, 'crypto', 'key', 'generate', 'rsa'):
+            dominio = next((l.split()[-1] for l in self.globales if l.startswith("ip domain-name")), "")
+            self._preguntar(
+                f"The name for the keys will be: {self.hostname}.{dominio}\n"
+                "Choose the size of the key modulus in the range of 360 to 4096 for your\n"
+                "  General Purpose Keys. Choosing a key modulus greater than 512 may take\n"
+                "  a few minutes.\n\nHow many bits in the modulus [512]: ",
+                self._generar_claves
+            )
+            return []
+
+        for patron, submodo in SUBMODOS:
+            if patron.match(linea):
+                if submodo == 'config-if-range':
+                    # Los subcomandos se aplican a cada interfaz del rango
+                    nombres = expandir_rango(linea.split(None, 2)[2])
+                    if not nombres:
+                        return [ERROR_ENTRADA]
+                    self.seccion = [self._crear_interfaz(n) for n in nombres]
+                elif submodo == 'config-if':
+                    self.seccion = [self._crear_interfaz(palabras[1])]
+                else:
+                    cabecera = " ".join(palabras)
+                    if submodo == 'config-line' and 'console'.startswith(palabras[1].lower()):
+                        cabecera = "line con " + " ".join(palabras[2:])
+                    self.secciones.setdefault(cabecera, [])
+                    self.seccion = [cabecera]
+                self.modo = submodo
+                return []
+
+        if self.modo == 'config':
+            if primera == 'hostname' and len(palabras) == 2:
+                self.hostname = palabras[1]
+            elif primera == 'no' and " ".join(palabras[1:]) in self.secciones:
+                del self.secciones[" ".join(palabras[1:])]
+            elif primera == 'no' and len(palabras) > 1:
+                self._quitar(self.globales, " ".join(palabras[1:]))
+            else:
+                self._fijar(self.globales, " ".join(palabras))
+        else:
+            for cabecera in self.seccion:
+                self._subcomando(cabecera, palabras)
+        self.ultimo_cambio = datetime.now(timezone.utc)
+        return []
+
+    def _crear_interfaz(self, nombre):
+        """Cabecera de la sección de una interfaz; cualquier nombre vale, como si el módulo estuviera instalado"""
+        if nombre not in self.interfaces:
+            self.interfaces[nombre] = {'activa': False, 'ip': None, 'paquetes': 0}
+            self.secciones.setdefault(f"interface {nombre}", ["no ip address", "shutdown"])
+        return f"interface {nombre}"
+
+    def _subcomando(self, cabecera, palabras):
+        lineas = self.secciones[cabecera]
+        if cabecera == "line con 0" and palabras[-1].isdigit() and es(palabras[:1], 'speed'):
+            # Como en IOS, el cambio es inmediato: el prompt ya sale a la nueva velocidad
+            self.velocidad = int(palabras[-1])
+        elif cabecera == "line con 0" and es(palabras, 'no', 'speed'):
+            self.velocidad = 9600
+        nombre = cabecera.split()[1] if cabecera.startswith("interface ") else None
+        if palabras[0].lower() == 'no':
+            self._quitar(lineas, " ".join(palabras[1:]))
+            if len(palabras) > 1 and palabras[1] == 'shutdown' and nombre in self.interfaces:
+                self.interfaces[nombre]['activa'] = True
+        else:
+            self._fijar(lineas, " ".join(palabras))
+            if palabras[0].lower() == 'shutdown' and nombre in self.interfaces:
+                self.interfaces[nombre]['activa'] = False
+            if es(palabras, 'ip', 'address') and len(palabras) >= 3:
+                self._quitar(lineas, "ip address")
+                lineas.insert(0, " ".join(palabras))
+                if nombre in self.interfaces:
+                    self.interfaces[nombre]['ip'] = palabras[2]
+
+    def _fijar(self, lineas, linea):
+        palabras = linea.split()
+        if palabras[0] in COMANDOS_UNICOS:
+            clave = palabras[:2]
+            lineas[:] = [l for l in lineas if l.split()[:2] != clave]
+        elif linea in lineas:
+            return
+        if "no " + linea in lineas:
+            lineas.remove("no " + linea)
+        lineas.append(linea)
+
+    def _quitar(self, lineas, linea):
+        lineas[:] = [l for l in lineas if not (l == linea or l.startswith(linea + " "))]
+
+    def _generar_claves(self, respuesta):
+        bits = respuesta or "512"
+        self.claves_rsa = True
+        self._mostrar([
+            f"% Generating {bits} bit RSA keys, keys will be non-exportable...",
+            "[OK] (elapsed time was 1 seconds)",
+        ])
+
+    # --- show, ping, traceroute -------------------------------------------
+
+    def _filtrar(self, lineas, filtro):
+        palabras = filtro.split(None, 1)
+        if len(palabras) < 2:
+            return [ERROR_ENTRADA]
+        patron = re.compile(palabras[1])
+        if es(palabras[:1], 'include'):
+            return [l for l in lineas if patron.search(l)]
+        if es(palabras[:1], 'exclude'):
+            return [l for l in lineas if not patron.search(l)]
+        if es(palabras[:1], 'begin'):
+            for i, l in enumerate(lineas):
+                if patron.search(l):
+                    return lineas[i:]
+            return []
+        return [ERROR_ENTRADA]
+
+    def _show(self, palabras):
+        if es(palabras, 'running-config'):
+            return self.running_config()
+        if es(palabras, 'ip', 'interface', 'brief'):
+            return self._ip_interface_brief()
+        if es(palabras, 'interfaces'):
+            return self._interfaces(palabras[1] if len(palabras) > 1 else None)
+        if es(palabras, 'version'):
+            return [
+                "Cisco IOS Software, C2900 Software (C2900-UNIVERSALK9-M), Version 15.4(3)M, RELEASE SOFTWARE",
+                f"{self.hostname} uptime is 1 hour, 5 minutes",
+                "cisco CISCO2911/K9 (revision 1.0) with 487424K/36864K bytes of memory.",
+            ]
+        if es(palabras, 'crypto', 'key', 'mypubkey', 'rsa'):
+            if not self.claves_rsa:
+                return []
+            return [f"% Key pair was generated at: {self.ultimo_cambio:%H:%M:%S} UTC", f"Key name: {self.hostname}"]
+        return None
+
+    def running_config(self):
+        """Líneas de 'show running-config' como las mostraría IOS"""
+        cuerpo = [
+            "!",
+            f"! Last configuration change at {self.ultimo_cambio:%H:%M:%S UTC %a %b %d %Y}",
+            "!",
+            "version 15.4",
+        ]
+        cuerpo += [l for l in self.globales if l.startswith("service ")]
+        cuerpo += ["!", f"hostname {self.hostname}", "!"]
+        cuerpo += [l for l in self.globales if not l.startswith("service ")]
+        for cabecera, lineas in self.secciones.items():
+            if cabecera.startswith("line "):
+                continue
+            cuerpo += ["!", cabecera] + [" " + l for l in lineas]
+        cuerpo.append("!")
+        for cabecera, lineas in self.secciones.items():
+            if cabecera.startswith("line "):
+                cuerpo += [cabecera] + [" " + l for l in lineas]
+        cuerpo += ["!", "end"]
+        tamano = sum(len(l) + 1 for l in cuerpo)
+        return ["Building configuration...", "", f"Current configuration : {tamano} bytes"] + cuerpo
+
+    def _ip_interface_brief(self):
+        lineas = ["Interface                  IP-Address      OK? Method Status                Protocol"]
+        for nombre, datos in self.interfaces.items():
+            estado = "up" if datos['activa'] else "administratively down"
+            protocolo = "up" if datos['activa'] else "down"
+            ip = datos['ip'] or "unassigned"
+            metodo = "manual" if datos['ip'] else "unset"
+            lineas.append(f"{nombre:<26} {ip:<15} YES {metodo:<6} {estado:<21} {protocolo}")
+        return lineas
+
+    def _interfaces(self, nombre=None):
+        lineas = []
+        for interfaz, datos in self.interfaces.items():
+            if nombre and not interfaz.lower().startswith(nombre.lower()):
+                continue
+            if datos['activa']:
+                # Tráfico simulado: los contadores crecen en cada consulta
+                datos['paquetes'] += 100
+            paquetes = datos['paquetes']
+            estado = "up" if datos['activa'] else "administratively down"
+            lineas += [
+                f"{interfaz} is {estado}, line protocol is {'up' if datos['activa'] else 'down'}",
+                "  Hardware is CN Gigabit Ethernet",
+                f"  Internet address is {datos['ip']}/24" if datos['ip'] else "  Internet address is unassigned",
+                "  MTU 1500 bytes, BW 1000000 Kbit/sec, DLY 10 usec,",
+                "  Input queue: 0/75/0/0 (size/max/drops/flushes); Total output drops: 0",
+                "  5 minute input rate 0 bits/sec, 0 packets/sec",
+                f"     {paquetes} packets input, {paquetes * 64} bytes, 0 no buffer",
+                "     0 input errors, 0 CRC, 0 frame, 0 overrun, 0 ignored",
+                f"     {paquetes} packets output, {paquetes * 64} bytes, 0 underruns",
+                "     0 output errors, 0 collisions, 0 interface resets",
+            ]
+        return lineas
+
+    def _ping(self, palabras):
+        destino = palabras[1]
+        repeticiones = 5
+        if 'repeat' in palabras[:-1]:
+            repeticiones = int(palabras[palabras.index('repeat') + 1])
+        exito = destino not in self.inalcanzables
+        recibidos = repeticiones if exito else 0
+        lineas = [
+            "Type escape sequence to abort.",
+            f"Sending {repeticiones}, 100-byte ICMP Echos to {destino}, timeout is 2 seconds:",
+            ("!" if exito else ".") * repeticiones,
+            f"Success rate is {100 * recibidos // repeticiones} percent ({recibidos}/{repeticiones})"
+            + (", round-trip min/avg/max = 1/2/4 ms" if exito else ""),
+        ]
+        return lineas
+
+    def _traceroute(self, palabras):
+        destino = palabras[1]
+        lineas = [
+            "Type escape sequence to abort.",
+            f"Tracing the route to {destino}",
+            "VRF info: (vrf in name/id, vrf out name/id)",
+            "  1 10.0.0.1 4 msec 4 msec 4 msec",
+        ]
+        if destino in self.inalcanzables:
+            lineas += ["  2  *  *  *", "  3  *  *  *"]
+        else:
+            lineas.append(f"  2 {destino} 8 msec 8 msec 8 msec")
+        return lineas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consola IOS simulada en un pseudoterminal")
+    parser.add_argument("--hostname", default="Router")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Segundos por carácter recibido")
+    parser.add_argument("--retardo", type=float, default=0.0, help="Segundos extra por comando")
+    parser.add_argument("--buffer", type=int, default=0, help="Bytes del buffer de entrada (0 = ilimitado)")
+    parser.add_argument("--enable-pass", default="")
+    parser.add_argument("--lineas-extra", type=int, default=0, help="Líneas de relleno en la running-config")
+    parser.add_argument("--modelar-linea", action="store_true",
+                        help="Cada carácter tarda lo que en una línea serie a la velocidad de 'line con 0'")
+    args = parser.parse_args(argv)
+
+    with SimuladorIOS(
+        args.hostname, args.latencia, args.retardo, args.buffer, args.enable_pass, args.lineas_extra,
+        modelar_linea=args.modelar_linea
+    ) as simulador:
+        print(f"Consola simulada en {simulador.puerto} (Ctrl-C para terminar)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        print(f"{simulador.comandos} comandos, {simulador.recibidos} bytes recibidos, "
+              f"{simulador.descartados} descartados por desbordamiento")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())